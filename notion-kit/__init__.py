@@ -1,7 +1,8 @@
 """Notion Kit - Portable Notion API wrapper with Anki sync"""
 
+from .notion_http import NotionHTTP, AsyncNotionHTTP, get_http
 from .notion_wrap import NotionWrapper
 from .anki_sync import AnkiSyncManager
 
-__all__ = ["NotionWrapper", "AnkiSyncManager"]
+__all__ = ["NotionHTTP", "AsyncNotionHTTP", "get_http", "NotionWrapper", "AnkiSyncManager"]
 __version__ = "1.0.0"
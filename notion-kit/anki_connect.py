@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect 直连交付 - 不生成 .apkg，直接写入桌面 Anki
+
+功能:
+- AnkiConnect: JSON-RPC 客户端（版本 6，支持 key 认证与 multi 批量调用）
+- AnkiConnectTarget: 与牌组集合比对后批量推送笔记
+  - 已推送过的笔记（guid → note id 映射）用 notesInfo 一次取回，内容相同的跳过
+  - 映射中没有的笔记用 findNotes 按 Front 查找（兼容之前通过 .apkg 导入的笔记）
+  - 变化的笔记在一次 multi 中 updateNoteFields / updateNoteTags / changeDeck
+  - 新笔记一次 addNotes
+  - 缺失的模型和牌组自动创建，媒体文件用 storeMediaFile 上传
+
+使用方法:
+    from anki_connect import AnkiConnect, AnkiConnectTarget
+
+    target = AnkiConnectTarget(AnkiConnect(), model, "data/anki_connect_notes.tsv")
+    errors = target.push(notes, media_paths)     # {page_id: 错误信息或 None}
+"""
+
+import base64
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import genanki
+import httpx
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+API_VERSION = 6
+
+
+class AnkiConnectError(Exception):
+    """AnkiConnect 返回的错误"""
+
+
+def _escape_query(value: str) -> str:
+    """转义 Anki 搜索语法中的特殊字符"""
+    for char in ("\\", '"', "*", "_"):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+class AnkiConnect:
+    """AnkiConnect JSON-RPC 客户端"""
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None,
+                 client: Optional[httpx.Client] = None, timeout: float = 60):
+        """
+        初始化客户端
+
+        Args:
+            url: AnkiConnect 地址（默认 ANKI_CONNECT_URL 或 http://127.0.0.1:8765）
+            key: API key（默认 ANKI_CONNECT_KEY，未启用认证时为空）
+            client: HTTP 客户端
+            timeout: 请求超时（秒）
+        """
+        self.url = url or os.getenv("ANKI_CONNECT_URL") or DEFAULT_URL
+        self.key = key or os.getenv("ANKI_CONNECT_KEY")
+        self.client = client or httpx.Client(timeout=timeout)
+
+    def invoke(self, action: str, **params):
+        """
+        调用单个 action
+
+        Returns:
+            result 字段
+
+        Raises:
+            AnkiConnectError: AnkiConnect 返回错误
+            httpx.HTTPError: 连接失败
+        """
+        body = {"action": action, "version": API_VERSION, "params": params}
+        if self.key:
+            body["key"] = self.key
+        response = self.client.post(self.url, json=body)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("error"):
+            raise AnkiConnectError(f"{action}: {data['error']}")
+        return data.get("result")
+
+    def multi(self, actions: List[Dict]) -> List[Dict]:
+        """
+        一次请求执行多个 action
+
+        Args:
+            actions: [{"action": ..., "params": {...}}]
+
+        Returns:
+            每个 action 的 {"result", "error"}
+        """
+        if not actions:
+            return []
+        results = self.invoke("multi", actions=[
+            {"action": a["action"], "version": API_VERSION, "params": a.get("params", {})} for a in actions
+        ])
+        # 旧版本直接返回结果值
+        return [r if isinstance(r, dict) and "error" in r else {"result": r, "error": None} for r in results]
+
+
+class AnkiConnectTarget:
+    """把笔记推送到 AnkiConnect"""
+
+    def __init__(self, connect: AnkiConnect, model: genanki.Model, map_path=None):
+        """
+        初始化推送目标
+
+        Args:
+            connect: AnkiConnect 客户端
+            model: 笔记模型（集合中不存在时按此创建）
+            map_path: guid → note id 映射文件（TSV）
+        """
+        self.connect = connect
+        self.model = model
+        self.field_names = [field["name"] for field in model.fields]
+        self.map_path = Path(map_path) if map_path else None
+        self.note_ids: Dict[str, int] = self._load_map()
+        self._ready_decks: set = set()
+        self._model_ready = False
+        # 最近一次 push 中上传失败的媒体文件名
+        self.failed_media: List[str] = []
+
+    def _load_map(self) -> Dict[str, int]:
+        if not self.map_path or not self.map_path.exists():
+            return {}
+        with open(self.map_path, 'r', encoding='utf-8') as f:
+            pairs = (line.rstrip("\n").split("\t") for line in f)
+            return {parts[0]: int(parts[1]) for parts in pairs if len(parts) == 2 and parts[1].isdigit()}
+
+    def save_map(self):
+        """保存 guid → note id 映射（原子替换）"""
+        if not self.map_path:
+            return
+        self.map_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.map_path.parent), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for guid in sorted(self.note_ids):
+                f.write(f"{guid}\t{self.note_ids[guid]}\n")
+        os.replace(tmp, self.map_path)
+
+    def _ensure(self, decks: Iterable[str]):
+        """创建集合中缺失的模型和牌组"""
+        decks = set(decks) - self._ready_decks
+        if self._model_ready and not decks:
+            return
+
+        model_names, deck_names = (r["result"] or [] for r in self.connect.multi([
+            {"action": "modelNames"}, {"action": "deckNames"},
+        ]))
+        if self.model.name not in model_names:
+            template = self.model.templates[0]
+            self.connect.invoke(
+                "createModel",
+                modelName=self.model.name,
+                inOrderFields=self.field_names,
+                css=self.model.css,
+                cardTemplates=[{"Name": template["name"], "Front": template["qfmt"], "Back": template["afmt"]}],
+            )
+        self._model_ready = True
+
+        missing = sorted(decks - set(deck_names))
+        self.connect.multi([{"action": "createDeck", "params": {"deck": deck}} for deck in missing])
+        self._ready_decks |= decks
+
+    def store_media(self, paths: Iterable[str]) -> List[str]:
+        """
+        上传媒体文件
+
+        Returns:
+            上传失败的文件名
+        """
+        paths = list(paths)
+        actions = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                data = base64.b64encode(f.read()).decode("ascii")
+            actions.append({"action": "storeMediaFile", "params": {"filename": Path(path).name, "data": data}})
+        results = self.connect.multi(actions)
+        return [Path(path).name for path, r in zip(paths, results) if r["error"]]
+
+    def _fields(self, note: Dict) -> Dict[str, str]:
+        return dict(zip(self.field_names, note["fields"]))
+
+    def _find_existing(self, notes: List[Dict]) -> Dict[str, Dict]:
+        """guid → notesInfo 条目（映射中的笔记直接取回，其余按 Front 查找）"""
+        mapped = {str(n["guid"]): self.note_ids[str(n["guid"])] for n in notes if str(n["guid"]) in self.note_ids}
+        unmapped = [n for n in notes if str(n["guid"]) not in mapped]
+
+        if unmapped:
+            first = self.field_names[0]
+            results = self.connect.multi([{"action": "findNotes", "params": {
+                "query": f'"deck:{_escape_query(n["deck"])}" "{first}:{_escape_query(n["fields"][0])}"'
+            }} for n in unmapped])
+            for note, r in zip(unmapped, results):
+                if r["result"]:
+                    mapped[str(note["guid"])] = r["result"][0]
+
+        if not mapped:
+            return {}
+        ids = list(mapped.values())
+        info = {item["noteId"]: item for item in self.connect.invoke("notesInfo", notes=ids) if item}
+        return {guid: info[nid] for guid, nid in mapped.items() if nid in info}
+
+    def push(self, notes: List[Dict], media_paths: Iterable[str] = ()) -> Dict[str, Optional[str]]:
+        """
+        推送一批笔记
+
+        Args:
+            notes: anki_notes.convert_page 的输出
+            media_paths: 需要上传的媒体文件（先于笔记上传）
+
+        Returns:
+            page_id → 错误信息（None 表示成功或内容未变化）
+        """
+        self.failed_media = []
+        if not notes:
+            return {}
+        self._ensure(note["deck"] for note in notes)
+        self.failed_media = self.store_media(media_paths)
+        if self.failed_media:
+            print(f"   ⚠️  {len(self.failed_media)} 个媒体文件上传失败")
+
+        existing = self._find_existing(notes)
+        outcome: Dict[str, Optional[str]] = {}
+        update_actions, update_owner, additions = [], [], []
+
+        for note in notes:
+            guid = str(note["guid"])
+            info = existing.get(guid)
+            if not info:
+                additions.append(note)
+                continue
+
+            self.note_ids[guid] = info["noteId"]
+            fields = self._fields(note)
+            current = {name: value["value"] for name, value in info.get("fields", {}).items()}
+            outcome[note["page_id"]] = None
+            if current == fields and sorted(info.get("tags", [])) == sorted(note["tags"]):
+                continue
+
+            for action in (
+                {"action": "updateNoteFields", "params": {"note": {"id": info["noteId"], "fields": fields}}},
+                {"action": "updateNoteTags", "params": {"note": info["noteId"], "tags": note["tags"]}},
+                {"action": "changeDeck", "params": {"cards": info.get("cards", []), "deck": note["deck"]}},
+            ):
+                update_actions.append(action)
+                update_owner.append(note["page_id"])
+
+        for page_id, r in zip(update_owner, self.connect.multi(update_actions)):
+            if r["error"] and not outcome.get(page_id):
+                outcome[page_id] = r["error"]
+
+        if additions:
+            ids = self.connect.invoke("addNotes", notes=[{
+                "deckName": note["deck"],
+                "modelName": self.model.name,
+                "fields": self._fields(note),
+                "tags": note["tags"],
+                # 重复检查已在 _find_existing 中完成
+                "options": {"allowDuplicate": True},
+            } for note in additions])
+            for note, nid in zip(additions, ids):
+                if nid:
+                    self.note_ids[str(note["guid"])] = nid
+                    outcome[note["page_id"]] = None
+                else:
+                    outcome[note["page_id"]] = "addNotes failed"
+
+        self.save_map()
+        return outcome
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Anki 笔记内容哈希账本 - 只打包新增或内容变化的笔记
+
+功能:
+- 按笔记 GUID 记录已发送内容的哈希（字段 + 标签 + 牌组）
+- 打包前比对哈希，未变化的笔记不再重复发送
+- TSV 文本格式（按 GUID 排序），便于查看、diff 和提交到 git
+- 发送成功后才提交，发送失败时下次运行重新发送
+- 同时记录导出时页面的 last_edited_time：账本模式下"未同步" = 导出后又被编辑过的页面，
+  不再依赖 Notion 中的 Synced / Last Reviewed 属性（省去每张卡片一次写回）
+
+使用方法:
+    from anki_ledger import NoteLedger, note_hash
+
+    ledger = NoteLedger("data/anki_ledger.tsv")
+    digest = note_hash([front, back, source], tags, deck)
+    if ledger.changed(guid, digest):
+        ...                                  # 加入本次包
+        ledger.stage(guid, digest, page_id, page["last_edited_time"])
+    ledger.commit()                          # 发送成功后
+
+    ledger.exported(page_id)                 # 上次导出时的 last_edited_time
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+HEADER = "guid\thash\tpage_id\tlast_edited"
+
+
+def note_hash(fields: Iterable[str], tags: Iterable[str] = (), deck: str = "") -> str:
+    """
+    计算笔记内容哈希
+
+    Args:
+        fields: 笔记字段
+        tags: 标签（顺序无关）
+        deck: 牌组全名
+
+    Returns:
+        sha1 十六进制摘要
+    """
+    h = hashlib.sha1()
+    for part in [*fields, "\x1f".join(sorted(tags)), deck]:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+class NoteLedger:
+    """已发送笔记的内容哈希账本"""
+
+    def __init__(self, path):
+        """
+        初始化账本（文件存在则加载）
+
+        Args:
+            path: TSV 文件路径
+        """
+        self.path = Path(path)
+        # guid → (hash, page_id, last_edited)
+        self.entries: Dict[str, Tuple[str, str, str]] = {}
+        self.staged: Dict[str, Tuple[str, str, str]] = {}
+        # page_id → 已提交的 last_edited
+        self.edited: Dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                # 兼容没有 last_edited 列的旧账本
+                if len(parts) not in (3, 4) or line.startswith("guid\t"):
+                    continue
+                guid, digest, page_id, edited = (parts + [""])[:4]
+                self.entries[guid] = (digest, page_id, edited)
+        self._index_edited()
+
+    def _index_edited(self):
+        self.edited = {page_id: edited for _, page_id, edited in self.entries.values() if page_id}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, guid) -> Optional[str]:
+        """已提交的内容哈希"""
+        entry = self.entries.get(str(guid))
+        return entry[0] if entry else None
+
+    def changed(self, guid, digest: str) -> bool:
+        """笔记是新增的或内容与上次发送的不同"""
+        return self.get(guid) != digest
+
+    def exported(self, page_id: str) -> Optional[str]:
+        """页面上次导出时的 last_edited_time（未导出或旧账本返回 None）"""
+        return self.edited.get(page_id) or None
+
+    def stage(self, guid, digest: str, page_id: str = "", edited: Optional[str] = None):
+        """
+        暂存本次打包的笔记（commit 后生效）
+
+        Args:
+            guid: 笔记 GUID
+            digest: 内容哈希
+            page_id: Notion 页面 ID
+            edited: 页面的 last_edited_time
+        """
+        self.staged[str(guid)] = (digest, page_id, edited or "")
+
+    def reset(self):
+        """清空账本（重新交付全部笔记前调用；commit 时写入文件）"""
+        self.entries = {}
+        self.staged = {}
+        self.edited = {}
+
+    def touch(self, page_id: str, edited: str) -> bool:
+        """
+        更新已提交页面的 last_edited_time（写回 Notion 后页面的编辑时间会变化）
+
+        Args:
+            page_id: Notion 页面 ID
+            edited: 写回后页面的 last_edited_time
+
+        Returns:
+            账本中是否有该页面
+        """
+        found = False
+        for guid, (digest, entry_page, _) in list(self.entries.items()):
+            if entry_page == page_id:
+                self.entries[guid] = (digest, entry_page, edited)
+                found = True
+        if found:
+            self.edited[page_id] = edited
+        return found
+
+    def unstage(self, guid):
+        """撤销单条暂存（该笔记未送达）"""
+        self.staged.pop(str(guid), None)
+
+    def staged_digest(self, media: Iterable[str] = ()) -> str:
+        """
+        本次暂存内容的整体哈希（与时间戳、笔记顺序无关，用于识别重复的包）
+
+        Args:
+            media: 随包附带的媒体文件名
+
+        Returns:
+            sha1 十六进制摘要
+        """
+        h = hashlib.sha1()
+        for guid in sorted(self.staged):
+            h.update(f"{guid}\t{self.staged[guid][0]}\n".encode("utf-8"))
+        for name in sorted(media):
+            h.update(f"media\t{name}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def discard(self):
+        """丢弃暂存（发送失败时调用）"""
+        self.staged = {}
+
+    def commit(self, replace: bool = False):
+        """
+        提交暂存并写入文件（原子替换）
+
+        Args:
+            replace: 以暂存内容替换整个账本（发送完整牌组后）
+        """
+        if replace:
+            self.entries = {}
+        self.entries.update(self.staged)
+        self.staged = {}
+        self._index_edited()
+        self.save()
+
+    def save(self):
+        """只写入已提交的内容（原子替换，暂存不受影响）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(HEADER + "\n")
+            for guid in sorted(self.entries):
+                digest, page_id, edited = self.entries[guid]
+                f.write(f"{guid}\t{digest}\t{page_id}\t{edited}\n")
+        os.replace(tmp, self.path)
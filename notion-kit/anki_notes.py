@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Notion 页面 → Anki 笔记转换（纯函数，可在进程池中运行）
+
+功能:
+- Anki Cards 与 Cortex 页面转换为笔记内容 (front, back, deck, source, tags)
+- Front/Back 渲染为 Anki HTML（保留粗体、代码、链接等注解，见 notion_html）
+- 稳定的笔记 GUID 与牌组 ID（由 page_id / 牌组名哈希得到，跨进程、跨运行一致）
+- convert_page 输出可直接写入包的笔记 dict（含内容哈希）
+- NOTE_FIELDS: 来源名 → 字段转换函数（按页面来源查表，不再逐页判断属性）
+"""
+
+import hashlib
+import html
+from typing import Dict, List, Optional
+
+try:
+    from .notion_props import DECODERS
+    from .anki_ledger import note_hash
+    from .notion_html import rich_text_html
+except ImportError:
+    from notion_props import DECODERS
+    from anki_ledger import note_hash
+    from notion_html import rich_text_html
+
+EMPTY_BODY = "（无内容）"
+
+# Cortex 标题前缀 → 牌组
+CORTEX_PREFIXES = [
+    ("翻译：", "Translation"),
+    ("单词：", "Vocabulary"),
+    ("短语：", "Phrases"),
+]
+
+
+def sanitize_tag(tag: str) -> str:
+    """Sanitize tag for Anki: replace spaces with underscores"""
+    if not tag:
+        return tag
+    return tag.replace(" ", "_")
+
+
+def extract_property(page: Dict, prop_name: str, prop_type: str):
+    """提取页面属性（按类型查表解码，富文本完整拼接）"""
+    prop = page.get("properties", {}).get(prop_name)
+
+    if not prop:
+        return None
+
+    decoder = DECODERS.get(prop_type)
+    if decoder is None:
+        return None
+
+    value = decoder(prop)
+    if prop_type in ("title", "rich_text"):
+        return value or None
+
+    if prop_type == "multi_select":
+        # Sanitize tags: Anki doesn't allow spaces in tags
+        return [sanitize_tag(tag) for tag in value]
+    return value
+
+
+def extract_html(page: Dict, prop_name: str) -> Optional[str]:
+    """将 title / rich_text 属性渲染为 Anki HTML"""
+    prop = page.get("properties", {}).get(prop_name)
+    if not prop or prop.get("type") not in ("title", "rich_text"):
+        return None
+    return rich_text_html(prop.get(prop["type"])) or None
+
+
+def is_cortex_page(page: Dict) -> bool:
+    """判断是否为 Cortex 数据库的页面"""
+    props = page.get("properties", {})
+    # Cortex 特有属性：Name (title), Type, Status
+    has_name = "Name" in props and props["Name"].get("type") == "title"
+    has_type = "Type" in props and props["Type"].get("type") == "select"
+    has_status = "Status" in props and props["Status"].get("type") == "select"
+    return has_name and has_type and has_status
+
+
+def cortex_fields(page: Dict, body: Optional[str]) -> tuple:
+    """
+    将 Cortex 条目转换为 Anki 卡片格式 (front, back, deck, source, tags)
+
+    Args:
+        page: Cortex 页面对象
+        body: 页面正文（HTML）
+
+    Returns:
+        笔记内容；没有标题时全部为 None
+    """
+    name = extract_property(page, "Name", "title")
+    source = extract_property(page, "Source", "rich_text") or ""
+    tags = extract_property(page, "Tags", "multi_select") or []
+
+    if not name:
+        return None, None, None, None, None
+
+    # 页面正文作为 Back
+    back = body or EMPTY_BODY
+
+    # Front 使用标题，根据前缀判断牌组
+    front = name
+    deck = "Vocabulary"  # 默认牌组
+    for prefix, prefix_deck in CORTEX_PREFIXES:
+        if name.startswith(prefix):
+            front = name.replace(prefix, "").strip()
+            deck = prefix_deck
+            break
+    front = html.escape(front, quote=False)
+
+    # 添加 Cortex 标签
+    if "Cortex" not in tags:
+        tags.append("Cortex")
+
+    return front, back, deck, source, tags
+
+
+def card_fields(page: Dict, body: Optional[str] = None) -> tuple:
+    """将 Anki Cards 页面转换为 (front, back, deck, source, tags)（内容都在属性中，不需要正文）"""
+    return (
+        extract_html(page, "Front"),
+        extract_html(page, "Back"),
+        extract_property(page, "Deck", "select"),
+        extract_property(page, "Source", "url") or "",
+        extract_property(page, "Tags", "multi_select") or [],
+    )
+
+
+# 卡片来源 → 字段转换函数 (page, body) -> (front, back, deck, source, tags)
+# 模块级函数，可在进程池中按来源名查表
+NOTE_FIELDS = {
+    "anki_cards": card_fields,
+    "cortex": cortex_fields,
+}
+
+
+def source_of(page: Dict) -> str:
+    """未标注来源的页面：按属性推断来源名"""
+    return "cortex" if is_cortex_page(page) else "anki_cards"
+
+
+def anki_guid(notion_page_id: str) -> int:
+    """从 Notion Page ID 生成稳定的 Anki GUID"""
+    hash_hex = hashlib.md5(notion_page_id.encode()).hexdigest()
+    # genanki 要求 GUID 是整数
+    return int(hash_hex[:15], 16)
+
+
+def deck_id(full_deck_name: str) -> int:
+    """由牌组全名生成稳定的牌组 ID"""
+    return int(hashlib.md5(full_deck_name.encode()).hexdigest()[:8], 16) % (10 ** 10)
+
+
+def deck_path(deck_prefix: str, deck_name: Optional[str]) -> str:
+    """牌组全名（如 LifeOS::Vocabulary）"""
+    return f"{deck_prefix}::{deck_name}" if deck_name else deck_prefix
+
+
+def convert_page(page: Dict, body: Optional[str] = None, deck_prefix: str = "LifeOS",
+                 source_name: Optional[str] = None) -> Optional[Dict]:
+    """
+    将页面转换为待打包的笔记
+
+    Args:
+        page: 页面对象
+        body: 页面正文（需要正文的来源，如 Cortex）
+        deck_prefix: 牌组前缀
+        source_name: 页面来源（NOTE_FIELDS 的键；None 时按属性推断）
+
+    Returns:
+        {"page_id", "guid", "deck", "fields": [front, back, source], "tags", "hash", "edited"}；
+        缺少 Front 或 Back 返回 None
+    """
+    fields_of = NOTE_FIELDS[source_name or source_of(page)]
+    front, back, deck_name, source, tags = fields_of(page, body)
+
+    if not front or not back:
+        return None
+
+    deck = deck_path(deck_prefix, deck_name)
+    fields: List[str] = [front, back, source]
+    return {
+        "page_id": page["id"],
+        "guid": anki_guid(page["id"]),
+        "deck": deck,
+        "fields": fields,
+        "tags": tags,
+        "hash": note_hash(fields, tags, deck),
+        "edited": page.get("last_edited_time"),
+    }
+
+
+def convert_item(item: tuple) -> Optional[Dict]:
+    """进程池入口：item 为 (page, body, deck_prefix[, source_name])"""
+    return convert_page(*item)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+流式 Anki 包写入 - 一次遍历写出 .apkg，内存占用与笔记总数无关
+
+genanki.Package 需要先把所有 Note 挂到 Deck 上再统一写入；
+这里直接复用 genanki 的表结构和 Note.write_to_db，逐条写入临时 SQLite，
+牌组在首次出现时注册（父牌组一并注册，保持完整的牌组树）。
+媒体文件在关闭时按 genanki 的格式写入 zip（编号文件 + media 映射），
+已压缩的格式（图片、音视频、PDF）直接存储，不再重复 deflate。
+
+SplitPackage 在估算大小超过上限时换到下一个分卷（如 Telegram Bot 的 50 MB 上传限制），
+每个分卷都是独立可导入的 .apkg，笔记与其引用的媒体在同一分卷中。
+
+使用方法:
+    from anki_package import SplitPackage, StreamingPackage
+
+    with StreamingPackage("deck.apkg", model) as package:
+        for note in notes:
+            package.add(note)          # anki_notes.convert_page 的输出
+        package.add_media("data/cache/media/<sha256>.png")
+
+    with SplitPackage("deck.apkg", model, max_bytes=45 * 1024 * 1024) as package:
+        package.add(note, media_paths)
+    package.paths                      # ["deck.apkg"] 或 ["deck_part1.apkg", "deck_part2.apkg", ...]
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import genanki
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+
+try:
+    from .anki_notes import deck_id
+except ImportError:
+    from anki_notes import deck_id
+
+# 已压缩的媒体格式：zip 中直接存储
+STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".m4a", ".ogg", ".opus",
+                   ".mp4", ".webm", ".mov", ".pdf", ".zip", ".gz"}
+
+# 分卷大小估算：每条笔记在集合中的固定开销（notes + cards 两行及索引）
+NOTE_OVERHEAD = 512
+# 空集合（模型、牌组配置）的大小
+PACKAGE_OVERHEAD = 64 * 1024
+
+
+class StreamingPackage:
+    """逐条写入笔记的 .apkg 生成器"""
+
+    def __init__(self, path, model: genanki.Model, timestamp: Optional[float] = None):
+        """
+        初始化包
+
+        Args:
+            path: 输出 .apkg 路径
+            model: 笔记模型
+            timestamp: 笔记/卡片时间戳（默认当前时间）
+        """
+        self.path = str(path)
+        self.model = model
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.id_gen = itertools.count(int(self.timestamp * 1000))
+        self.deck_ids: Dict[str, int] = {}
+        self.note_count = 0
+        # 文件名 → 本地路径
+        self.media_files: Dict[str, str] = {}
+
+        fd, self.db_path = tempfile.mkstemp(suffix=".anki2")
+        os.close(fd)
+        self.conn = sqlite3.connect(self.db_path)
+        self.cursor = self.conn.cursor()
+        self.cursor.executescript(APKG_SCHEMA)
+        self.cursor.executescript(APKG_COL)
+
+    def _register_deck(self, name: str) -> int:
+        """注册牌组（及其父牌组），返回牌组 ID"""
+        if name in self.deck_ids:
+            return self.deck_ids[name]
+
+        parts = name.split("::")
+        for depth in range(1, len(parts) + 1):
+            path = "::".join(parts[:depth])
+            if path in self.deck_ids:
+                continue
+            deck = genanki.Deck(deck_id(path), path)
+            deck.add_model(self.model)
+            deck.write_to_db(self.cursor, self.timestamp, self.id_gen)
+            self.deck_ids[path] = deck.deck_id
+        return self.deck_ids[name]
+
+    def add(self, note: Dict):
+        """
+        写入一条笔记
+
+        Args:
+            note: {"guid", "deck", "fields", "tags"}（anki_notes.convert_page 的输出）
+        """
+        anki_note = genanki.Note(
+            model=self.model,
+            fields=note["fields"],
+            guid=note["guid"],
+            tags=note["tags"],
+        )
+        anki_note.write_to_db(self.cursor, self.timestamp, self._register_deck(note["deck"]), self.id_gen)
+        self.note_count += 1
+
+    def add_media(self, path):
+        """附带一个媒体文件（同名文件只附带一次）"""
+        path = Path(path)
+        self.media_files.setdefault(path.name, str(path))
+
+    def close(self):
+        """提交并打包为 .apkg"""
+        self.conn.commit()
+        self.conn.close()
+        try:
+            with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED) as outzip:
+                outzip.write(self.db_path, 'collection.anki2')
+                media = {}
+                for idx, (name, path) in enumerate(sorted(self.media_files.items())):
+                    stored = Path(name).suffix.lower() in STORED_SUFFIXES
+                    outzip.write(path, str(idx), zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+                    media[str(idx)] = name
+                outzip.writestr('media', json.dumps(media))
+        finally:
+            os.unlink(self.db_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _note_size(note: Dict) -> int:
+    return NOTE_OVERHEAD + sum(len(field.encode("utf-8")) for field in note["fields"])
+
+
+class SplitPackage:
+    """按估算大小自动分卷的 StreamingPackage"""
+
+    def __init__(self, path, model: genanki.Model, max_bytes: int, timestamp: Optional[float] = None):
+        """
+        初始化分卷包
+
+        Args:
+            path: 输出 .apkg 路径（只有一卷时使用原名，多卷时为 <名称>_partN.apkg）
+            model: 笔记模型
+            max_bytes: 每卷的大小上限（按未压缩大小估算，实际文件更小）
+            timestamp: 笔记/卡片时间戳（默认当前时间）
+        """
+        self.path = Path(path)
+        self.model = model
+        self.max_bytes = max_bytes
+        self.timestamp = timestamp
+        self.parts: List[StreamingPackage] = []
+        self.paths: List[str] = []
+        self.note_count = 0
+        self.deck_ids: Dict[str, int] = {}
+        self.media_files: Dict[str, str] = {}
+        self._size = 0
+        self._closed = False
+        self._open_part()
+
+    def _part_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}_part{index}{self.path.suffix}")
+
+    def _open_part(self):
+        index = len(self.parts) + 1
+        self.parts.append(StreamingPackage(self._part_path(index), self.model, self.timestamp))
+        self._size = PACKAGE_OVERHEAD
+
+    def add(self, note: Dict, media_paths: Iterable[str] = ()):
+        """
+        写入一条笔记及其媒体（当前分卷放不下时先换卷；单条超限的笔记独占一卷）
+
+        Args:
+            note: anki_notes.convert_page 的输出
+            media_paths: 笔记引用、需要随包附带的媒体文件
+        """
+        part = self.parts[-1]
+        media = [Path(path) for path in media_paths if Path(path).name not in part.media_files]
+        size = _note_size(note) + sum(path.stat().st_size for path in media)
+        if part.note_count and self._size + size > self.max_bytes:
+            self._open_part()
+            part = self.parts[-1]
+            media = [Path(path) for path in media_paths]
+            size = _note_size(note) + sum(path.stat().st_size for path in media)
+
+        part.add(note)
+        for path in media:
+            part.add_media(path)
+        self._size += size
+        self.note_count += 1
+
+    def close(self):
+        """写出全部分卷；只有一卷时使用原文件名（重复调用无操作）"""
+        if self._closed:
+            return
+        self._closed = True
+        for part in self.parts:
+            part.close()
+            self.deck_ids.update(part.deck_ids)
+            self.media_files.update(part.media_files)
+
+        if len(self.parts) == 1:
+            os.replace(self.parts[0].path, self.path)
+            self.paths = [str(self.path)]
+        else:
+            self.paths = [part.path for part in self.parts]
+
+    def unlink(self):
+        """删除已写出的分卷"""
+        for path in self.paths:
+            Path(path).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,29 +1,37 @@
 #!/usr/bin/env python3
 """
-Notion to Anki 同步模块 (API 2025-09-03)
+Notion to Anki 同步引擎 (API 2025-09-03)
 
 功能:
-- 从 Notion 数据库查询未同步的卡片
+- 从 Notion "Anki Cards" 和 Cortex 数据库并发查询未同步的卡片（可扩展的卡片来源，分页查询 + 重试）
 - 使用 genanki 生成 .apkg 文件
-- 通过 Telegram Bot 发送文件
-- 更新 Notion 同步状态
+- 通过 Telegram Bot 发送文件（超过上传限制时分卷，内容与上次相同时跳过，小批量可按摘要模式累积），
+  或经 AnkiConnect 直接推送到桌面 Anki
+- 更新 Notion 同步状态；账本模式（sync.selection = "ledger"）下由本地账本判断未同步，写回可关闭
+- 查询、转换、组包、写回以流水线方式并发执行（阶段间为有界队列）
+- 各阶段耗时（query / convert / package / deliver / write_back）写入同步状态，保留最近的历史
+
+scripts/sync_notion_anki.py 是 LifeOS 的入口（LifeOS 路径与默认值），
+python -m notion_kit.anki_sync 使用本模块目录下的默认路径。
 
 使用方法:
     from notion_kit.anki_sync import AnkiSyncManager
 
-    manager = AnkiSyncManager()
+    manager = AnkiSyncManager(config_path="anki_config.json", data_dir="data")
     manager.run()
 """
 
 import os
 import sys
 import json
-import hashlib
-import requests
 import argparse
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 # 导入 genanki
@@ -36,92 +44,229 @@ except ImportError:
 
 # 导入 notion_client
 try:
-    from notion_client import Client
-    from notion_client.errors import APIResponseError
+    import httpx
+    import notion_client  # 只检查依赖（NotionHTTP.sdk 使用）
 except ImportError:
     print("❌ 缺少依赖: notion-client")
     print("请运行: pip install notion-client")
     sys.exit(1)
 
+try:
+    from .notion_http import get_http
+    from .notion_mirror import NotionMirror, ANKI_CARD_PROPERTIES, CORTEX_CARD_PROPERTIES
+    from .notion_blocks import BlockFetcher
+    from .notion_html import blocks_html
+    from .media_store import MediaStore, referenced_media
+    from .batch_writer import BatchWriter
+    from .notion_meta import get_metadata_cache
+    from .anki_ledger import NoteLedger
+    from .anki_notes import anki_guid, convert_item, convert_page
+    from .anki_package import SplitPackage
+    from .anki_connect import AnkiConnect, AnkiConnectError, AnkiConnectTarget
+    from .card_sources import AnkiCardsSource, CardSource, CortexSource, LedgerSource, collect
+    from .pipeline import Channel, PhaseTimer, parallel_map
+    from .telegram_delivery import TelegramSender, UPLOAD_LIMIT
+except ImportError:
+    from notion_http import get_http
+    from notion_mirror import NotionMirror, ANKI_CARD_PROPERTIES, CORTEX_CARD_PROPERTIES
+    from notion_blocks import BlockFetcher
+    from notion_html import blocks_html
+    from media_store import MediaStore, referenced_media
+    from batch_writer import BatchWriter
+    from notion_meta import get_metadata_cache
+    from anki_ledger import NoteLedger
+    from anki_notes import anki_guid, convert_item, convert_page
+    from anki_package import SplitPackage
+    from anki_connect import AnkiConnect, AnkiConnectError, AnkiConnectTarget
+    from card_sources import AnkiCardsSource, CardSource, CortexSource, LedgerSource, collect
+    from pipeline import Channel, PhaseTimer, parallel_map
+    from telegram_delivery import TelegramSender, UPLOAD_LIMIT
+
 # 默认路径配置（相对于本模块）
 MODULE_DIR = Path(__file__).parent
 DEFAULT_ENV_PATH = MODULE_DIR / ".env"
 DEFAULT_CONFIG_PATH = MODULE_DIR / "anki_config.json"
 DEFAULT_STATE_PATH = MODULE_DIR / "anki_state.json"
 DEFAULT_OUTPUT_DIR = MODULE_DIR / "output"
+DEFAULT_DATA_DIR = MODULE_DIR / "data"
+
+# 数据目录下的文件（本地镜像、缓存、账本）
+MIRROR_NAME = "notion_mirror.db"
+BODY_CACHE_NAME = Path("cache") / "page_bodies"
+META_CACHE_NAME = Path("cache") / "notion_metadata.json"
+LEDGER_NAME = "anki_ledger.tsv"
+MEDIA_NAME = Path("cache") / "media"
+ANKI_CONNECT_MAP_NAME = "anki_connect_notes.tsv"
+
+# AnkiConnect 交付的账本与已推送媒体记录（与 .apkg 交付分开：两种交付各自记录目标端已有的内容）
+ANKI_CONNECT_LEDGER_NAME = "anki_connect_ledger.tsv"
+ANKI_CONNECT_SHIPPED_NAME = "shipped_anki_connect.txt"
+
+# 交付方式（记录在同步状态中，切换需显式确认）
+DELIVERY_APKG = "apkg"
+DELIVERY_ANKI_CONNECT = "anki_connect"
+
+# 完整牌组：每批转换的页面数（限制内存）；少于 FULL_DECK_POOL_MIN 张时不启用进程池
+FULL_DECK_WINDOW = 2000
+FULL_DECK_POOL_MIN = 1000
+
+# 流水线各阶段之间的队列上限（页面数）
+PIPELINE_QUEUE_SIZE = 200
+
+# AnkiConnect 每次推送的笔记数
+ANKI_CONNECT_BATCH = 500
+
+# 分卷大小上限（MB）：按未压缩大小估算，低于 Bot API 的 50 MB 并留出余量
+TELEGRAM_PART_MB = 45
+
+# 同步状态中保留的阶段耗时记录数
+TIMING_HISTORY = 30
+
+# 计时的阶段（按流水线顺序）
+PHASES = ("query", "convert", "package", "deliver", "write_back")
 
 
 class AnkiSyncManager:
     """Anki 同步管理器"""
 
+    # 配置文件不存在时使用的 Anki 设置
+    anki_defaults = {
+        "deck_prefix": "NotionKit",
+        "model_name": "NotionKit Basic",
+        "model_id": 1607392319,
+        "default_deck": "General"
+    }
+
     def __init__(
         self,
         dry_run: bool = False,
+        no_delta: bool = False,
+        full_deck: bool = False,
+        anki_connect: bool = False,
+        switch_delivery: bool = False,
         env_path: Optional[Path] = None,
         config_path: Optional[Path] = None,
         state_path: Optional[Path] = None,
         output_dir: Optional[Path] = None,
+        data_dir: Optional[Path] = None,
     ):
         """
         初始化同步管理器
 
         Args:
-            dry_run: 试运行模式（不实际更新 Notion 或发送 Telegram）
+            dry_run: 是否为试运行模式（不实际更新 Notion 或发送 Telegram）
+            no_delta: 忽略内容账本，本批卡片全部打包
+            full_deck: 从本地镜像重建完整牌组（同 sync.generate_full_deck）
+            anki_connect: 经 AnkiConnect 直接推送（同 anki_connect.enabled）
+            switch_delivery: 切换交付方式（.apkg ↔ AnkiConnect），本次重新交付镜像中的全部卡片
             env_path: .env 文件路径
             config_path: 配置文件路径
             state_path: 状态文件路径
-            output_dir: 输出目录
+            output_dir: .apkg 输出目录
+            data_dir: 数据目录（本地镜像、正文与媒体缓存、内容账本）
         """
         self.dry_run = dry_run
+        self.no_delta = no_delta
+        self.full_deck = full_deck
 
         # 路径配置
-        self.env_path = env_path or DEFAULT_ENV_PATH
-        self.config_path = config_path or DEFAULT_CONFIG_PATH
-        self.state_path = state_path or DEFAULT_STATE_PATH
-        self.output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        self.env_path = Path(env_path or DEFAULT_ENV_PATH)
+        self.config_path = Path(config_path or DEFAULT_CONFIG_PATH)
+        self.state_path = Path(state_path or DEFAULT_STATE_PATH)
+        self.output_dir = Path(output_dir or DEFAULT_OUTPUT_DIR)
+        self.data_dir = Path(data_dir or DEFAULT_DATA_DIR)
+        self.mirror_path = self.data_dir / MIRROR_NAME
 
         # 确保输出目录存在
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
 
         # 加载环境变量
         load_dotenv(self.env_path)
 
-        # 加载配置和状态
+        # 各阶段耗时（写入同步状态）
+        self.timer = PhaseTimer()
+
         self.config = self._load_config()
+        self.config.setdefault("anki_connect", self._get_default_config()["anki_connect"])
         self.state = self._load_state()
 
+        # 交付方式：.apkg 与 AnkiConnect 互斥，各自维护账本和已推送媒体
+        connect_enabled = anki_connect or self.config["anki_connect"].get("enabled")
+        self.delivery = DELIVERY_ANKI_CONNECT if connect_enabled else DELIVERY_APKG
+        # 确认切换后本次运行重新交付镜像中的全部卡片
+        self.redeliver = self._check_delivery(switch_delivery)
+
         # 初始化 Notion 客户端
         self.notion_token = os.getenv("NOTION_TOKEN")
         self.anki_database_id = os.getenv("ANKI_DATABASE_ID")
-        self.cortex_database_id = os.getenv("DATABASE_ID")
+        self.cortex_database_id = os.getenv("DATABASE_ID")  # Cortex database
 
         if not self.notion_token:
-            raise ValueError("❌ 未找到 NOTION_TOKEN，请在 .env 中设置")
+            raise ValueError(f"❌ 未找到 NOTION_TOKEN，请在 {self.env_path} 中设置")
+        if not self.anki_database_id:
+            raise ValueError("❌ 未找到 ANKI_DATABASE_ID，请运行: python3 scripts/setup_anki_database.py")
 
-        # 使用 Notion API 2025-09-03
-        self.notion = Client(auth=self.notion_token, notion_version="2025-09-03")
+        # 使用 Notion API 2025-09-03（共享连接池）
+        self.http = get_http(self.notion_token)
+        self.notion = self.http.sdk()
 
-        # 获取 data_source_id
-        if self.anki_database_id:
-            self.anki_data_source_id = self._get_data_source_id(self.anki_database_id)
-        else:
-            self.anki_data_source_id = None
+        # 获取 data_source_id for both databases（元数据缓存在磁盘，TTL 内不再请求）
+        self.meta = get_metadata_cache(self.http, self.data_dir / META_CACHE_NAME)
+        self.anki_data_source_id = self.meta.data_source_id(self.anki_database_id)
+        self.cortex_data_source_id = self.meta.data_source_id(self.cortex_database_id) if self.cortex_database_id else None
 
-        if self.cortex_database_id:
-            self.cortex_data_source_id = self._get_data_source_id(self.cortex_database_id)
-        else:
-            self.cortex_data_source_id = None
+        # Anki Cards 本地镜像（增量刷新）
+        self.mirror = NotionMirror(self.mirror_path, self.anki_data_source_id, self.http,
+                                   properties=ANKI_CARD_PROPERTIES, meta=self.meta)
+
+        # 已发送笔记的内容哈希（只打包新增或变化的笔记；账本模式下同时决定哪些页面未同步）
+        ledger_name = ANKI_CONNECT_LEDGER_NAME if connect_enabled else LEDGER_NAME
+        self.ledger = NoteLedger(self.data_dir / ledger_name)
+        if self.redeliver:
+            # 新方式的账本可能是上次使用该方式时留下的，已经过期
+            self.ledger.reset()
+
+        # 卡片来源（并发查询，页面带来源标注）
+        self.sources = self._card_sources()
+
+        # 正文中的图片/附件（按内容 SHA-256 存储，跨卡片、跨运行去重）
+        shipped_name = ANKI_CONNECT_SHIPPED_NAME if connect_enabled else "shipped.txt"
+        self.media = MediaStore(self.data_dir / MEDIA_NAME, shipped_name=shipped_name)
+        if self.redeliver:
+            self.media.reset_shipped()
+
+        # Cortex 页面正文（并发获取，渲染为 HTML，按 last_edited_time 缓存）
+        self.block_fetcher = BlockFetcher(self.http, self.data_dir / BODY_CACHE_NAME, render=blocks_html, media_store=self.media)
+
+        # 同步状态写回（有界线程池，限流与重试由连接池负责）
+        self.writer = BatchWriter(self.http, timer=self.timer)
+
+        self.package_note_count = 0
+
+        # 账本模式：写回后页面新的 last_edited_time（page_id → 时间），写回结束后记入账本
+        self._write_back_edits: Dict[str, str] = {}
 
-        # Telegram 配置
+        # Telegram 配置（所有分卷和消息共用一个连接池）
         self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        self.telegram = None
+        if self.telegram_token and self.telegram_chat_id:
+            self.telegram = TelegramSender(self.telegram_token, self.telegram_chat_id)
 
         # Anki 模型
         self.anki_model = self._create_anki_model()
 
+        # AnkiConnect 直连交付（不生成 .apkg）
+        self.anki_connect = None
+        if connect_enabled:
+            connect = AnkiConnect(self.config["anki_connect"].get("url"))
+            self.anki_connect = AnkiConnectTarget(connect, self.anki_model, self.data_dir / ANKI_CONNECT_MAP_NAME)
+
     def _load_config(self) -> Dict:
         """加载配置文件"""
         if not self.config_path.exists():
+            print(f"⚠️  配置文件不存在: {self.config_path}")
             return self._get_default_config()
 
         with open(self.config_path, 'r', encoding='utf-8') as f:
@@ -130,19 +275,26 @@ class AnkiSyncManager:
     def _get_default_config(self) -> Dict:
         """获取默认配置"""
         return {
-            "anki": {
-                "deck_prefix": "NotionKit",
-                "model_name": "NotionKit Basic",
-                "model_id": 1607392319,
-                "default_deck": "General"
-            },
+            "anki": dict(self.anki_defaults),
             "telegram": {
                 "enabled": True,
-                "send_empty_report": False
+                "send_empty_report": False,
+                "max_part_mb": TELEGRAM_PART_MB,
+                "digest": {
+                    "min_cards": 0,
+                    "max_hours": 24
+                }
             },
             "sync": {
+                "selection": "properties",
                 "update_notion_status": True,
-                "generate_full_deck": False
+                "generate_full_deck": False,
+                "full_deck_interval_days": 0
+            },
+            "anki_connect": {
+                "enabled": False,
+                "url": None,
+                "batch_size": ANKI_CONNECT_BATCH
             }
         }
 
@@ -152,6 +304,7 @@ class AnkiSyncManager:
             return {
                 "last_sync": None,
                 "synced_cards": {},
+                "pending_writebacks": {},
                 "stats": {
                     "total_synced": 0,
                     "last_batch_count": 0
@@ -161,29 +314,41 @@ class AnkiSyncManager:
         with open(self.state_path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
+    def _check_delivery(self, switch: bool) -> bool:
+        """
+        确认交付方式与上次同步一致
+
+        两种方式各有账本，另一方式的账本不能说明本方式已交付了什么；切换时重新交付
+        镜像中的全部卡片。AnkiConnect 按牌组 + Front 找到从 .apkg 导入的笔记并更新；
+        反过来，AnkiConnect 新建的笔记 GUID 由 Anki 生成，导入 .apkg 后会多出一份。
+
+        Args:
+            switch: 是否允许切换
+
+        Returns:
+            是否需要重新交付全部卡片（切换完成前，下次运行仍需确认）
+        """
+        recorded = self.state.get("delivery")
+        if not recorded or recorded == self.delivery:
+            return False
+        if not switch:
+            raise ValueError(
+                f"❌ 上次同步使用 {recorded} 交付，本次配置为 {self.delivery}；"
+                f"切换会重新交付全部卡片，确认请使用 --switch-delivery"
+            )
+        print(f"⚠️  交付方式由 {recorded} 切换为 {self.delivery}，重新交付镜像中的全部卡片")
+        return True
+
     def _save_state(self):
         """保存同步状态"""
         if self.dry_run:
             print("   [Dry Run] 跳过保存状态")
             return
 
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
         with open(self.state_path, 'w', encoding='utf-8') as f:
             json.dump(self.state, f, indent=2, ensure_ascii=False)
 
-    def _get_data_source_id(self, database_id: str) -> str:
-        """获取数据源 ID (API 2025-09-03)"""
-        try:
-            database = self.notion.databases.retrieve(database_id)
-            data_sources = database.get("data_sources", [])
-
-            if data_sources:
-                return data_sources[0]["id"]
-            else:
-                return database_id
-        except Exception as e:
-            print(f"⚠️  获取 data_source_id 失败: {e}")
-            return database_id
-
     def _create_anki_model(self) -> genanki.Model:
         """创建 Anki 卡片模型"""
         model_id = self.config["anki"]["model_id"]
@@ -218,262 +383,325 @@ class AnkiSyncManager:
                 border: none;
                 border-top: 1px solid #ddd;
             }
+            .card ul, .card ol, .card pre, .card blockquote {
+                text-align: left;
+            }
+            .card pre, .card code {
+                font-family: Menlo, Consolas, monospace;
+                font-size: 0.85em;
+                background-color: #f6f8fa;
+                border-radius: 4px;
+            }
+            .card pre {
+                padding: 10px;
+                overflow-x: auto;
+            }
             '''
         )
 
-    def query_unsynced_cards(self) -> List[Dict]:
-        """查询未同步的卡片"""
-        print("🔍 查询未同步的卡片...")
-
-        all_cards = []
+    def _ledger_mode(self) -> bool:
+        """账本模式：未同步 = 未导出或导出后又被编辑过的页面（按本地账本判断）"""
+        return self.config["sync"].get("selection") == "ledger"
 
-        # 1. 查询 Anki Cards 数据库（Synced = false）
-        if self.anki_data_source_id:
-            anki_filter = {
-                "property": "Synced",
-                "checkbox": {"equals": False}
-            }
-            cards = self._query_database(
-                self.anki_data_source_id,
-                anki_filter,
-                "Anki Cards"
-            )
-            all_cards.extend(cards)
+    def _cortex_mirror(self) -> NotionMirror:
+        """Cortex 本地镜像（与 Anki Cards 共用数据库文件）"""
+        return NotionMirror(self.mirror_path, self.cortex_data_source_id, self.http,
+                            properties=CORTEX_CARD_PROPERTIES, meta=self.meta)
 
-        # 2. 查询 Cortex 数据库（Last Reviewed 为空）
+    def _card_sources(self) -> List[CardSource]:
+        """启用的卡片来源（新增来源在此加入，与已有来源并发查询）"""
+        sources: List[CardSource] = [AnkiCardsSource(self.mirror)]
         if self.cortex_data_source_id:
-            cortex_filter = {
-                "property": "Last Reviewed",
-                "date": {"is_empty": True}
-            }
-            cards = self._query_database(
-                self.cortex_data_source_id,
-                cortex_filter,
-                "Cortex"
-            )
-            all_cards.extend(cards)
-
+            sources.append(CortexSource(self.http, self.cortex_data_source_id, self.meta))
+        if self._ledger_mode() or self.redeliver:
+            # 两个数据库都走本地镜像增量刷新，按账本中的 last_edited_time 选出待导出的页面
+            # （重新交付时账本已清空，选出全部页面，包括已同步的）
+            mirrors = [self.mirror] + ([self._cortex_mirror()] if self.cortex_data_source_id else [])
+            sources = [LedgerSource(source, mirror, self.ledger) for source, mirror in zip(sources, mirrors)]
+        return sources
+
+    def query_unsynced_cards(self) -> List[Tuple[CardSource, Dict]]:
+        """查询未同步的卡片（所有来源），返回 (来源, 页面) 列表"""
+        print("🔍 查询未同步的卡片...")
+        all_cards = list(self.iter_unsynced_cards())
         print(f"   总计找到 {len(all_cards)} 张未同步的卡片")
         return all_cards
 
-    def _query_database(self, data_source_id: str, filter_obj: Dict, db_name: str) -> List[Dict]:
-        """查询单个数据库"""
-        try:
-            url = f"https://api.notion.com/v1/data_sources/{data_source_id}/query"
-            headers = {
-                "Authorization": f"Bearer {self.notion_token}",
-                "Content-Type": "application/json",
-                "Notion-Version": "2025-09-03"
-            }
+    def iter_unsynced_cards(self):
+        """并发查询所有来源，边查询边产出 (来源, 页面)（流水线的查询阶段）"""
+        # 已发送但写回失败的页面不再重复发送（重新交付时也要发送）
+        pending = {} if self.redeliver else self.state.get("pending_writebacks") or {}
+        return collect(self.sources, skip=pending, maxsize=PIPELINE_QUEUE_SIZE, timer=self.timer)
 
-            response = requests.post(
-                url,
-                headers=headers,
-                json={"filter": filter_obj},
-                timeout=30
-            )
+    def _note_media(self, note: Dict, full: bool = False, include_staged: bool = False) -> List[str]:
+        """
+        笔记引用的、需要随包附带的媒体文件（并记入暂存）
 
-            if response.status_code != 200:
-                print(f"   ⚠️  {db_name} 查询失败: {response.status_code}")
-                return []
+        Args:
+            note: convert_page 的输出
+            full: 完整牌组（附带全部引用的文件）
+            include_staged: 也返回本次已暂存的文件（分卷包按卷去重，每卷附带自己引用的媒体）
 
-            data = response.json()
-            cards = data.get("results", [])
-            print(f"   从 {db_name} 找到 {len(cards)} 张卡片")
-            return cards
-        except Exception as e:
-            print(f"   ⚠️  {db_name} 查询错误: {e}")
-            return []
+        Returns:
+            媒体文件路径列表；增量包只包含手机端还没有的文件
+        """
+        paths = []
+        for name in referenced_media(" ".join(note["fields"])):
+            if name in self.media.staged and not include_staged:
+                continue
+            if not full and self.media.is_shipped(name):
+                continue
+            if not self.media.has(name):
+                print(f"   ⚠️  媒体文件缺失: {name}")
+                continue
+            self.media.stage(name)
+            paths.append(str(self.media.path(name)))
+        return paths
+
+    def _full_deck_due(self) -> bool:
+        """本次运行是否生成完整牌组（命令行、配置开关或定期重建到期）"""
+        sync_config = self.config["sync"]
+        if self.full_deck or sync_config.get("generate_full_deck"):
+            return True
 
-    def _extract_property(self, page: Dict, prop_name: str, prop_type: str) -> Optional[str]:
-        """提取页面属性"""
-        props = page.get("properties", {})
-        prop = props.get(prop_name)
+        interval = sync_config.get("full_deck_interval_days", 0)
+        if not interval:
+            return False
+        last = self.state.get("last_full_deck")
+        return not last or datetime.now() - datetime.fromisoformat(last) >= timedelta(days=interval)
 
-        if not prop:
-            return None
+    def _full_deck_items(self):
+        """逐个产出 (page, body, deck_prefix, source_name)：Anki Cards 全部页面 + Cortex 全部页面"""
+        deck_prefix = self.config["anki"]["deck_prefix"]
 
-        if prop_type == "title":
-            titles = prop.get("title", [])
-            return titles[0]["plain_text"] if titles else None
-        elif prop_type == "rich_text":
-            texts = prop.get("rich_text", [])
-            return texts[0]["plain_text"] if texts else None
-        elif prop_type == "select":
-            select = prop.get("select")
-            return select["name"] if select else None
-        elif prop_type == "multi_select":
-            items = prop.get("multi_select", [])
-            return [item["name"] for item in items]
-        elif prop_type == "url":
-            return prop.get("url")
-        elif prop_type == "checkbox":
-            return prop.get("checkbox", False)
-
-        return None
-
-    def _is_cortex_card(self, page: Dict) -> bool:
-        """判断是否为 Cortex 数据库的卡片"""
-        props = page.get("properties", {})
-        has_name = "Name" in props and props["Name"].get("type") == "title"
-        has_type = "Type" in props and props["Type"].get("type") == "select"
-        has_status = "Status" in props and props["Status"].get("type") == "select"
-        return has_name and has_type and has_status
-
-    def _get_page_content(self, page_id: str) -> str:
-        """获取页面正文内容"""
-        try:
-            blocks = self.notion.blocks.children.list(page_id)
-            content_parts = []
-
-            for block in blocks.get("results", []):
-                block_type = block.get("type")
-                if block_type in ["paragraph", "bulleted_list_item", "numbered_list_item", "heading_1", "heading_2", "heading_3"]:
-                    texts = block.get(block_type, {}).get("rich_text", [])
-                    for text in texts:
-                        content_parts.append(text.get("plain_text", ""))
-
-            return "\n".join(content_parts).strip()
-        except Exception as e:
-            print(f"   ⚠️  获取页面内容失败 {page_id[:8]}: {e}")
-            return ""
-
-    def _convert_cortex_to_anki(self, page: Dict) -> tuple:
-        """将 Cortex 条目转换为 Anki 卡片格式"""
-        name = self._extract_property(page, "Name", "title")
-        source = self._extract_property(page, "Source", "rich_text") or ""
-        tags = self._extract_property(page, "Tags", "multi_select") or []
-        page_id = page["id"]
-
-        if not name:
-            return None, None, None, None, None
-
-        back = self._get_page_content(page_id)
-        if not back:
-            back = "（无内容）"
-
-        front = name
-        deck = "Vocabulary"
-
-        # 处理不同类型的条目
-        if name.startswith("翻译："):
-            front = name.replace("翻译：", "").strip()
-            deck = "Translation"
-        elif name.startswith("单词："):
-            front = name.replace("单词：", "").strip()
-            deck = "Vocabulary"
-        elif name.startswith("短语："):
-            front = name.replace("短语：", "").strip()
-            deck = "Phrases"
-
-        if "Cortex" not in tags:
-            tags.append("Cortex")
-
-        return front, back, deck, source, tags
-
-    def generate_anki_guid(self, notion_page_id: str) -> int:
-        """从 Notion Page ID 生成稳定的 Anki GUID"""
-        hash_hex = hashlib.md5(notion_page_id.encode()).hexdigest()
-        return int(hash_hex[:15], 16)
-
-    def create_anki_package(self, cards: List[Dict]) -> Optional[str]:
-        """创建 Anki .apkg 文件"""
-        if not cards:
-            print("⚠️  没有卡片需要同步")
-            return None
+        for page in self.mirror.iter_pages():
+            yield page, None, deck_prefix, AnkiCardsSource.name
 
-        print(f"📦 生成 Anki 包...")
+        if not self.cortex_data_source_id:
+            return
 
-        decks = {}
-        deck_prefix = self.config["anki"]["deck_prefix"]
+        # Cortex 同样走本地镜像，正文来自磁盘缓存（只获取缓存中缺失或已修改的页面）
+        cortex_mirror = self._cortex_mirror()
+        cortex_mirror.refresh()
+        pages = cortex_mirror.iter_pages()
+        while True:
+            window = list(islice(pages, FULL_DECK_WINDOW))
+            if not window:
+                break
+            bodies = self.block_fetcher.fetch_bodies(window)
+            for page in window:
+                yield page, bodies.get(page["id"]), deck_prefix, CortexSource.name
+        cortex_mirror.close()
+
+    def _part_bytes(self) -> int:
+        """每个分卷的大小上限（字节）"""
+        mb = self.config["telegram"].get("max_part_mb", TELEGRAM_PART_MB)
+        return min(int(mb * 1024 * 1024), UPLOAD_LIMIT)
+
+    def build_full_deck(self) -> Optional[List[str]]:
+        """
+        从本地镜像重建完整牌组（schema 变更或手机重置后使用）
 
-        for page in cards:
-            if self._is_cortex_card(page):
-                front, back, deck_name, source, tags = self._convert_cortex_to_anki(page)
-                if not front or not back:
-                    print(f"   ⏭️  跳过: Cortex 卡片转换失败")
-                    continue
-            else:
-                front = self._extract_property(page, "Front", "title")
-                back = self._extract_property(page, "Back", "rich_text")
-                deck_name = self._extract_property(page, "Deck", "select")
-                source = self._extract_property(page, "Source", "url") or ""
-                tags = self._extract_property(page, "Tags", "multi_select") or []
-
-                if not front or not back:
-                    print(f"   ⏭️  跳过: 缺少 Front 或 Back")
-                    continue
+        页面按批从 SQLite 读取，在进程池中转换，逐条写入包；内存占用与卡片总数无关。
+        超过上传限制时自动分卷。
 
-            full_deck_name = f"{deck_prefix}::{deck_name}" if deck_name else deck_prefix
+        Returns:
+            .apkg 路径列表（分卷）；没有卡片返回 None
+        """
+        print("📦 生成完整牌组（本地镜像）...")
+        self.package_note_count = 0
+        skipped = 0
 
-            if full_deck_name not in decks:
-                deck_id = abs(hash(full_deck_name)) % (10 ** 10)
-                decks[full_deck_name] = genanki.Deck(deck_id, full_deck_name)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = self.output_dir / f"anki_full_{timestamp}.apkg"
 
-            guid = self.generate_anki_guid(page["id"])
+        # 小牌组直接在本进程转换，避免进程池启动开销
+        pool = ProcessPoolExecutor() if self.mirror.count() >= FULL_DECK_POOL_MIN else None
+        # 读取镜像与获取 Cortex 正文计入 query，等待转换结果计入 convert
+        items = self.timer.iter("query", self._full_deck_items())
+        try:
+            with SplitPackage(output_file, self.anki_model, self._part_bytes()) as package:
+                while True:
+                    window = list(islice(items, FULL_DECK_WINDOW))
+                    if not window:
+                        break
+                    notes = pool.map(convert_item, window, chunksize=200) if pool else map(convert_item, window)
+                    for note in self.timer.iter("convert", notes):
+                        if not note:
+                            skipped += 1
+                            continue
+                        with self.timer.phase("package"):
+                            package.add(note, self._note_media(note, full=True, include_staged=True))
+                        self.ledger.stage(note["guid"], note["hash"], note["page_id"], note["edited"])
+                with self.timer.phase("package"):
+                    package.close()
+                self.package_note_count = package.note_count
+                deck_count = len(package.deck_ids)
+                media_count = len(package.media_files)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        if skipped:
+            print(f"   ⏭️  跳过 {skipped} 张缺少 Front 或 Back 的卡片")
+        if not self.package_note_count:
+            package.unlink()
+            print("⚠️  本地镜像中没有卡片")
+            return None
 
-            note = genanki.Note(
-                model=self.anki_model,
-                fields=[front, back, source],
-                guid=guid,
-                tags=tags
-            )
+        print(f"✅ 完整牌组已生成: {', '.join(Path(path).name for path in package.paths)}")
+        print(f"   包含 {deck_count} 个牌组，共 {self.package_note_count} 张卡片，{media_count} 个媒体文件")
+        return package.paths
 
-            decks[full_deck_name].add_note(note)
-            print(f"   ✓ {front[:30]}... → {full_deck_name}")
+    def _delivery_accepted(self, delivered: bool) -> bool:
+        """包已交付：发送成功，或未启用/未配置 Telegram（以本地 .apkg 文件交付）"""
+        telegram_active = (self.config["telegram"]["enabled"]
+                           and self.telegram_token and self.telegram_chat_id)
+        return bool(delivered or not telegram_active)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = self.output_dir / f"anki_sync_{timestamp}.apkg"
+    def _commit_ledger(self, delivered: bool, full: bool = False):
+        """
+        包交付后提交内容账本和已发送的媒体记录
 
-        package = genanki.Package(list(decks.values()))
-        package.write_to_file(str(output_file))
+        Args:
+            delivered: 是否已发送
+            full: 完整牌组（账本以本次内容为准重建）
+        """
+        if self.dry_run:
+            self.ledger.discard()
+            self.media.discard()
+            return
+        if self._delivery_accepted(delivered):
+            self.ledger.commit(replace=full)
+            self.media.commit(replace=full)
+            # 交付成功后才记录交付方式：切换时的重新交付失败，下次运行仍需确认并重新交付
+            self.state["delivery"] = self.delivery
+            if full:
+                self.state["last_full_deck"] = datetime.now().isoformat()
+        else:
+            # 发送失败：下次运行重新打包这些笔记和媒体
+            self.ledger.discard()
+            self.media.discard()
 
-        print(f"✅ Anki 包已生成: {output_file}")
-        print(f"   包含 {len(decks)} 个牌组，共 {len(cards)} 张卡片")
+    def send_to_telegram(self, paths: List[str], card_count: int, content_hash: Optional[str] = None) -> bool:
+        """
+        发送 .apkg 文件（或全部分卷）到 Telegram
 
-        return str(output_file)
+        Args:
+            paths: .apkg 路径列表
+            card_count: 包含的卡片数
+            content_hash: 包内容哈希（与上次成功发送的相同则跳过）
 
-    def send_to_telegram(self, file_path: str, card_count: int) -> bool:
-        """发送 .apkg 文件到 Telegram"""
+        Returns:
+            是否已送达（内容与上次相同视为已送达）
+        """
         if not self.config["telegram"]["enabled"]:
             print("⏭️  Telegram 发送已禁用")
             return False
 
-        if not self.telegram_token or not self.telegram_chat_id:
+        if not self.telegram:
             print("⚠️  Telegram 未配置，跳过发送")
+            print("   设置 TELEGRAM_BOT_TOKEN 和 TELEGRAM_CHAT_ID 环境变量")
             return False
 
+        if content_hash and content_hash == self.state.get("last_package_hash"):
+            print("⏭️  包内容与上次发送的相同，跳过发送")
+            return True
+
         if self.dry_run:
-            print(f"   [Dry Run] 跳过发送到 Telegram: {file_path}")
+            print(f"   [Dry Run] 跳过发送到 Telegram: {', '.join(paths)}")
             return True
 
-        print("📤 发送到 Telegram...")
+        print(f"📤 发送到 Telegram{f'（{len(paths)} 个分卷）' if len(paths) > 1 else ''}...")
 
-        url = f"https://api.telegram.org/bot{self.telegram_token}/sendDocument"
         caption = f"🎴 Anki 卡片同步\n\n📊 本次同步: {card_count} 张\n📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        with self.timer.phase("deliver"):
+            sent = self.telegram.send_documents(paths, caption)
+        if not sent:
+            return False
 
-        try:
-            with open(file_path, 'rb') as f:
-                response = requests.post(
-                    url,
-                    files={'document': f},
-                    data={'chat_id': self.telegram_chat_id, 'caption': caption},
-                    timeout=30
-                )
-
-            if response.status_code == 200:
-                print("✅ 已发送到 Telegram")
-                return True
-            else:
-                print(f"❌ Telegram 发送失败: {response.text}")
-                return False
+        print("✅ 已发送到 Telegram")
+        self.state["last_package_hash"] = content_hash
+        self.state["last_delivery"] = datetime.now().isoformat()
+        return True
+
+    def _digest_hold(self, card_count: int, content_hash: str) -> bool:
+        """
+        摘要模式：卡片数少于 digest.min_cards 且距上次发送不到 digest.max_hours 时暂不发送
 
-        except Exception as e:
-            print(f"❌ Telegram 发送错误: {e}")
+        暂缓的卡片保持未同步，下次运行与新卡片一起打包。
+        内容与上次发送的相同时不暂缓（send_to_telegram 直接跳过，卡片立即写回）。
+        """
+        digest = self.config["telegram"].get("digest") or {}
+        min_cards = digest.get("min_cards", 0)
+        # 未启用 Telegram 时以本地文件交付，不需要累积
+        if not min_cards or card_count >= min_cards or self._delivery_accepted(False):
+            return False
+        if content_hash == self.state.get("last_package_hash"):
             return False
 
-    def update_notion_sync_status(self, cards: List[Dict]):
-        """更新 Notion 中的同步状态"""
+        last = self.state.get("last_delivery")
+        max_hours = digest.get("max_hours", 24)
+        return bool(last) and datetime.now() - datetime.fromisoformat(last) < timedelta(hours=max_hours)
+
+    def _on_write_back(self, page_id: str, result: Dict, properties: Dict):
+        """记录单个页面的写回结果（失败页面留待下次运行重试）"""
+        pending = self.state.setdefault("pending_writebacks", {})
+        if result["ok"]:
+            pending.pop(page_id, None)
+            if self._ledger_mode() and result.get("edited"):
+                self._write_back_edits[page_id] = result["edited"]
+            print(f"   ✓ 已更新: {page_id[:8]}...")
+        elif result["status"] == 404 or "archived" in (result["error"] or ""):
+            # 页面已在 Notion 中删除或归档，重试没有意义
+            pending.pop(page_id, None)
+            print(f"   ⏭️  页面已删除，跳过写回: {page_id[:8]}...")
+        else:
+            pending[page_id] = properties
+            print(f"   ❌ 更新失败 {page_id[:8]}: {result['error']}")
+
+    def _record_write_back_edits(self):
+        """
+        账本模式：把写回后页面的 last_edited_time 记入账本
+
+        写回本身会修改 last_edited_time；不更新账本的话，下次运行会把刚导出的页面当作已编辑再次选中。
+        """
+        edits, self._write_back_edits = self._write_back_edits, {}
+        if not edits or self.dry_run:
+            return
+        for page_id, edited in edits.items():
+            self.ledger.touch(page_id, edited)
+        self.ledger.save()
+
+    def _write_back(self, updates: Dict[str, Dict]) -> int:
+        """
+        并发写回并记录失败页面（下次运行只重试这些页面）
+
+        Args:
+            updates: page_id → 属性更新体
+
+        Returns:
+            成功更新的页面数
+        """
+        report = self.writer.update_pages(
+            updates, on_result=lambda page_id, result: self._on_write_back(page_id, result, updates[page_id])
+        )
+        self._record_write_back_edits()
+        return sum(1 for result in report.values() if result["ok"])
+
+    def retry_pending_writebacks(self):
+        """重试上次运行写回失败的页面"""
+        pending = self.state.get("pending_writebacks") or {}
+        if not pending or self.dry_run or not self.config["sync"]["update_notion_status"]:
+            return
+
+        print(f"🔁 重试上次写回失败的 {len(pending)} 个页面...")
+        succeeded = self._write_back(dict(pending))
+        print(f"   重试成功 {succeeded} 个，仍失败 {len(pending) - succeeded} 个")
+        self._save_state()
+
+    def update_notion_sync_status(self, cards: List[Tuple[CardSource, Dict]]):
+        """更新 Notion 中的同步状态（有界线程池并发写回）"""
         if not self.config["sync"]["update_notion_status"]:
             print("⏭️  跳过更新 Notion 状态")
             return
@@ -485,96 +713,371 @@ class AnkiSyncManager:
         print(f"📝 更新 Notion 同步状态...")
 
         today = datetime.now().strftime("%Y-%m-%d")
+        updates = {page["id"]: source.synced_properties(today) for source, page in cards}
+        succeeded = self._write_back(updates)
+
+        failed = len(updates) - succeeded
+        if failed:
+            print(f"⚠️  {failed} 张卡片写回失败，已记录，下次运行时重试")
+        print(f"✅ 已更新 {succeeded} 张卡片的同步状态")
+
+    def _convert_for_pipeline(self, item: Tuple[CardSource, Dict]) -> tuple:
+        """流水线转换阶段：按来源获取正文（磁盘缓存）并转换为笔记"""
+        source, page = item
+        body = self.block_fetcher.page_body(page) if source.needs_body else None
+        return source, page, convert_page(page, body, self.config["anki"]["deck_prefix"], source.name)
+
+    @contextmanager
+    def _writeback_stage(self):
+        """
+        写回阶段：后台线程从有界队列取更新，有界线程池并发 PATCH；退出时等待写完并汇报
+
+        Yields:
+            schedule(page_id, properties)：加入写回队列（试运行或关闭写回时忽略）
+        """
+        # 重新交付不改变同步状态：已同步的卡片无需写回（Cortex 写回会覆盖 Status），
+        # 未同步的卡片下次运行内容未变，照常写回
+        write_back = self.config["sync"]["update_notion_status"] and not self.dry_run and not self.redeliver
+        writebacks = Channel(PIPELINE_QUEUE_SIZE)
+        planned: Dict[str, Dict] = {}
+        report: Dict[str, Dict] = {}
+        writer_thread = threading.Thread(target=lambda: report.update(self.writer.stream_updates(
+            writebacks,
+            on_result=lambda page_id, result: self._on_write_back(page_id, result, planned[page_id]),
+        )))
+        writer_thread.start()
+
+        def schedule(page_id: str, properties: Dict):
+            if write_back:
+                planned[page_id] = properties
+                writebacks.put((page_id, properties))
+
+        try:
+            yield schedule
+        finally:
+            writebacks.close()
+            writer_thread.join()
+            self._record_write_back_edits()
+
+        if report:
+            succeeded = sum(1 for result in report.values() if result["ok"])
+            failed = len(report) - succeeded
+            if failed:
+                print(f"⚠️  {failed} 张卡片写回失败，已记录，下次运行时重试")
+            print(f"✅ 已更新 {succeeded} 张卡片的同步状态")
+        elif self.dry_run:
+            print("   [Dry Run] 跳过更新 Notion 状态")
+
+    def _changed_notes(self, schedule, stats: Dict):
+        """
+        查询 → 转换 → 增量筛选：产出需要交付的 (note, 写回更新)
+
+        无法转换或内容未变化的卡片直接交给写回阶段；交付的笔记已暂存到内容账本。
+        账本模式下这些卡片不写回（写回会修改 last_edited_time，使页面再次被选中），
+        而是把当前的 last_edited_time 记入账本。
 
-        for page in cards:
-            page_id = page["id"]
-            try:
-                if self._is_cortex_card(page):
-                    self.notion.pages.update(
-                        page_id=page_id,
-                        properties={
-                            "Status": {"select": {"name": "Learning"}},
-                            "Last Reviewed": {"date": {"start": today}}
-                        }
-                    )
+        Args:
+            schedule: 写回队列（_writeback_stage 提供）
+            stats: 计数 {"seen", "skipped", "unchanged"}（原地累加）
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        # 查询阶段（每个来源一个线程）→ 转换阶段（线程池）→ 调用方（当前线程）
+        pages = self.iter_unsynced_cards()
+        converted = parallel_map(self.timer.wrap("convert", self._convert_for_pipeline), pages,
+                                 workers=self.block_fetcher.max_workers, maxsize=PIPELINE_QUEUE_SIZE)
+        for source, page, note in converted:
+            stats["seen"] += 1
+            update = (page["id"], source.synced_properties(today))
+
+            if not note:
+                print(f"   ⏭️  跳过: 缺少 Front 或 Back")
+                stats["skipped"] += 1
+                if self._ledger_mode():
+                    self.ledger.stage(anki_guid(page["id"]), "", page["id"], page.get("last_edited_time"))
+                    continue
+            elif not self.no_delta and not self.ledger.changed(note["guid"], note["hash"]):
+                # 内容与上次发送的相同：不再重复交付
+                stats["unchanged"] += 1
+                if self._ledger_mode():
+                    self.ledger.stage(note["guid"], note["hash"], page["id"], note["edited"])
+                    continue
+            else:
+                self.ledger.stage(note["guid"], note["hash"], page["id"], note["edited"])
+                yield note, update
+                continue
+            schedule(*update)
+
+    def sync_pipeline(self) -> int:
+        """
+        流水线同步：查询 → 转换（含正文获取）→ 组包 → 写回
+
+        各阶段在独立线程中运行，阶段之间为有界队列，总耗时接近最慢的阶段而不是各阶段之和。
+        无法转换或内容未变化的卡片在组包时立即写回；打包的卡片在包交付后才写回，
+        未送达（或摘要模式暂缓）时保持未同步，下次运行重新发送。
+
+        Returns:
+            本次处理的卡片数
+        """
+        print("🔍 查询并转换未同步的卡片...")
+        self.package_note_count = 0
+        stats = {"seen": 0, "skipped": 0, "unchanged": 0}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = self.output_dir / f"anki_sync_{timestamp}.apkg"
+        shipped = []
+
+        with self._writeback_stage() as schedule:
+            with SplitPackage(output_file, self.anki_model, self._part_bytes()) as package:
+                for note, update in self._changed_notes(schedule, stats):
+                    with self.timer.phase("package"):
+                        package.add(note, self._note_media(note, include_staged=True))
+                    shipped.append(update)
+                    print(f"   ✓ {note['fields'][0][:30]}... → {note['deck']}")
+                with self.timer.phase("package"):
+                    package.close()
+                self.package_note_count = package.note_count
+                deck_count = len(package.deck_ids)
+                media_count = len(package.media_files)
+
+            print(f"   总计处理 {stats['seen']} 张未同步的卡片")
+            if stats["unchanged"]:
+                print(f"   ⏭️  {stats['unchanged']} 张卡片内容未变化，不再重复打包")
+
+            content_hash = self.ledger.staged_digest(self.media.staged)
+            if not self.package_note_count:
+                package.unlink()
+                # 账本模式：记录未变化页面的 last_edited_time
+                self._commit_ledger(delivered=True)
+                if stats["seen"]:
+                    print("✅ 没有新增或变化的笔记，跳过打包")
+            elif not self.redeliver and self._digest_hold(self.package_note_count, content_hash):
+                package.unlink()
+                self.ledger.discard()
+                self.media.discard()
+                print(f"📬 摘要模式：{self.package_note_count} 张卡片暂不发送，下次运行与新卡片一起打包")
+            else:
+                print(f"✅ Anki 包已生成: {', '.join(Path(path).name for path in package.paths)}")
+                print(f"   包含 {deck_count} 个牌组，共 {self.package_note_count} 张卡片，{media_count} 个媒体文件")
+                print()
+
+                delivered = self.send_to_telegram(package.paths, self.package_note_count, content_hash)
+                self._commit_ledger(delivered)
+                if not self._delivery_accepted(delivered):
+                    print(f"⚠️  包未送达，{len(shipped)} 张卡片保持未同步，下次运行重新发送")
                 else:
-                    self.notion.pages.update(
-                        page_id=page_id,
-                        properties={
-                            "Synced": {"checkbox": True},
-                            "Last Synced": {"date": {"start": today}}
-                        }
-                    )
-                print(f"   ✓ 已更新: {page_id[:8]}...")
-            except APIResponseError as e:
-                print(f"   ❌ 更新失败 {page_id[:8]}: {e}")
-
-        print(f"✅ 已更新 {len(cards)} 张卡片的同步状态")
+                    for update in shipped:
+                        schedule(*update)
+        return stats["seen"]
 
-    def run(self):
-        """执行同步流程"""
-        print("=" * 60)
-        print("  Notion → Anki 同步")
-        if self.dry_run:
-            print("  [试运行模式 - 不会实际修改数据]")
-        print("=" * 60)
-        print()
+    def sync_anki_connect(self) -> int:
+        """
+        直连交付：查询 → 转换 → 按批推送到 AnkiConnect → 写回
 
-        cards = self.query_unsynced_cards()
+        每批推送成功的卡片立即写回；推送失败的笔记退出内容账本，下次运行重试。
 
-        if not cards:
-            print("✅ 没有新卡片需要同步")
-            return
+        Returns:
+            本次处理的卡片数
+        """
+        print(f"🔍 查询未同步的卡片，推送到 AnkiConnect ({self.anki_connect.connect.url})...")
+        self.package_note_count = 0
+        stats = {"seen": 0, "skipped": 0, "unchanged": 0}
+        failed = 0
+        batch_size = self.config["anki_connect"].get("batch_size", ANKI_CONNECT_BATCH)
+
+        with self._writeback_stage() as schedule:
+            def flush(batch):
+                nonlocal failed
+                if not batch:
+                    return
+                if self.dry_run:
+                    print(f"   [Dry Run] 跳过推送 {len(batch)} 张卡片")
+                    return
+                media = [path for _, _, paths in batch for path in paths]
+                try:
+                    with self.timer.phase("deliver"):
+                        errors = self.anki_connect.push([note for note, _, _ in batch], media)
+                    failed_media = self.anki_connect.failed_media
+                except (httpx.HTTPError, AnkiConnectError) as e:
+                    errors = {note["page_id"]: str(e) for note, _, _ in batch}
+                    failed_media = [Path(path).name for path in media]
+                for name in failed_media:
+                    self.media.unstage(name)
+                for note, update, _ in batch:
+                    error = errors.get(note["page_id"])
+                    if error:
+                        failed += 1
+                        self.ledger.unstage(note["guid"])
+                        print(f"   ❌ 推送失败 {note['page_id'][:8]}: {error}")
+                    else:
+                        self.package_note_count += 1
+                        schedule(*update)
+                print(f"   📤 已推送 {self.package_note_count} 张卡片")
+
+            batch = []
+            for note, update in self._changed_notes(schedule, stats):
+                batch.append((note, update, self._note_media(note)))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+            flush(batch)
+
+            print(f"   总计处理 {stats['seen']} 张未同步的卡片")
+            if stats["unchanged"]:
+                print(f"   ⏭️  {stats['unchanged']} 张卡片内容未变化，不再重复推送")
+            if failed:
+                print(f"⚠️  {failed} 张卡片推送失败，下次运行重试")
+            # 失败的笔记已逐条退出账本，其余已送达
+            self._commit_ledger(delivered=True)
+        return stats["seen"]
+
+    def sync_full_deck(self) -> int:
+        """
+        完整牌组同步：查询未同步卡片 → 从本地镜像重建完整牌组 → 发送 → 写回
 
+        Returns:
+            本次处理的未同步卡片数
+        """
+        cards = self.query_unsynced_cards()
         print()
 
-        apkg_file = self.create_anki_package(cards)
+        apkg_files = self.build_full_deck()
+        print()
 
-        if not apkg_file:
-            print("❌ Anki 包生成失败")
-            return
+        if apkg_files:
+            content_hash = self.ledger.staged_digest(self.media.staged)
+            delivered = self.send_to_telegram(apkg_files, self.package_note_count, content_hash)
+            self._commit_ledger(delivered, full=True)
+            print()
+            if not self._delivery_accepted(delivered):
+                print(f"⚠️  包未送达，{len(cards)} 张卡片保持未同步，下次运行重新发送")
+                return len(cards)
 
-        print()
+        self.update_notion_sync_status(cards)
+        return len(cards)
+
+    def _record_timings(self, mode: str, card_count: int):
+        """
+        将各阶段耗时写入同步状态（最近一次 + 历史），便于定位变慢的阶段
+
+        流水线中各阶段并发执行，秒数为各线程工作时间之和，合计可超过 total（墙钟时间）。
+
+        Args:
+            mode: 同步方式（pipeline / anki_connect / full_deck）
+            card_count: 本次处理的卡片数
+        """
+        report = self.timer.report()
+        seconds = {phase: report.get(phase, 0.0) for phase in PHASES}
+        seconds["total"] = report["total"]
+        record = {"at": datetime.now().isoformat(), "mode": mode, "cards": card_count, "seconds": seconds}
 
-        self.send_to_telegram(apkg_file, len(cards))
+        self.state["timings"] = record
+        history = self.state.setdefault("timing_history", [])
+        history.append(record)
+        del history[:-TIMING_HISTORY]
 
+        print(f"⏱️  阶段耗时: " + " · ".join(f"{name} {value:.1f}s" for name, value in seconds.items()))
+
+    def run(self):
+        """执行同步流程"""
+        print("=" * 60)
+        print("  Notion → Anki 同步")
+        if self.dry_run:
+            print("  [试运行模式 - 不会实际修改数据]")
+        print("=" * 60)
         print()
 
-        self.update_notion_sync_status(cards)
+        # 0. 重试上次写回失败的页面
+        self.retry_pending_writebacks()
+
+        # 1-4. 查询 → 生成 Anki 包 → 发送到 Telegram → 更新 Notion 状态
+        if not self.anki_connect and self._full_deck_due():
+            # 完整牌组：从本地镜像重建
+            mode = "full_deck"
+            card_count = self.sync_full_deck()
+        else:
+            # 只含新增/内容变化的笔记：各阶段流水线并发（AnkiConnect 直接与集合比对，不需要完整牌组）
+            mode = "anki_connect" if self.anki_connect else "pipeline"
+            card_count = self.sync_anki_connect() if self.anki_connect else self.sync_pipeline()
+            if not card_count:
+                if self.config["telegram"]["send_empty_report"] and self.telegram and not self.dry_run:
+                    print("📭 没有新卡片，发送空报告")
+                    self.telegram.send_message(f"📭 Anki 卡片同步\n\n没有新卡片\n📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+                else:
+                    print("✅ 没有新卡片需要同步")
+                self._record_timings(mode, 0)
+                self._save_state()
+                return
 
+        # 5. 更新本地状态
+        self._record_timings(mode, card_count)
         self.state["last_sync"] = datetime.now().isoformat()
-        self.state["stats"]["total_synced"] += len(cards)
-        self.state["stats"]["last_batch_count"] = len(cards)
+        self.state["stats"]["total_synced"] += card_count
+        self.state["stats"]["last_batch_count"] = card_count
         self._save_state()
 
         print()
         print("=" * 60)
         print("🎉 同步完成！")
-        print(f"   本次同步: {len(cards)} 张")
+        print(f"   本次同步: {card_count} 张")
         print(f"   总计同步: {self.state['stats']['total_synced']} 张")
         print("=" * 60)
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Notion to Anki 同步工具",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+DEFAULT_EPILOG = """
 示例:
   python -m notion_kit.anki_sync
   python -m notion_kit.anki_sync --dry-run
-        """
+  python -m notion_kit.anki_sync --full-deck
+  python -m notion_kit.anki_sync --anki-connect
+"""
+
+
+def main(manager_class=None, epilog: Optional[str] = None):
+    """
+    命令行入口
+
+    Args:
+        manager_class: 同步管理器类（入口脚本可传入带自身路径的子类）
+        epilog: 帮助信息中的示例
+    """
+    parser = argparse.ArgumentParser(
+        description="Notion to Anki 同步工具",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=epilog or DEFAULT_EPILOG
     )
     parser.add_argument(
         '--dry-run',
         action='store_true',
         help='试运行模式，不实际修改 Notion 或发送 Telegram'
     )
+    parser.add_argument(
+        '--no-delta',
+        action='store_true',
+        help='忽略内容账本，重新发送本批全部卡片'
+    )
+    parser.add_argument(
+        '--full-deck',
+        action='store_true',
+        help='从本地镜像重建并发送完整牌组（schema 变更或手机重置后使用）'
+    )
+    parser.add_argument(
+        '--anki-connect',
+        action='store_true',
+        help='经 AnkiConnect 直接推送到桌面 Anki，不生成 .apkg（与集合比对，不需要 --full-deck）'
+    )
+    parser.add_argument(
+        '--switch-delivery',
+        action='store_true',
+        help='切换交付方式（.apkg ↔ AnkiConnect），本次重新交付镜像中的全部卡片'
+    )
 
     args = parser.parse_args()
 
     try:
-        manager = AnkiSyncManager(dry_run=args.dry_run)
+        manager = (manager_class or AnkiSyncManager)(
+            dry_run=args.dry_run, no_delta=args.no_delta, full_deck=args.full_deck, anki_connect=args.anki_connect,
+            switch_delivery=args.switch_delivery
+        )
         manager.run()
     except Exception as e:
         print(f"❌ 错误: {e}")
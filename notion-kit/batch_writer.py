@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Notion 批量写回 - 有界线程池并发更新页面属性、创建页面
+
+功能:
+- 固定上限的线程池并发执行 pages.update（属性更新、归档）和 pages.create
+- 速率与 429/5xx 重试由共享限流器负责（PATCH 为幂等请求；POST 只重试 429 和网关错误）
+- 返回逐页结果报告，调用方据此记录失败页面供下次重试
+- 可选 PhaseTimer：请求耗时计入 write_back 阶段
+
+使用方法:
+    from batch_writer import BatchWriter
+
+    writer = BatchWriter()
+    report = writer.update_pages({page_id: {"Synced": {"checkbox": True}}})
+    failed = [pid for pid, result in report.items() if not result["ok"]]
+
+    for key, result in writer.create_pages((word, body) for word, body in bodies):
+        print(key, result["id"] if result["ok"] else result["error"])
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import httpx
+
+try:
+    from .notion_http import NotionHTTP, get_http
+    from .pipeline import PhaseTimer, parallel_map
+except ImportError:
+    from notion_http import NotionHTTP, get_http
+    from pipeline import PhaseTimer, parallel_map
+
+DEFAULT_WORKERS = 4
+
+
+def _error_message(response: httpx.Response) -> str:
+    """从 Notion 错误响应中提取 message"""
+    try:
+        return response.json().get("message") or response.text
+    except ValueError:
+        return response.text
+
+
+class BatchWriter:
+    """页面属性批量写回器"""
+
+    def __init__(self, http: Optional[NotionHTTP] = None, max_workers: int = DEFAULT_WORKERS,
+                 timer: Optional[PhaseTimer] = None):
+        """
+        初始化写回器
+
+        Args:
+            http: Notion 连接池（默认使用共享实例）
+            max_workers: 并发写入的页面数上限
+            timer: 阶段计时器（请求耗时计入 write_back）
+        """
+        self.http = http or get_http()
+        self.max_workers = max_workers
+        self.timer = timer
+
+    def patch_page(self, page_id: str, body: Dict) -> Dict:
+        """
+        PATCH 单个页面
+
+        Args:
+            page_id: 页面 ID
+            body: 请求体（如 {"properties": {...}} 或 {"archived": True}）
+
+        Returns:
+            {"ok": bool, "status": HTTP 状态码或 None, "error": 错误信息或 None,
+             "edited": 写入后页面的 last_edited_time 或 None}
+        """
+        try:
+            with self.timer.phase("write_back") if self.timer else nullcontext():
+                response = self.http.patch(f"pages/{page_id}", json=body, timeout=30)
+        except httpx.HTTPError as e:
+            return {"ok": False, "status": None, "error": str(e), "edited": None}
+
+        if response.status_code == 200:
+            return {"ok": True, "status": 200, "error": None, "edited": response.json().get("last_edited_time")}
+        return {"ok": False, "status": response.status_code, "error": _error_message(response), "edited": None}
+
+    def patch_pages(self, bodies: Dict[str, Dict],
+                    on_result: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        """
+        并发 PATCH 多个页面
+
+        Args:
+            bodies: page_id → 请求体
+            on_result: 每个页面完成时的回调 (page_id, result)，在调用线程中执行
+
+        Returns:
+            page_id → 结果（格式同 patch_page）
+        """
+        report = {}
+        if not bodies:
+            return report
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.patch_page, page_id, body): page_id
+                for page_id, body in bodies.items()
+            }
+            for future in as_completed(futures):
+                page_id = futures[future]
+                report[page_id] = future.result()
+                if on_result:
+                    on_result(page_id, report[page_id])
+
+        return report
+
+    def update_pages(self, updates: Dict[str, Dict],
+                     on_result: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        """
+        并发更新多个页面的属性
+
+        Args:
+            updates: page_id → 属性更新体
+            on_result: 同 patch_pages
+
+        Returns:
+            page_id → 结果
+        """
+        return self.patch_pages(
+            {page_id: {"properties": properties} for page_id, properties in updates.items()},
+            on_result=on_result,
+        )
+
+    def stream_updates(self, updates: Iterable[Tuple[str, Dict]],
+                       on_result: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        """
+        边产出边写回：updates 可以是仍在生成中的迭代器（如流水线的队列）
+
+        Args:
+            updates: (page_id, 属性更新体) 迭代器
+            on_result: 同 patch_pages
+
+        Returns:
+            page_id → 结果
+        """
+        def update(item):
+            page_id, properties = item
+            return page_id, self.patch_page(page_id, {"properties": properties})
+
+        report = {}
+        for page_id, result in parallel_map(update, updates, workers=self.max_workers):
+            report[page_id] = result
+            if on_result:
+                on_result(page_id, result)
+        return report
+
+    def create_page(self, body: Dict) -> Dict:
+        """
+        创建单个页面
+
+        Args:
+            body: 请求体（{"parent": {...}, "properties": {...}}）
+
+        Returns:
+            {"ok": bool, "status": HTTP 状态码或 None, "error": 错误信息或 None, "id": 新页面 ID 或 None}
+        """
+        try:
+            with self.timer.phase("write_back") if self.timer else nullcontext():
+                response = self.http.post("pages", json=body, timeout=30)
+        except httpx.HTTPError as e:
+            return {"ok": False, "status": None, "error": str(e), "id": None}
+
+        if response.status_code == 200:
+            return {"ok": True, "status": 200, "error": None, "id": response.json().get("id")}
+        return {"ok": False, "status": response.status_code, "error": _error_message(response), "id": None}
+
+    def create_pages(self, bodies: Iterable[Tuple[str, Dict]]) -> Iterator[Tuple[str, Dict]]:
+        """
+        并发创建页面，按完成顺序产出结果
+
+        bodies 可以是仍在生成中的迭代器；调用方边迭代边记录结果（中途中断时已完成的不丢失）
+
+        Args:
+            bodies: (调用方的键, 请求体) 迭代器
+
+        Returns:
+            (键, 结果) 迭代器（结果格式同 create_page）
+        """
+        def create(item):
+            key, body = item
+            return key, self.create_page(body)
+
+        return iter(parallel_map(create, bodies, workers=self.max_workers))
+
+    def archive_pages(self, page_ids: Iterable[str],
+                      on_result: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        """
+        并发归档多个页面
+
+        Args:
+            page_ids: 页面 ID 列表
+            on_result: 同 patch_pages
+
+        Returns:
+            page_id → 结果
+        """
+        return self.patch_pages({page_id: {"archived": True} for page_id in page_ids}, on_result=on_result)
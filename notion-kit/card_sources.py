@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Anki 卡片来源 - 每个来源声明查询、转换与写回
+
+功能:
+- CardSource: 来源接口（未同步页面迭代器、NOTE_FIELDS 中的转换函数名、写回属性）
+- AnkiCardsSource: Anki Cards 数据库（本地镜像增量刷新后读取 Synced = false）
+- CortexSource: Cortex 数据库（分页查询 Last Reviewed 为空的页面，需要页面正文）
+- LedgerSource: 账本模式，包装任一来源：从本地镜像读取导出后又被编辑过的页面
+  （按 NoteLedger 记录的 last_edited_time 判断，不依赖 Synced / Last Reviewed 属性）
+- collect: 各来源在独立线程中并发查询，产出 (来源, 页面)，来源由产出方标注而不是按属性推断
+
+新增来源（如 Logseq、knowledge/ 下的 Markdown）：继承 CardSource，
+在 anki_notes.NOTE_FIELDS 中注册同名的字段转换函数，并加入同步脚本的来源列表。
+新来源与已有来源并发查询，不增加串行耗时。
+
+使用方法:
+    from card_sources import AnkiCardsSource, CortexSource, collect
+
+    sources = [AnkiCardsSource(mirror), CortexSource(http, cortex_ds_id, meta)]
+    for source, page in collect(sources):
+        properties = source.synced_properties(today)
+
+    # 账本模式
+    sources = [LedgerSource(AnkiCardsSource(mirror), mirror, ledger),
+               LedgerSource(CortexSource(http, cortex_ds_id), cortex_mirror, ledger)]
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+try:
+    from .anki_ledger import NoteLedger
+    from .notion_http import NotionHTTP
+    from .notion_meta import MetadataCache, is_schema_error
+    from .notion_mirror import NotionMirror
+    from .pipeline import DEFAULT_MAXSIZE, Channel, PhaseTimer, merge
+except ImportError:
+    from anki_ledger import NoteLedger
+    from notion_http import NotionHTTP
+    from notion_meta import MetadataCache, is_schema_error
+    from notion_mirror import NotionMirror
+    from pipeline import DEFAULT_MAXSIZE, Channel, PhaseTimer, merge
+
+
+class CardSource:
+    """卡片来源接口"""
+
+    # 来源名（anki_notes.NOTE_FIELDS 的键）和显示名
+    name = ""
+    label = ""
+    # 转换时是否需要页面正文
+    needs_body = False
+
+    def pages(self) -> Iterator[Dict]:
+        """逐个产出未同步的页面"""
+        raise NotImplementedError
+
+    def synced_properties(self, today: str) -> Dict:
+        """页面同步后需要写回 Notion 的属性"""
+        raise NotImplementedError
+
+
+class AnkiCardsSource(CardSource):
+    """Anki Cards 数据库（Synced = false）"""
+
+    name = "anki_cards"
+    label = "Anki Cards"
+
+    def __init__(self, mirror: NotionMirror):
+        """
+        Args:
+            mirror: Anki Cards 本地镜像
+        """
+        self.mirror = mirror
+
+    def pages(self) -> Iterator[Dict]:
+        # 增量刷新本地镜像后直接读取
+        self.mirror.refresh()
+        count = 0
+        for page in self.mirror.iter_pages(synced=False):
+            count += 1
+            yield page
+        print(f"   从 {self.label} 找到 {count} 张卡片")
+
+    def synced_properties(self, today: str) -> Dict:
+        return {
+            "Synced": {"checkbox": True},
+            "Last Synced": {"date": {"start": today}}
+        }
+
+
+class CortexSource(CardSource):
+    """Cortex 数据库（Last Reviewed 为空，表示未同步）"""
+
+    name = "cortex"
+    label = "Cortex"
+    needs_body = True
+
+    FILTER = {
+        "property": "Last Reviewed",
+        "date": {
+            "is_empty": True
+        }
+    }
+
+    def __init__(self, http: NotionHTTP, data_source_id: str, meta: Optional[MetadataCache] = None):
+        """
+        Args:
+            http: Notion 连接池
+            data_source_id: Cortex 数据源 ID
+            meta: 元数据缓存（schema 错误时失效）
+        """
+        self.http = http
+        self.data_source_id = data_source_id
+        self.meta = meta
+
+    def pages(self) -> Iterator[Dict]:
+        count = 0
+        # 处理当前页时预取下一页；429/5xx 的重试与退避由共享限流层处理
+        try:
+            for results in self.http.iter_batches(self.data_source_id, {"filter": self.FILTER}, timeout=120):
+                count += len(results)
+                yield from results
+        except httpx.HTTPStatusError as e:
+            print(f"   ⚠️  {self.label} 查询失败: {e.response.status_code}")
+            print(f"   错误详情: {e.response.text}")
+            if self.meta and is_schema_error(e.response):
+                self.meta.invalidate(data_source_id=self.data_source_id)
+            return
+        except httpx.HTTPError as e:
+            print(f"   ⚠️  {self.label} 查询请求失败: {e}")
+            return
+
+        print(f"   从 {self.label} 找到 {count} 张卡片")
+
+    def synced_properties(self, today: str) -> Dict:
+        # Cortex 卡片：更新 Status 为 Learning
+        return {
+            "Status": {"select": {"name": "Learning"}},
+            "Last Reviewed": {"date": {"start": today}}
+        }
+
+
+class LedgerSource(CardSource):
+    """账本模式：本地镜像中未导出、或导出后又被编辑过的页面"""
+
+    def __init__(self, source: CardSource, mirror: NotionMirror, ledger: NoteLedger):
+        """
+        Args:
+            source: 被包装的来源（提供名称、转换方式和写回属性）
+            mirror: 该来源数据库的本地镜像（增量刷新）
+            ledger: 记录导出时 last_edited_time 的内容账本
+        """
+        self.source = source
+        self.mirror = mirror
+        self.ledger = ledger
+        self.name = source.name
+        self.label = source.label
+        self.needs_body = source.needs_body
+
+    def pages(self) -> Iterator[Dict]:
+        self.mirror.refresh()
+        count = 0
+        for page in self.mirror.iter_pages():
+            if self.ledger.exported(page["id"]) != page.get("last_edited_time"):
+                count += 1
+                yield page
+        print(f"   从 {self.label} 找到 {count} 张待导出的卡片（账本）")
+
+    def synced_properties(self, today: str) -> Dict:
+        return self.source.synced_properties(today)
+
+
+def _tagged(source: CardSource, skip: Iterable[str], timer: Optional[PhaseTimer]) -> Iterator[tuple]:
+    pages = timer.iter("query", source.pages()) if timer else source.pages()
+    for page in pages:
+        if page["id"] not in skip:
+            yield source, page
+
+
+def collect(sources: List[CardSource], skip: Iterable[str] = (),
+            maxsize: int = DEFAULT_MAXSIZE, timer: Optional[PhaseTimer] = None) -> Channel:
+    """
+    并发查询所有来源
+
+    Args:
+        sources: 卡片来源列表
+        skip: 跳过的页面 ID（如写回失败、待重试的页面）
+        maxsize: 队列上限
+        timer: 阶段计时器（各来源的查询耗时计入 query）
+
+    Returns:
+        可迭代的 Channel，元素为 (来源, 页面)
+    """
+    skip = set(skip)
+    return merge([_tagged(source, skip, timer) for source in sources], maxsize)
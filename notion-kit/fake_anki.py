@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+本地 AnkiConnect 替身服务器 - 离线测试直连交付
+
+内存中的牌组集合，实现同步脚本用到的 action：
+version, multi, modelNames, deckNames, createModel, createDeck, storeMediaFile,
+findNotes（deck + 字段精确匹配）, notesInfo, addNotes, updateNoteFields, updateNoteTags, changeDeck
+
+使用方法:
+    from fake_anki import FakeAnkiConnect, FakeAnkiServer
+
+    with FakeAnkiServer(FakeAnkiConnect()) as server:
+        os.environ["ANKI_CONNECT_URL"] = server.url
+
+    # 或命令行
+    python3 notion-kit/fake_anki.py --port 8765
+"""
+
+import argparse
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+_QUERY_RE = re.compile(r'^"deck:((?:[^"\\]|\\.)*)" "(\w+):((?:[^"\\]|\\.)*)"$')
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+class FakeAnkiConnect:
+    """内存中的 Anki 集合"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models: Dict[str, List[str]] = {}
+        self.decks = {"Default"}
+        self.notes: Dict[int, Dict] = {}
+        self.media: Dict[str, str] = {}
+        self.ids = itertools.count(1_700_000_000_000)
+        self.stats = {"requests": 0, "actions": {}}
+
+    def handle(self, body: Dict):
+        """处理一个请求体，返回 (result, error)"""
+        action = body.get("action")
+        params = body.get("params") or {}
+        with self.lock:
+            self.stats["actions"][action] = self.stats["actions"].get(action, 0) + 1
+        handler = getattr(self, f"_{action}", None)
+        if handler is None:
+            return None, "unsupported action"
+        try:
+            return handler(**params), None
+        except Exception as e:
+            return None, str(e)
+
+    def _version(self):
+        return 6
+
+    def _multi(self, actions):
+        results = []
+        for action in actions:
+            result, error = self.handle(action)
+            results.append({"result": result, "error": error})
+        return results
+
+    def _modelNames(self):
+        return sorted(self.models)
+
+    def _deckNames(self):
+        return sorted(self.decks)
+
+    def _createModel(self, modelName, inOrderFields, **_):
+        self.models[modelName] = list(inOrderFields)
+        return {"name": modelName}
+
+    def _createDeck(self, deck):
+        parts = deck.split("::")
+        for depth in range(1, len(parts) + 1):
+            self.decks.add("::".join(parts[:depth]))
+        return next(self.ids)
+
+    def _storeMediaFile(self, filename, data=None, **_):
+        self.media[filename] = data or ""
+        return filename
+
+    def _findNotes(self, query):
+        match = _QUERY_RE.match(query)
+        if not match:
+            raise ValueError(f"unsupported query: {query}")
+        deck, field, value = _unescape(match.group(1)), match.group(2), _unescape(match.group(3))
+        return [nid for nid, note in self.notes.items()
+                if note["deck"] == deck and note["fields"].get(field) == value]
+
+    def _notesInfo(self, notes):
+        return [{
+            "noteId": nid,
+            "modelName": self.notes[nid]["model"],
+            "tags": list(self.notes[nid]["tags"]),
+            "fields": {name: {"value": value, "order": i}
+                       for i, (name, value) in enumerate(self.notes[nid]["fields"].items())},
+            "cards": [nid + 1],
+        } if nid in self.notes else {} for nid in notes]
+
+    def _addNotes(self, notes):
+        ids = []
+        for note in notes:
+            if note["modelName"] not in self.models or note["deckName"] not in self.decks:
+                ids.append(None)
+                continue
+            nid = next(self.ids)
+            next(self.ids)   # 卡片 ID
+            self.notes[nid] = {"model": note["modelName"], "deck": note["deckName"],
+                               "fields": dict(note["fields"]), "tags": list(note.get("tags", []))}
+            ids.append(nid)
+        return ids
+
+    def _updateNoteFields(self, note):
+        self.notes[note["id"]]["fields"].update(note["fields"])
+
+    def _updateNoteTags(self, note, tags):
+        self.notes[note]["tags"] = list(tags)
+
+    def _changeDeck(self, cards, deck):
+        for card in cards:
+            self.notes[card - 1]["deck"] = deck
+
+
+class FakeAnkiHandler(BaseHTTPRequestHandler):
+    """AnkiConnect 只有一个端点：POST /（服务器实例上挂 fake 属性）"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake: FakeAnkiConnect = self.server.fake
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with fake.lock:
+            fake.stats["requests"] += 1
+        result, error = fake.handle(body)
+
+        payload = json.dumps({"result": result, "error": error}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeAnkiServer:
+    """在后台线程运行的替身服务器"""
+
+    def __init__(self, fake: Optional[FakeAnkiConnect] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化服务器
+
+        Args:
+            fake: 内存集合（默认空集合）
+            host: 监听地址
+            port: 端口（0 表示自动分配）
+        """
+        self.fake = fake or FakeAnkiConnect()
+        self.httpd = ThreadingHTTPServer((host, port), FakeAnkiHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self.fake
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAnkiServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 AnkiConnect 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FakeAnkiServer(host=args.host, port=args.port)
+    print(f"🃏 AnkiConnect 替身运行在 {server.url}")
+    server.start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+本地 Notion API 替身服务器 - 用于离线压测和测试
+
+功能:
+- 实现脚本用到的端点：databases 读取、data_sources 读取与查询（游标分页、过滤、排序、
+  filter_properties）、pages 创建/更新/归档、blocks 子块（分页）
+- 附带欧路词典生词本 (/eudic) 和 Telegram sendDocument (/telegram) 端点
+- 从 fixture（JSON）或合成数据初始化
+- 可配置延迟、429 (Retry-After)、502/504 注入，以及服务端速率上限
+- 统计请求数、按端点计数和注入的错误数
+
+使用方法:
+    python3 notion-kit/fake_notion.py --port 8765 --cards 2000 --latency 0.05 --p429 0.02
+
+    # 脚本侧
+    NOTION_BASE_URL=http://127.0.0.1:8765 NOTION_TOKEN=fake python3 scripts/sync_notion_anki.py
+"""
+
+import argparse
+import copy
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from .notion_props import decode_property
+except ImportError:
+    from notion_props import decode_property
+
+ANKI_DATABASE_ID = "a0000000-0000-4000-8000-000000000001"
+ANKI_DATA_SOURCE_ID = "a0000000-0000-4000-8000-000000000002"
+CORTEX_DATABASE_ID = "c0000000-0000-4000-8000-000000000001"
+CORTEX_DATA_SOURCE_ID = "c0000000-0000-4000-8000-000000000002"
+
+ANKI_SCHEMA = {
+    "Front": {"id": "title", "type": "title"},
+    "Back": {"id": "bk", "type": "rich_text"},
+    "Deck": {"id": "dk", "type": "select"},
+    "Tags": {"id": "tg", "type": "multi_select"},
+    "Source": {"id": "sr", "type": "rich_text"},
+    "Synced": {"id": "sy", "type": "checkbox"},
+    "Last Synced": {"id": "ls", "type": "date"},
+}
+
+CORTEX_SCHEMA = {
+    "Name": {"id": "title", "type": "title"},
+    "Type": {"id": "ty", "type": "select"},
+    "Status": {"id": "st", "type": "select"},
+    "Tags": {"id": "tg", "type": "multi_select"},
+    "Source": {"id": "sr", "type": "rich_text"},
+    "Last Reviewed": {"id": "lr", "type": "date"},
+}
+
+
+def _now() -> str:
+    """Notion 风格的时间戳（精确到分钟）"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _rich(text: str) -> List[Dict]:
+    return [{"type": "text", "text": {"content": text}, "plain_text": text}]
+
+
+def _value(prop_type: str, value) -> Dict:
+    """构造完整的 Notion 属性对象"""
+    if prop_type in ("title", "rich_text"):
+        return {"type": prop_type, prop_type: _rich(value or "")}
+    if prop_type == "select":
+        return {"type": "select", "select": {"name": value} if value else None}
+    if prop_type == "multi_select":
+        return {"type": "multi_select", "multi_select": [{"name": v} for v in value or []]}
+    if prop_type == "checkbox":
+        return {"type": "checkbox", "checkbox": bool(value)}
+    if prop_type == "date":
+        return {"type": "date", "date": {"start": value} if value else None}
+    return {"type": prop_type, prop_type: value}
+
+
+def _normalize(prop_type: str, value: Dict) -> Dict:
+    """把写入请求中的属性值补全为读取格式（补上 type 和 plain_text）"""
+    value = dict(value)
+    value.pop("type", None)
+    if prop_type in ("title", "rich_text"):
+        items = []
+        for item in value.get(prop_type, []):
+            text = item.get("text", {}).get("content", item.get("plain_text", ""))
+            items.append({"type": "text", "text": {"content": text}, "plain_text": text})
+        return {"type": prop_type, prop_type: items}
+    return dict(value, type=prop_type)
+
+
+def build_fixture(cards: int = 500, cortex: int = 50, eudic_words: int = 200,
+                  duplicates: int = 20, synced_ratio: float = 0.5, blocks_per_page: int = 5,
+                  seed: int = 42) -> Dict:
+    """
+    生成合成 fixture
+
+    Args:
+        cards: Anki Cards 页面数（一半带「欧路」标签）
+        cortex: Cortex 页面数（各带正文块）
+        eudic_words: 欧路生词本单词数（前一半已在 Anki Cards 中）
+        duplicates: 额外生成的重复「欧路」卡片数
+        synced_ratio: 已同步卡片比例
+        blocks_per_page: 每个 Cortex 页面的顶层块数（其中一个带嵌套子块）
+        seed: 随机种子
+
+    Returns:
+        fixture dict
+    """
+    rng = random.Random(seed)
+    base = "2026-01-01T00:{:02d}:00.000Z"
+    pages, blocks = [], {}
+
+    def page_id():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    for i in range(cards + duplicates):
+        # 重复卡片只复制带「欧路」标签（偶数序号）的单词
+        word = f"word{i if i < cards else 2 * rng.randrange(max(cards // 2, 1))}"
+        eudic = i >= cards or i % 2 == 0
+        pages.append({
+            "object": "page",
+            "id": page_id(),
+            "parent": {"type": "data_source_id", "data_source_id": ANKI_DATA_SOURCE_ID},
+            "created_time": base.format(i % 60),
+            "last_edited_time": base.format(i % 60),
+            "archived": False,
+            "properties": {
+                "Front": _value("title", word),
+                "Back": _value("rich_text", f"definition of {word}"),
+                "Deck": _value("select", "Vocabulary"),
+                "Tags": _value("multi_select", ["欧路", "vocabulary"] if eudic else ["vocabulary"]),
+                "Source": _value("rich_text", ""),
+                "Synced": _value("checkbox", rng.random() < synced_ratio),
+                "Last Synced": _value("date", None),
+            },
+        })
+
+    for i in range(cortex):
+        pid = page_id()
+        pages.append({
+            "object": "page",
+            "id": pid,
+            "parent": {"type": "data_source_id", "data_source_id": CORTEX_DATA_SOURCE_ID},
+            "created_time": base.format(i % 60),
+            "last_edited_time": base.format(i % 60),
+            "archived": False,
+            "properties": {
+                "Name": _value("title", f"单词：concept{i}"),
+                "Type": _value("select", "Vocabulary"),
+                "Status": _value("select", "Inbox"),
+                "Tags": _value("multi_select", ["cortex"]),
+                "Source": _value("rich_text", "fixture"),
+                "Last Reviewed": _value("date", None),
+            },
+        })
+        children = []
+        for j in range(blocks_per_page):
+            block_id = page_id()
+            nested = j == 0
+            children.append({
+                "object": "block", "id": block_id, "type": "toggle" if nested else "paragraph",
+                "has_children": nested,
+                "toggle" if nested else "paragraph": {"rich_text": _rich(f"concept{i} line {j}")},
+            })
+            if nested:
+                blocks[block_id] = [{
+                    "object": "block", "id": page_id(), "type": "paragraph", "has_children": False,
+                    "paragraph": {"rich_text": _rich(f"concept{i} detail")},
+                }]
+        blocks[pid] = children
+
+    # 生词本按添加时间从新到旧排列（与欧路词典 API 一致）
+    added = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    words = [
+        {"word": f"word{i * 2}" if i < eudic_words // 2 else f"newword{i}",
+         "exp": f"meaning {i}", "phonetic": "fəˈnetɪk",
+         "add_time": (added - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        for i in range(eudic_words)
+    ]
+
+    return {
+        "data_sources": [
+            {"database_id": ANKI_DATABASE_ID, "id": ANKI_DATA_SOURCE_ID, "properties": ANKI_SCHEMA},
+            {"database_id": CORTEX_DATABASE_ID, "id": CORTEX_DATA_SOURCE_ID, "properties": CORTEX_SCHEMA},
+        ],
+        "pages": pages,
+        "blocks": blocks,
+        "eudic_words": words,
+    }
+
+
+def matches(page: Dict, filter_obj: Optional[Dict]) -> bool:
+    """
+    判断页面是否满足 Notion 过滤条件（支持脚本用到的子集）
+
+    Args:
+        page: 页面对象
+        filter_obj: Notion filter（and/or、属性条件、timestamp 条件）
+
+    Returns:
+        是否匹配
+    """
+    if not filter_obj:
+        return True
+    if "and" in filter_obj:
+        return all(matches(page, f) for f in filter_obj["and"])
+    if "or" in filter_obj:
+        return any(matches(page, f) for f in filter_obj["or"])
+
+    if "timestamp" in filter_obj:
+        field = filter_obj["timestamp"]
+        value = page.get(field)
+        condition = filter_obj[field]
+    else:
+        prop = page.get("properties", {}).get(filter_obj["property"])
+        value = decode_property(prop)
+        condition = next(v for k, v in filter_obj.items() if k != "property")
+
+    for op, target in condition.items():
+        if op == "equals" and value != target:
+            return False
+        if op == "does_not_equal" and value == target:
+            return False
+        if op == "contains" and target not in (value or []):
+            return False
+        if op == "does_not_contain" and target in (value or []):
+            return False
+        if op == "is_empty" and bool(value) == bool(target):
+            return False
+        if op == "is_not_empty" and bool(value) != bool(target):
+            return False
+        if op in ("on_or_after", "after", "on_or_before", "before"):
+            if not value:
+                return False
+            if op == "on_or_after" and value < target:
+                return False
+            if op == "after" and value <= target:
+                return False
+            if op == "on_or_before" and value > target:
+                return False
+            if op == "before" and value >= target:
+                return False
+    return True
+
+
+class FakeNotion:
+    """替身服务器的数据与故障注入配置"""
+
+    def __init__(self, fixture: Optional[Dict] = None, latency: float = 0.0, jitter: float = 0.0,
+                 p429: float = 0.0, p5xx: float = 0.0, retry_after: float = 1.0,
+                 rate_limit: Optional[float] = None, seed: Optional[int] = None):
+        """
+        初始化替身
+
+        Args:
+            fixture: build_fixture() 格式的数据（默认生成合成数据）
+            latency: 每个请求的基础延迟（秒）
+            jitter: 额外的随机延迟上限（秒）
+            p429: 随机返回 429 的概率
+            p5xx: 随机返回 502/504 的概率
+            retry_after: 429 响应的 Retry-After（秒）
+            rate_limit: 服务端速率上限 (req/s)，超出返回 429；None 表示不限
+            seed: 故障注入的随机种子
+        """
+        fixture = copy.deepcopy(fixture if fixture is not None else build_fixture())
+        self.latency = latency
+        self.jitter = jitter
+        self.p429 = p429
+        self.p5xx = p5xx
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+        self.databases = {ds["database_id"]: ds["id"] for ds in fixture["data_sources"]}
+        self.schemas = {ds["id"]: ds["properties"] for ds in fixture["data_sources"]}
+        self.pages: Dict[str, Dict] = {page["id"]: page for page in fixture["pages"]}
+        self.blocks: Dict[str, List[Dict]] = fixture.get("blocks", {})
+        self.eudic_words: List[Dict] = fixture.get("eudic_words", [])
+        self.telegram_documents = 0
+
+        self.lock = threading.Lock()
+        self._window: List[float] = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清零请求统计"""
+        with self.lock:
+            self.stats = {"requests": 0, "injected_429": 0, "injected_5xx": 0, "endpoints": {}}
+
+    def _count(self, endpoint: str):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["endpoints"][endpoint] = self.stats["endpoints"].get(endpoint, 0) + 1
+
+    def fault(self) -> Optional[int]:
+        """按配置决定是否注入错误，返回状态码或 None"""
+        with self.lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.rate_limit:
+                    self.stats["injected_429"] += 1
+                    return 429
+                self._window.append(now)
+            roll = self.random.random()
+            if roll < self.p429:
+                self.stats["injected_429"] += 1
+                return 429
+            if roll < self.p429 + self.p5xx:
+                self.stats["injected_5xx"] += 1
+                return self.random.choice((502, 504))
+        return None
+
+    def delay(self):
+        wait = self.latency + (self.random.random() * self.jitter if self.jitter else 0.0)
+        if wait > 0:
+            time.sleep(wait)
+
+    # ---------- Notion 端点 ----------
+
+    def query(self, data_source_id: str, body: Dict, filter_properties: List[str]) -> Dict:
+        with self.lock:
+            pages = [
+                page for page in self.pages.values()
+                if page["parent"].get("data_source_id") == data_source_id
+                and not page.get("archived")
+                and matches(page, body.get("filter"))
+            ]
+        for sort in reversed(body.get("sorts", [])):
+            if "timestamp" in sort:
+                key = lambda p, f=sort["timestamp"]: p.get(f) or ""
+            else:
+                key = lambda p, name=sort["property"]: str(decode_property(p["properties"].get(name)) or "")
+            pages.sort(key=key, reverse=sort.get("direction") == "descending")
+
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size", 100)), 100)
+        results = copy.deepcopy(pages[start:start + size])
+        if filter_properties:
+            wanted = set(filter_properties)
+            schema = self.schemas.get(data_source_id, {})
+            for page in results:
+                page["properties"] = {
+                    name: prop for name, prop in page["properties"].items()
+                    if schema.get(name, {}).get("id", name) in wanted or name in wanted
+                }
+
+        more = start + size < len(pages)
+        return {"object": "list", "results": results, "has_more": more,
+                "next_cursor": str(start + size) if more else None}
+
+    def create_page(self, body: Dict) -> Dict:
+        data_source_id = body["parent"].get("data_source_id") or self.databases.get(body["parent"].get("database_id"))
+        schema = self.schemas.get(data_source_id)
+        if schema is None:
+            raise KeyError(data_source_id)
+        now = _now()
+        page = {
+            "object": "page",
+            "id": str(uuid.uuid4()),
+            "parent": {"type": "data_source_id", "data_source_id": data_source_id},
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "properties": {name: _value(spec["type"], None) for name, spec in schema.items()},
+        }
+        for name, value in body.get("properties", {}).items():
+            if name not in schema:
+                raise ValueError(f"{name} is not a property that exists.")
+            page["properties"][name] = _normalize(schema[name]["type"], value)
+        with self.lock:
+            self.pages[page["id"]] = page
+        return page
+
+    def update_page(self, page_id: str, body: Dict) -> Dict:
+        with self.lock:
+            page = self.pages[page_id]
+            schema = self.schemas.get(page["parent"].get("data_source_id"), {})
+            for name, value in body.get("properties", {}).items():
+                if name not in schema:
+                    raise ValueError(f"{name} is not a property that exists.")
+                page["properties"][name] = _normalize(schema[name]["type"], value)
+            for flag in ("archived", "in_trash"):
+                if flag in body:
+                    page["archived"] = bool(body[flag])
+            page["last_edited_time"] = _now()
+            return copy.deepcopy(page)
+
+    def children(self, block_id: str, start_cursor: Optional[str], page_size: int) -> Dict:
+        blocks = self.blocks.get(block_id, [])
+        start = int(start_cursor or 0)
+        size = min(page_size, 100)
+        more = start + size < len(blocks)
+        return {"object": "list", "results": blocks[start:start + size], "has_more": more,
+                "next_cursor": str(start + size) if more else None}
+
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+    """HTTP 路由（服务器实例上挂 fake 属性）"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self) -> FakeNotion:
+        return self.server.fake
+
+    def _send(self, status: int, data: Dict, headers: Optional[Dict] = None):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, code: str, message: str, headers: Optional[Dict] = None):
+        self._send(status, {"object": "error", "status": status, "code": code, "message": message}, headers)
+
+    def _body(self) -> Dict:
+        # 总是读完请求体（包括 Telegram 的 multipart），keep-alive 连接才能复用
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw or not self.headers.get("Content-Type", "").startswith("application/json"):
+            return {}
+        return json.loads(raw)
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        body = self._body()
+
+        if parts[:1] == ["eudic"]:
+            return self._eudic(query)
+        if parts[:1] == ["telegram"]:
+            with self.fake.lock:
+                self.fake.telegram_documents += 1
+            return self._send(200, {"ok": True, "result": {}})
+        if parts[:1] != ["v1"] or len(parts) < 2:
+            return self._error(404, "invalid_request_url", "Invalid request URL.")
+
+        parts = parts[1:]
+        endpoint = "query" if parts[-1] == "query" else parts[0]
+        self.fake._count(endpoint)
+        self.fake.delay()
+
+        status = self.fake.fault()
+        if status == 429:
+            return self._error(429, "rate_limited", "Rate limited.",
+                               {"Retry-After": str(self.fake.retry_after)})
+        if status:
+            return self._error(status, "service_unavailable", "Injected gateway error.")
+
+        try:
+            return self._route(method, parts, query, body)
+        except KeyError as e:
+            return self._error(404, "object_not_found", f"Could not find object {e}.")
+        except ValueError as e:
+            return self._error(400, "validation_error", str(e))
+
+    def _route(self, method: str, parts: List[str], query: Dict, body: Dict):
+        fake = self.fake
+        if method == "GET" and parts[0] == "databases" and len(parts) == 2:
+            data_source_id = fake.databases[parts[1]]
+            return self._send(200, {"object": "database", "id": parts[1],
+                                    "data_sources": [{"id": data_source_id, "name": parts[1]}]})
+        if parts[0] == "data_sources" and len(parts) == 2 and method == "GET":
+            return self._send(200, {"object": "data_source", "id": parts[1],
+                                    "properties": fake.schemas[parts[1]]})
+        if parts[0] == "data_sources" and len(parts) == 3 and parts[2] == "query" and method == "POST":
+            if parts[1] not in fake.schemas:
+                raise KeyError(parts[1])
+            return self._send(200, fake.query(parts[1], body, query.get("filter_properties", [])))
+        if parts[0] == "pages" and len(parts) == 1 and method == "POST":
+            return self._send(200, fake.create_page(body))
+        if parts[0] == "pages" and len(parts) == 2 and method == "PATCH":
+            return self._send(200, fake.update_page(parts[1], body))
+        if parts[0] == "pages" and len(parts) == 2 and method == "GET":
+            with fake.lock:
+                return self._send(200, copy.deepcopy(fake.pages[parts[1]]))
+        if parts[0] == "blocks" and len(parts) == 3 and parts[2] == "children" and method == "GET":
+            page_size = int(query.get("page_size", ["100"])[0])
+            cursor = query.get("start_cursor", [None])[0]
+            return self._send(200, fake.children(parts[1], cursor, page_size))
+        return self._error(400, "invalid_request", f"Unsupported: {method} /{'/'.join(parts)}")
+
+    def _eudic(self, query: Dict):
+        page = int(query.get("page", ["1"])[0])
+        size = int(query.get("page_size", ["50"])[0])
+        words = self.fake.eudic_words[(page - 1) * size:page * size]
+        return self._send(200, {"data": words})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+
+class FakeNotionServer:
+    """在后台线程运行的替身服务器"""
+
+    def __init__(self, fake: Optional[FakeNotion] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化服务器
+
+        Args:
+            fake: 数据与故障配置（默认合成数据、无故障）
+            host: 监听地址
+            port: 端口（0 表示自动分配）
+        """
+        self.fake = fake or FakeNotion()
+        self.httpd = ThreadingHTTPServer((host, port), FakeNotionHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self.fake
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeNotionServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Notion API 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixture", help="fixture JSON 文件（默认生成合成数据）")
+    parser.add_argument("--cards", type=int, default=500, help="合成 Anki Cards 数量")
+    parser.add_argument("--cortex", type=int, default=50, help="合成 Cortex 页面数量")
+    parser.add_argument("--eudic-words", type=int, default=200, help="合成欧路生词数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限（秒）")
+    parser.add_argument("--p429", type=float, default=0.0, help="随机 429 概率")
+    parser.add_argument("--p5xx", type=float, default=0.0, help="随机 502/504 概率")
+    parser.add_argument("--server-rate", type=float, default=None, help="服务端速率上限 (req/s)")
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture, 'r', encoding='utf-8') as f:
+            fixture = json.load(f)
+    else:
+        fixture = build_fixture(cards=args.cards, cortex=args.cortex, eudic_words=args.eudic_words)
+
+    fake = FakeNotion(fixture, latency=args.latency, jitter=args.jitter, p429=args.p429,
+                      p5xx=args.p5xx, rate_limit=args.server_rate)
+    server = FakeNotionServer(fake, args.host, args.port)
+    print(f"🧪 Fake Notion 运行于 {server.url}")
+    print(f"   ANKI_DATABASE_ID={ANKI_DATABASE_ID}")
+    print(f"   DATABASE_ID={CORTEX_DATABASE_ID}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
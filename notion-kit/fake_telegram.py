@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+本地 Telegram Bot API 替身服务器 - 离线测试 .apkg 交付
+
+实现 sendDocument（multipart 上传，超过上传限制返回 413）和 sendMessage，
+记录收到的文件与消息；可预先排入失败响应（5xx、429 + retry_after）测试重试。
+
+使用方法:
+    from fake_telegram import FakeTelegram, FakeTelegramServer
+
+    fake = FakeTelegram()
+    fake.fail_next(502, 429)
+    with FakeTelegramServer(fake) as server:
+        os.environ["TELEGRAM_API_URL"] = server.url
+
+    # 或命令行
+    python3 notion-kit/fake_telegram.py --port 8081
+"""
+
+import argparse
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+UPLOAD_LIMIT = 50 * 1024 * 1024
+
+
+def _parse_form(content_type: str, body: bytes) -> Tuple[Dict[str, str], Dict[str, Tuple[str, bytes]]]:
+    """解析 multipart/form-data 或 urlencoded 表单，返回 (字段, 文件名 → (文件名, 内容))"""
+    if not content_type.startswith("multipart/"):
+        return dict(parse_qsl(body.decode("utf-8"))), {}
+
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        filename = part.get_filename()
+        payload = part.get_payload(decode=True) or b""
+        if filename:
+            files[name] = (filename, payload)
+        else:
+            fields[name] = payload.decode("utf-8")
+    return fields, files
+
+
+class FakeTelegram:
+    """内存中的 Bot API 状态"""
+
+    def __init__(self, upload_limit: int = UPLOAD_LIMIT):
+        """
+        Args:
+            upload_limit: sendDocument 接受的最大文件字节数
+        """
+        self.lock = threading.Lock()
+        self.upload_limit = upload_limit
+        # {"chat_id", "filename", "size", "caption", "content"}
+        self.documents: List[Dict] = []
+        self.messages: List[Dict] = []
+        self.failures: List[int] = []
+        self.stats = {"requests": 0}
+
+    def fail_next(self, *statuses: int):
+        """接下来的请求依次返回这些状态码（429 附带 retry_after = 1）"""
+        with self.lock:
+            self.failures.extend(statuses)
+
+    def handle(self, method: str, fields: Dict, files: Dict) -> Tuple[int, Dict]:
+        """处理一次调用，返回 (状态码, 响应体)"""
+        with self.lock:
+            self.stats["requests"] += 1
+            status = self.failures.pop(0) if self.failures else None
+        if status == 429:
+            return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                         "parameters": {"retry_after": 1}}
+        if status:
+            return status, {"ok": False, "error_code": status, "description": "Bad Gateway"}
+
+        if method == "sendDocument":
+            if "document" not in files:
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request: there is no document"}
+            filename, content = files["document"]
+            if len(content) > self.upload_limit:
+                return 413, {"ok": False, "error_code": 413, "description": "Request Entity Too Large"}
+            with self.lock:
+                self.documents.append({"chat_id": fields.get("chat_id"), "filename": filename,
+                                       "size": len(content), "caption": fields.get("caption"),
+                                       "content": content})
+            return 200, {"ok": True, "result": {"message_id": len(self.documents)}}
+        if method == "sendMessage":
+            with self.lock:
+                self.messages.append({"chat_id": fields.get("chat_id"), "text": fields.get("text")})
+            return 200, {"ok": True, "result": {"message_id": len(self.messages)}}
+        return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """POST /bot<token>/<method>（服务器实例上挂 fake 属性）"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake: FakeTelegram = self.server.fake
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        fields, files = _parse_form(self.headers.get("Content-Type", ""), body)
+        status, result = fake.handle(method, fields, files)
+
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeTelegramServer:
+    """在后台线程运行的替身服务器"""
+
+    def __init__(self, fake: Optional[FakeTelegram] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化服务器
+
+        Args:
+            fake: Bot API 状态（默认新建）
+            host: 监听地址
+            port: 端口（0 表示自动分配）
+        """
+        self.fake = fake or FakeTelegram()
+        self.httpd = ThreadingHTTPServer((host, port), FakeTelegramHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self.fake
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeTelegramServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Telegram Bot API 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    server = FakeTelegramServer(host=args.host, port=args.port)
+    print(f"📨 Telegram Bot API 替身运行在 {server.url}（设置 TELEGRAM_API_URL={server.url}）")
+    server.start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Notion 媒体文件的内容寻址存储（图片、音频、视频、附件）
+
+功能:
+- Notion 托管的文件（签名 URL，约 1 小时过期）并发下载到本地，按 SHA-256 命名: <sha256>.<ext>
+- 相同内容只存一份（跨卡片、跨运行去重）
+- 索引 block_id + last_edited_time → 文件名，未修改的块不再下载（中断后重跑只补下载缺失的部分）
+- 下载先写 .part 临时文件再原子改名，半截文件不会进入存储
+- 记录已发送到手机的文件，打包时只附带新文件（发送成功后才提交）
+
+使用方法:
+    from media_store import MediaStore, referenced_media
+
+    store = MediaStore("data/cache/media")
+    media = store.fetch_blocks(blocks)          # {block_id: 文件名}
+    html = blocks_html(blocks, media=media)
+    for name in referenced_media(html):
+        if not store.is_shipped(name):
+            package.add_media(store.path(name))
+            store.stage(name)
+    store.commit()                              # 发送成功后
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+# 需要下载的块类型
+MEDIA_BLOCKS = {"image", "audio", "video", "file", "pdf"}
+
+MEDIA_NAME_RE = re.compile(r"\b[0-9a-f]{64}\.[a-z0-9]{1,5}\b")
+_SUFFIX_RE = re.compile(r"^\.[a-z0-9]{1,5}$")
+
+DEFAULT_WORKERS = 4
+MAX_ATTEMPTS = 3
+# 每下载多少个文件保存一次索引（中断后可续传）
+INDEX_SAVE_EVERY = 20
+
+
+def referenced_media(text: str) -> List[str]:
+    """文本（笔记字段 HTML）中引用的本地媒体文件名，按出现顺序去重"""
+    return list(dict.fromkeys(MEDIA_NAME_RE.findall(text or "")))
+
+
+def media_url(block: Dict) -> Optional[str]:
+    """Notion 托管文件的下载地址（外部链接和 file_upload 返回 None）"""
+    data = block.get(block.get("type"), {})
+    if data.get("type") != "file":
+        return None
+    return (data.get("file") or {}).get("url")
+
+
+def _suffix(url: str, content_type: Optional[str]) -> str:
+    """由 URL 路径或 Content-Type 推断扩展名"""
+    suffix = Path(urlparse(url).path).suffix.lower()
+    if _SUFFIX_RE.match(suffix):
+        return suffix
+    guessed = mimetypes.guess_extension((content_type or "").split(";")[0].strip()) or ""
+    return guessed if _SUFFIX_RE.match(guessed) else ".bin"
+
+
+def _iter_media_blocks(blocks: List[Dict]) -> Iterator[Dict]:
+    for block in blocks:
+        if block.get("type") in MEDIA_BLOCKS and media_url(block):
+            yield block
+        yield from _iter_media_blocks(block.get("children") or [])
+
+
+class MediaStore:
+    """内容寻址的媒体存储"""
+
+    def __init__(self, root, client: Optional[httpx.Client] = None, max_workers: int = DEFAULT_WORKERS,
+                 shipped_name: str = "shipped.txt"):
+        """
+        初始化存储
+
+        Args:
+            root: 存储目录（媒体文件、index.json、shipped.txt）
+            client: 下载用的 HTTP 客户端（签名 URL 不需要 Notion 认证，也不占用 Notion 限流额度）
+            max_workers: 同时下载的文件数上限（所有调用方共享）
+            shipped_name: 已交付记录的文件名（每种交付方式一份）
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+        self.shipped_path = self.root / shipped_name
+        self.client = client or httpx.Client(timeout=60, follow_redirects=True)
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        self.index: Dict[str, str] = self._load_index()
+        self.shipped = self._load_shipped()
+        self.staged: set = set()
+
+    def _load_index(self) -> Dict[str, str]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_shipped(self) -> set:
+        if not self.shipped_path.exists():
+            return set()
+        with open(self.shipped_path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _write_atomic(self, path: Path, text: str):
+        fd, tmp = tempfile.mkstemp(dir=str(self.root), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def save_index(self):
+        """保存索引（原子替换）"""
+        with self._lock:
+            text = json.dumps(self.index, indent=1, sort_keys=True)
+            self._unsaved = 0
+        self._write_atomic(self.index_path, text)
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+    def has(self, name: str) -> bool:
+        return self.path(name).exists()
+
+    def missing(self, text: str) -> List[str]:
+        """文本引用但本地不存在的媒体文件"""
+        return [name for name in referenced_media(text) if not self.has(name)]
+
+    def _download(self, url: str) -> str:
+        """下载到临时文件，边下载边计算 SHA-256，完成后改名为内容地址"""
+        part = self.root / f"{uuid.uuid4().hex}.part"
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                with self._slots, self.client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    digest = hashlib.sha256()
+                    with open(part, 'wb') as f:
+                        for chunk in response.iter_bytes():
+                            digest.update(chunk)
+                            f.write(chunk)
+                    name = digest.hexdigest() + _suffix(url, response.headers.get("content-type"))
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                part.unlink(missing_ok=True)
+                retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500
+                if attempt == MAX_ATTEMPTS or not retryable:
+                    raise
+                time.sleep(2 ** attempt)
+
+        target = self.path(name)
+        if target.exists():
+            part.unlink()            # 已有相同内容
+        else:
+            os.replace(part, target)
+        return name
+
+    def fetch(self, key: str, url: str) -> Optional[str]:
+        """
+        获取单个文件（已索引且存在则不下载）
+
+        Args:
+            key: 稳定的索引键（如 block_id:last_edited_time）
+            url: 下载地址
+
+        Returns:
+            文件名；下载失败返回 None
+        """
+        name = self.index.get(key)
+        if name and self.has(name):
+            return name
+        try:
+            name = self._download(url)
+        except httpx.HTTPError as e:
+            print(f"   ⚠️  媒体下载失败 {key[:8]}: {e}")
+            return None
+
+        with self._lock:
+            self.index[key] = name
+            self._unsaved += 1
+            save = self._unsaved >= INDEX_SAVE_EVERY
+        if save:
+            self.save_index()
+        return name
+
+    def fetch_blocks(self, blocks: List[Dict]) -> Dict[str, str]:
+        """
+        并发下载块树中全部 Notion 托管的媒体
+
+        Args:
+            blocks: 块列表（子块位于 block["children"]）
+
+        Returns:
+            block_id → 文件名（失败的块不包含在内）
+        """
+        media_blocks = list(_iter_media_blocks(blocks))
+        if not media_blocks:
+            return {}
+
+        def fetch(block):
+            return block["id"], self.fetch(f"{block['id']}:{block.get('last_edited_time')}", media_url(block))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = dict(pool.map(fetch, media_blocks))
+        if self._unsaved:
+            self.save_index()
+        return {block_id: name for block_id, name in results.items() if name}
+
+    def is_shipped(self, name: str) -> bool:
+        """手机端已有该文件"""
+        return name in self.shipped
+
+    def reset_shipped(self):
+        """清空已交付记录（重新交付全部笔记前调用；commit 时写入文件）"""
+        self.shipped = set()
+
+    def stage(self, name: str):
+        """记录本次打包附带的文件（commit 后生效）"""
+        self.staged.add(name)
+
+    def unstage(self, name: str):
+        """撤销单个文件的暂存（该文件未送达）"""
+        self.staged.discard(name)
+
+    def discard(self):
+        """丢弃暂存（发送失败时调用）"""
+        self.staged = set()
+
+    def commit(self, replace: bool = False):
+        """
+        提交已发送的文件
+
+        Args:
+            replace: 以本次附带的文件替换记录（发送完整牌组后）
+        """
+        self.shipped = set(self.staged) if replace else self.shipped | self.staged
+        self.staged = set()
+        self._write_atomic(self.shipped_path, "".join(f"{name}\n" for name in sorted(self.shipped)))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+批量变更日志 - 可断点续跑的 append-only JSONL
+
+功能:
+- 记录计划中的变更 (planned) 和执行结果 (done / failed)，每条一行
+- 计划写完后封存 (sealed)，重启时直接重放未完成的变更，无需重新扫描数据源
+- 计划未封存（扫描中途中断）时，重新扫描只补充新页面，已完成的不重复执行
+- 全部完成后删除日志文件
+
+使用方法:
+    from mutation_journal import MutationJournal
+
+    journal = MutationJournal("data/journal/archive_vocabulary.jsonl")
+    if not journal.sealed:
+        journal.plan("archive", page_ids)
+        journal.seal()
+    for page_id in journal.outstanding("archive"):
+        ...
+        journal.mark(page_id, "archive", "done")
+"""
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PLANNED = "planned"
+DONE = "done"
+FAILED = "failed"
+
+# 封存标记（计划已完整写入）
+SEAL_OP = "seal"
+
+
+class MutationJournal:
+    """单个批量任务的变更日志"""
+
+    def __init__(self, path):
+        """
+        初始化日志（存在则重放已有记录）
+
+        Args:
+            path: JSONL 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # (op, page_id) → 最新状态，按首次计划顺序排列
+        self.status: Dict[Tuple[str, str], str] = {}
+        self.sealed = False
+        self._torn = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                # 中断时最后一行可能不完整，下次追加前先换行
+                self._torn = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("op") == SEAL_OP:
+                    self.sealed = True
+                    continue
+                self.status[(entry["op"], entry["page_id"])] = entry["status"]
+
+    def _append(self, entries: List[Dict]):
+        now = datetime.now().isoformat()
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            if self._torn:
+                f.write("\n")
+                self._torn = False
+            for entry in entries:
+                f.write(json.dumps(dict(entry, ts=now), ensure_ascii=False) + "\n")
+            f.flush()
+
+    def plan(self, op: str, page_ids: Iterable[str]) -> int:
+        """
+        记录计划中的变更（已记录过的页面跳过）
+
+        Args:
+            op: 操作名（如 "archive"）
+            page_ids: 页面 ID 列表
+
+        Returns:
+            新增的计划数
+        """
+        new = []
+        for page_id in page_ids:
+            if (op, page_id) not in self.status:
+                self.status[(op, page_id)] = PLANNED
+                new.append({"op": op, "page_id": page_id, "status": PLANNED})
+        if new:
+            self._append(new)
+        return len(new)
+
+    def seal(self):
+        """标记计划已完整写入"""
+        if not self.sealed:
+            self._append([{"op": SEAL_OP, "page_id": None, "status": DONE}])
+            self.sealed = True
+
+    def mark(self, page_id: str, op: str, status: str, error: Optional[str] = None):
+        """
+        记录单个变更的执行结果
+
+        Args:
+            page_id: 页面 ID
+            op: 操作名
+            status: done / failed
+            error: 失败原因
+        """
+        entry = {"op": op, "page_id": page_id, "status": status}
+        if error:
+            entry["error"] = error
+        self._append([entry])
+        with self._lock:
+            self.status[(op, page_id)] = status
+
+    def outstanding(self, op: Optional[str] = None) -> List[str]:
+        """未完成（计划中或失败）的页面 ID，按计划顺序"""
+        return [
+            page_id for (entry_op, page_id), status in self.status.items()
+            if status != DONE and (op is None or entry_op == op)
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的变更数"""
+        counts = {PLANNED: 0, DONE: 0, FAILED: 0}
+        for status in self.status.values():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def clear(self):
+        """删除日志（任务全部完成后调用）"""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+            self.status = {}
+            self.sealed = False
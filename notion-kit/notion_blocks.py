@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Notion 页面正文获取 - 并发、递归、带磁盘缓存
+
+功能:
+- 跟随 blocks.children 分页，递归获取嵌套子块（toggle、嵌套列表等）
+- 多个页面并发获取（线程数有上限，速率由共享限流器控制）
+- 渲染结果按 page_id + last_edited_time 缓存到磁盘，未修改的页面零 API 调用
+- 默认渲染为纯文本；传入 render=notion_html.blocks_html 得到 Anki HTML
+- 传入 media_store 时下载正文中的图片/附件，渲染函数收到 block_id → 本地文件名
+
+使用方法:
+    from notion_blocks import BlockFetcher
+
+    fetcher = BlockFetcher(cache_dir="data/cache/page_bodies")
+    bodies = fetcher.fetch_bodies(pages)   # {page_id: 正文}
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .notion_http import NotionHTTP, get_http, paginate
+    from .notion_props import plain_text
+except ImportError:
+    from notion_http import NotionHTTP, get_http, paginate
+    from notion_props import plain_text
+
+# 渲染格式变化时递增，旧缓存自动失效
+RENDER_VERSION = 3
+
+TEXT_BLOCKS = {
+    "paragraph", "bulleted_list_item", "numbered_list_item", "to_do", "toggle",
+    "heading_1", "heading_2", "heading_3", "quote", "callout", "code",
+}
+
+
+def render_text(blocks: List[Dict], depth: int = 0) -> str:
+    """
+    将块树渲染为纯文本（每个块一行，子块缩进）
+
+    Args:
+        blocks: 块列表（子块位于 block["children"]）
+        depth: 缩进层级
+
+    Returns:
+        纯文本
+    """
+    lines = []
+    for block in blocks:
+        block_type = block.get("type")
+        if block_type in TEXT_BLOCKS:
+            text = plain_text(block.get(block_type, {}).get("rich_text"))
+            if text:
+                lines.append("  " * depth + text)
+        children = block.get("children")
+        if children:
+            child_text = render_text(children, depth + 1)
+            if child_text:
+                lines.append(child_text)
+    return "\n".join(lines)
+
+
+class BlockFetcher:
+    """页面正文获取器"""
+
+    def __init__(self, http: Optional[NotionHTTP] = None, cache_dir=None, max_workers: int = 4,
+                 render: Callable[..., str] = render_text, media_store=None):
+        """
+        初始化获取器
+
+        Args:
+            http: Notion 连接池（默认使用共享实例）
+            cache_dir: 正文缓存目录（None 表示不缓存）
+            max_workers: 并发获取的页面数上限
+            render: 块树 → 正文的渲染函数（缓存按渲染函数区分）
+            media_store: 媒体存储（media_store.MediaStore；None 表示不下载媒体）
+        """
+        self.http = http or get_http()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self.render = render
+        self.media_store = media_store
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def fetch_children(self, block_id: str) -> List[Dict]:
+        """
+        获取块的全部子块（跟随分页并递归）
+
+        Args:
+            block_id: 块或页面 ID
+
+        Returns:
+            子块列表，嵌套子块放在 block["children"]
+        """
+        def fetch(cursor):
+            params = {"page_size": 100}
+            if cursor:
+                params["start_cursor"] = cursor
+            response = self.http.get(f"blocks/{block_id}/children", params=params, timeout=60)
+            response.raise_for_status()
+            return response.json()
+
+        blocks = []
+        for results in paginate(fetch, prefetch=False):
+            for block in results:
+                if block.get("has_children") and block.get("type") != "child_page":
+                    block["children"] = self.fetch_children(block["id"])
+                blocks.append(block)
+        return blocks
+
+    def _cache_path(self, page_id: str) -> Optional[Path]:
+        return self.cache_dir / f"{page_id}.json" if self.cache_dir else None
+
+    def _load_cached(self, page: Dict) -> Optional[str]:
+        path = self._cache_path(page["id"])
+        if not path or not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("version") != RENDER_VERSION or cached.get("renderer") != self.render.__name__:
+            return None
+        if cached.get("last_edited_time") != page.get("last_edited_time"):
+            return None
+        return cached.get("body")
+
+    def _save_cached(self, page: Dict, body: str):
+        path = self._cache_path(page["id"])
+        if not path:
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": RENDER_VERSION,
+                "renderer": self.render.__name__,
+                "last_edited_time": page.get("last_edited_time"),
+                "body": body,
+            }, f, ensure_ascii=False)
+
+    def page_body(self, page: Dict) -> str:
+        """
+        获取单个页面的渲染正文（优先读缓存）
+
+        Args:
+            page: 页面对象（需要 id 和 last_edited_time）
+
+        Returns:
+            正文文本，失败返回空字符串
+        """
+        cached = self._load_cached(page)
+        # 缓存引用的媒体文件已从存储中删除时重新获取
+        if cached is not None and not (self.media_store and self.media_store.missing(cached)):
+            return cached
+
+        try:
+            blocks = self.fetch_children(page["id"])
+            if self.media_store:
+                body = self.render(blocks, self.media_store.fetch_blocks(blocks)).strip()
+            else:
+                body = self.render(blocks).strip()
+        except Exception as e:
+            print(f"   ⚠️  获取页面内容失败 {page['id'][:8]}: {e}")
+            return ""
+
+        self._save_cached(page, body)
+        return body
+
+    def fetch_bodies(self, pages: List[Dict]) -> Dict[str, str]:
+        """
+        并发获取多个页面的正文
+
+        Args:
+            pages: 页面对象列表
+
+        Returns:
+            page_id → 正文
+        """
+        if not pages:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            bodies = pool.map(self.page_body, pages)
+            return {page["id"]: body for page, body in zip(pages, bodies)}
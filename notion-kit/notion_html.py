@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Notion 富文本 / 块 → Anki HTML 渲染
+
+功能:
+- 富文本注解（粗体、斜体、删除线、下划线、行内代码、颜色）、链接、行内公式
+- 块：段落、标题、有序/无序列表（含嵌套）、待办、引用、callout、toggle、代码块、公式、分隔线
+- 媒体块：图片 → <img>，音频/视频 → [sound:]，附件/PDF → 链接（本地文件名由 media_store 提供）
+- 输出经过转义：文本一律 html.escape，链接只保留 http/https/mailto，颜色与代码语言查表
+- 富文本按内容缓存（同一段富文本只渲染一次），注解 → 标签的映射预先编译为查表
+
+转换在 anki_notes.convert_page 中进行，完整牌组重建时随转换一起在进程池中分批执行。
+
+使用方法:
+    from notion_html import rich_text_html, blocks_html
+
+    back = rich_text_html(page["properties"]["Back"]["rich_text"])
+    body = blocks_html(blocks)          # BlockFetcher.fetch_children 的输出
+    body = blocks_html(blocks, media)   # media: block_id → 本地媒体文件名
+"""
+
+import html
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# 注解 → (开始标签, 结束标签)，按嵌套顺序排列（code 在最内层）
+ANNOTATION_TAGS = [
+    ("code", "<code>", "</code>"),
+    ("bold", "<b>", "</b>"),
+    ("italic", "<i>", "</i>"),
+    ("strikethrough", "<s>", "</s>"),
+    ("underline", "<u>", "</u>"),
+]
+
+# Notion 颜色 → CSS 颜色（其余颜色名忽略）
+NOTION_COLORS = {
+    "gray": "#787774", "brown": "#9f6b53", "orange": "#d9730d", "yellow": "#cb912f",
+    "green": "#448361", "blue": "#337ea9", "purple": "#9065b0", "pink": "#c14c8a", "red": "#d44c47",
+}
+NOTION_BACKGROUNDS = {
+    "gray": "#f1f1ef", "brown": "#f4eeee", "orange": "#fbecdd", "yellow": "#fbf3db",
+    "green": "#edf3ec", "blue": "#e7f3f8", "purple": "#f6f3f9", "pink": "#faf1f5", "red": "#fdebec",
+}
+
+SAFE_URL_SCHEMES = ("http://", "https://", "mailto:")
+_LANGUAGE_RE = re.compile(r"[^a-z0-9+#-]")
+
+HEADING_TAGS = {"heading_1": "h3", "heading_2": "h4", "heading_3": "h5"}
+LIST_TAGS = {"bulleted_list_item": "ul", "numbered_list_item": "ol"}
+MEDIA_BLOCK_TYPES = {"image", "audio", "video", "file", "pdf"}
+
+RICH_TEXT_CACHE_SIZE = 8192
+
+
+def _color_style(color: Optional[str]) -> Optional[str]:
+    """Notion 颜色名 → style 属性值"""
+    if not color or color == "default":
+        return None
+    if color.endswith("_background"):
+        value = NOTION_BACKGROUNDS.get(color[:-len("_background")])
+        return f"background-color: {value}" if value else None
+    value = NOTION_COLORS.get(color)
+    return f"color: {value}" if value else None
+
+
+def _safe_url(url: Optional[str]) -> Optional[str]:
+    """只允许 http/https/mailto 链接"""
+    if url and url.strip().lower().startswith(SAFE_URL_SCHEMES):
+        return html.escape(url.strip(), quote=True)
+    return None
+
+
+def _text(value: str) -> str:
+    """转义文本，换行转为 <br>"""
+    return html.escape(value, quote=False).replace("\n", "<br>")
+
+
+def _render_item(item: Dict) -> str:
+    """渲染单个富文本片段"""
+    if item.get("type") == "equation":
+        # Anki 内置 MathJax
+        expression = item.get("equation", {}).get("expression") or item.get("plain_text", "")
+        return _text(f"\\({expression}\\)")
+
+    out = _text(item.get("plain_text", ""))
+    if not out:
+        return ""
+
+    annotations = item.get("annotations") or {}
+    for key, start, end in ANNOTATION_TAGS:
+        if annotations.get(key):
+            out = f"{start}{out}{end}"
+
+    style = _color_style(annotations.get("color"))
+    if style:
+        out = f'<span style="{style}">{out}</span>'
+
+    href = _safe_url(item.get("href") or (item.get("text", {}).get("link") or {}).get("url"))
+    if href:
+        out = f'<a href="{href}">{out}</a>'
+    return out
+
+
+@lru_cache(maxsize=RICH_TEXT_CACHE_SIZE)
+def _render_payload(payload: str) -> str:
+    return "".join(_render_item(item) for item in json.loads(payload))
+
+
+def rich_text_html(items: Optional[List[Dict]]) -> str:
+    """
+    将富文本数组渲染为 HTML（按内容缓存）
+
+    Args:
+        items: Notion 富文本数组
+
+    Returns:
+        HTML 字符串
+    """
+    if not items:
+        return ""
+    return _render_payload(json.dumps(items, sort_keys=True, ensure_ascii=False))
+
+
+def _media_html(block: Dict, data: Dict, media: Dict[str, str]) -> str:
+    """渲染媒体块：已下载的用本地文件名，外部图片保留链接，其余忽略"""
+    block_type = block["type"]
+    caption = rich_text_html(data.get("caption"))
+    name = media.get(block.get("id"))
+    src = html.escape(name, quote=True) if name else None
+
+    if block_type == "image":
+        src = src or _safe_url((data.get("external") or {}).get("url"))
+        out = f'<img src="{src}">' if src else ""
+    elif not src:
+        return ""
+    elif block_type in ("audio", "video"):
+        out = f"[sound:{src}]"
+    else:
+        label = _text(data.get("name") or "") or caption or src
+        return f'<div><a href="{src}">{label}</a></div>'
+
+    if out and caption:
+        out += f"<div><small>{caption}</small></div>"
+    return f"<div>{out}</div>" if out else ""
+
+
+def _block_html(block: Dict, media: Dict[str, str]) -> str:
+    """渲染单个（非列表）块及其子块"""
+    block_type = block.get("type")
+    data = block.get(block_type, {}) if block_type else {}
+    if block_type in MEDIA_BLOCK_TYPES:
+        return _media_html(block, data, media)
+
+    text = rich_text_html(data.get("rich_text"))
+    children = blocks_html(block.get("children") or [], media)
+
+    if block_type == "paragraph":
+        return (f"<p>{text}</p>" if text else "") + children
+    if block_type in HEADING_TAGS:
+        tag = HEADING_TAGS[block_type]
+        return f"<{tag}>{text}</{tag}>" + children
+    if block_type == "to_do":
+        mark = "☑" if data.get("checked") else "☐"
+        nested = f'<div style="margin-left: 1.5em">{children}</div>' if children else ""
+        return f"<div>{mark} {text}</div>{nested}"
+    if block_type in ("quote", "callout"):
+        return f"<blockquote>{text}{children}</blockquote>"
+    if block_type == "toggle":
+        return f"<details><summary>{text}</summary>{children}</details>"
+    if block_type == "code":
+        language = _LANGUAGE_RE.sub("", (data.get("language") or "").lower())
+        code = html.escape("".join(item.get("plain_text", "") for item in data.get("rich_text") or []), quote=False)
+        attr = f' class="language-{language}"' if language else ""
+        return f"<pre><code{attr}>{code}</code></pre>"
+    if block_type == "equation":
+        expression = data.get("expression") or ""
+        return "<div>" + _text(f"\\[{expression}\\]") + "</div>"
+    if block_type == "divider":
+        return "<hr>"
+    # 未支持的块类型：保留文本和子块
+    return (f"<div>{text}</div>" if text else "") + children
+
+
+def blocks_html(blocks: List[Dict], media: Optional[Dict[str, str]] = None) -> str:
+    """
+    将块树渲染为 HTML（相邻的列表项合并为同一个 <ul>/<ol>）
+
+    Args:
+        blocks: 块列表（子块位于 block["children"]）
+        media: block_id → 本地媒体文件名（MediaStore.fetch_blocks 的输出）
+
+    Returns:
+        HTML 字符串
+    """
+    media = media or {}
+    parts = []
+    open_list = None
+    for block in blocks:
+        list_tag = LIST_TAGS.get(block.get("type"))
+        if list_tag != open_list:
+            if open_list:
+                parts.append(f"</{open_list}>")
+            if list_tag:
+                parts.append(f"<{list_tag}>")
+            open_list = list_tag
+
+        if list_tag:
+            data = block.get(block["type"], {})
+            children = blocks_html(block.get("children") or [], media)
+            parts.append(f"<li>{rich_text_html(data.get('rich_text'))}{children}</li>")
+        else:
+            parts.append(_block_html(block, media))
+
+    if open_list:
+        parts.append(f"</{open_list}>")
+    return "".join(parts)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Notion HTTP 连接池 - 所有脚本共享的 keep-alive 传输层 (API 2025-09-03)
+
+功能:
+- 一个进程内共享的 httpx 连接池（复用 TLS 连接）
+- 同步 (NotionHTTP) 与 asyncio (AsyncNotionHTTP) 两个前端
+- 可配置连接池大小、默认请求头和超时
+- notion_client.Client 通过 sdk() 复用同一个连接池
+- 所有请求经过进程内共享的自适应限流器（见 rate_limit.py）
+
+使用方法:
+    from notion_http import get_http
+
+    http = get_http()
+    resp = http.post(f"data_sources/{ds_id}/query", json={"page_size": 100})
+    notion = http.sdk()
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+from notion_client import AsyncClient, Client
+
+try:
+    from .rate_limit import AsyncRateLimitedTransport, RateLimitedTransport, RateLimiter, get_limiter
+except ImportError:
+    from rate_limit import AsyncRateLimitedTransport, RateLimitedTransport, RateLimiter, get_limiter
+
+NOTION_VERSION = "2025-09-03"
+DEFAULT_BASE_URL = "https://api.notion.com"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 60.0
+
+
+def paginate(fetch: Callable[[Optional[str]], Dict], prefetch: bool = True) -> Iterator[List[Dict]]:
+    """
+    按游标逐页产出查询结果
+
+    处理当前页时在后台线程预取下一页；调用方提前 break 时不再继续翻页。
+
+    Args:
+        fetch: 接收 start_cursor（首页为 None）并返回查询响应 dict 的函数
+        prefetch: 是否在后台预取下一页
+
+    Yields:
+        每一页的 results 列表
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        data = fetch(None)
+        while True:
+            cursor = data.get("next_cursor") if data.get("has_more") else None
+            pending = executor.submit(fetch, cursor) if executor and cursor else None
+
+            yield data.get("results", [])
+
+            if not cursor:
+                return
+            data = pending.result() if pending else fetch(cursor)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _pool_limits(pool_size: int) -> httpx.Limits:
+    """连接池上限（keep-alive 连接数与最大连接数相同）"""
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=30.0,
+    )
+
+
+def _default_headers(token: str, notion_version: str, headers: Optional[Dict]) -> Dict:
+    """构建 Notion 默认请求头"""
+    merged = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+        "Notion-Version": notion_version,
+    }
+    if headers:
+        merged.update(headers)
+    return merged
+
+
+class NotionHTTP:
+    """同步 Notion 传输层（httpx 连接池）"""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        notion_version: str = NOTION_VERSION,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: Optional[Dict] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+    ):
+        """
+        初始化连接池
+
+        Args:
+            token: Notion Token（默认读取 NOTION_TOKEN）
+            notion_version: Notion API 版本
+            base_url: API 根地址（默认读取 NOTION_BASE_URL，用于本地测试）
+            pool_size: 连接池大小（默认读取 NOTION_POOL_SIZE）
+            timeout: 默认超时（秒），可在单次请求中覆盖
+            headers: 额外的默认请求头
+            limiter: 限流器（默认使用进程内共享实例）
+            max_retries: 429/5xx 的最大重试次数
+        """
+        self.token = token or os.getenv("NOTION_TOKEN")
+        if not self.token:
+            raise ValueError("❌ 未找到 NOTION_TOKEN，请在 notion-kit/.env 中设置")
+
+        self.notion_version = notion_version
+        self.base_url = (base_url or os.getenv("NOTION_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.pool_size = pool_size or int(os.getenv("NOTION_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.timeout = timeout
+
+        # 连接池属于 transport，所有前端（含 SDK）共享它
+        self.limiter = limiter or get_limiter()
+        self.transport = RateLimitedTransport(
+            httpx.HTTPTransport(limits=_pool_limits(self.pool_size)),
+            self.limiter,
+            max_retries=max_retries,
+        )
+        self.client = httpx.Client(
+            transport=self.transport,
+            base_url=f"{self.base_url}/v1/",
+            headers=_default_headers(self.token, notion_version, headers),
+            timeout=timeout,
+        )
+
+    def request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """
+        发送请求
+
+        Args:
+            method: HTTP 方法
+            path: 相对路径（如 "pages/{id}"）
+            timeout: 本次请求超时（秒），默认使用连接池配置
+
+        Returns:
+            httpx.Response
+        """
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return self.client.request(method, path, **kwargs)
+
+    def get(self, path: str, **kwargs) -> httpx.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> httpx.Response:
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> httpx.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def query(self, data_source_id: str, body: Optional[Dict] = None,
+              start_cursor: Optional[str] = None, timeout: Optional[float] = None,
+              filter_properties: Optional[List[str]] = None) -> Dict:
+        """
+        查询数据源的一页结果
+
+        Args:
+            data_source_id: 数据源 ID
+            body: 查询体（filter/sorts/page_size）
+            start_cursor: 分页游标
+            timeout: 本次请求超时（秒）
+            filter_properties: 只返回这些属性（属性 ID）
+
+        Returns:
+            查询响应 dict
+
+        Raises:
+            httpx.HTTPStatusError: 非 2xx 响应（429/5xx 已在限流层重试过）
+        """
+        body = dict(body or {})
+        if start_cursor:
+            body["start_cursor"] = start_cursor
+        params = {"filter_properties": filter_properties} if filter_properties else None
+        response = self.post(f"data_sources/{data_source_id}/query", json=body, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_batches(self, data_source_id: str, body: Optional[Dict] = None, page_size: int = 100,
+                     prefetch: bool = True, timeout: Optional[float] = None,
+                     filter_properties: Optional[List[str]] = None) -> Iterator[List[Dict]]:
+        """逐页产出数据源查询结果（预取下一页），参数同 query"""
+        body = dict(body or {}, page_size=page_size)
+        return paginate(
+            lambda cursor: self.query(data_source_id, body, start_cursor=cursor, timeout=timeout,
+                                      filter_properties=filter_properties),
+            prefetch=prefetch,
+        )
+
+    def iter_query(self, data_source_id: str, body: Optional[Dict] = None, page_size: int = 100,
+                   prefetch: bool = True, timeout: Optional[float] = None,
+                   filter_properties: Optional[List[str]] = None) -> Iterator[Dict]:
+        """逐个产出数据源中的页面对象，参数同 iter_batches"""
+        for results in self.iter_batches(data_source_id, body, page_size, prefetch, timeout, filter_properties):
+            yield from results
+
+    def sdk(self) -> Client:
+        """返回复用本连接池的 notion_client.Client（重试由限流层负责）"""
+        return Client(
+            auth=self.token,
+            notion_version=self.notion_version,
+            base_url=self.base_url,
+            timeout_ms=int(self.timeout * 1000),
+            retry=False,
+            client=httpx.Client(transport=self.transport),
+        )
+
+    def close(self):
+        """关闭连接池"""
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncNotionHTTP:
+    """asyncio Notion 传输层（httpx 异步连接池）"""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        notion_version: str = NOTION_VERSION,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: Optional[Dict] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+    ):
+        """参数同 NotionHTTP"""
+        self.token = token or os.getenv("NOTION_TOKEN")
+        if not self.token:
+            raise ValueError("❌ 未找到 NOTION_TOKEN，请在 notion-kit/.env 中设置")
+
+        self.notion_version = notion_version
+        self.base_url = (base_url or os.getenv("NOTION_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.pool_size = pool_size or int(os.getenv("NOTION_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.timeout = timeout
+
+        self.limiter = limiter or get_limiter()
+        self.transport = AsyncRateLimitedTransport(
+            httpx.AsyncHTTPTransport(limits=_pool_limits(self.pool_size)),
+            self.limiter,
+            max_retries=max_retries,
+        )
+        self.client = httpx.AsyncClient(
+            transport=self.transport,
+            base_url=f"{self.base_url}/v1/",
+            headers=_default_headers(self.token, notion_version, headers),
+            timeout=timeout,
+        )
+
+    async def request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """发送请求（参数同 NotionHTTP.request）"""
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return await self.client.request(method, path, **kwargs)
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", path, **kwargs)
+
+    def sdk(self) -> AsyncClient:
+        """返回复用本连接池的 notion_client.AsyncClient（重试由限流层负责）"""
+        return AsyncClient(
+            auth=self.token,
+            notion_version=self.notion_version,
+            base_url=self.base_url,
+            timeout_ms=int(self.timeout * 1000),
+            retry=False,
+            client=httpx.AsyncClient(transport=self.transport),
+        )
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+_shared: Dict[str, NotionHTTP] = {}
+_shared_lock = threading.Lock()
+
+
+def get_http(token: Optional[str] = None, **kwargs) -> NotionHTTP:
+    """
+    获取进程内共享的同步连接池（按 token 缓存）
+
+    Args:
+        token: Notion Token（默认读取 NOTION_TOKEN）
+        **kwargs: 首次创建时传给 NotionHTTP 的参数
+
+    Returns:
+        NotionHTTP 实例
+    """
+    token = token or os.getenv("NOTION_TOKEN")
+    with _shared_lock:
+        http = _shared.get(token)
+        if http is None:
+            http = NotionHTTP(token=token, **kwargs)
+            _shared[token] = http
+        return http
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Notion 元数据磁盘缓存 - database_id → data_source_id 与属性 schema
+
+功能:
+- 缓存 databases.retrieve 解析出的 data_source_id，启动时省去一次往返
+- 缓存数据源属性 schema（供解码器和 filter_properties 投影使用）
+- 条目带 TTL（默认 24 小时，可通过 NOTION_META_TTL 覆盖）
+- 查询/写入遇到 schema 错误（404、validation_error）时显式失效
+
+使用方法:
+    from notion_meta import get_metadata_cache
+
+    meta = get_metadata_cache(http, "data/cache/notion_metadata.json")
+    ds_id = meta.data_source_id(database_id)
+    schema = meta.schema(ds_id)
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+try:
+    from .notion_http import NotionHTTP, get_http
+    from .notion_props import fetch_schema
+except ImportError:
+    from notion_http import NotionHTTP, get_http
+    from notion_props import fetch_schema
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_CACHE_FILE = Path.home() / ".cache" / "notion-kit" / "metadata.json"
+
+
+def is_schema_error(response: Optional[httpx.Response]) -> bool:
+    """
+    判断响应是否说明缓存的数据源或 schema 已过期
+
+    Args:
+        response: Notion 错误响应
+
+    Returns:
+        404（数据源不存在）或 400 validation_error（属性不存在/类型不符）
+    """
+    if response is None:
+        return False
+    if response.status_code == 404:
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        return response.json().get("code") == "validation_error"
+    except ValueError:
+        return False
+
+
+class MetadataCache:
+    """Notion 元数据缓存（JSON 文件）"""
+
+    def __init__(self, path=None, http: Optional[NotionHTTP] = None, ttl: Optional[float] = None):
+        """
+        初始化缓存
+
+        Args:
+            path: 缓存文件路径（默认读取 NOTION_META_CACHE，否则 ~/.cache/notion-kit/metadata.json）
+            http: Notion 连接池（默认使用共享实例）
+            ttl: 条目有效期（秒）
+        """
+        self.path = Path(path or os.getenv("NOTION_META_CACHE") or DEFAULT_CACHE_FILE)
+        self.http = http
+        self.ttl = ttl if ttl is not None else float(os.getenv("NOTION_META_TTL", DEFAULT_TTL))
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("databases", {})
+        data.setdefault("schemas", {})
+        return data
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def _http(self) -> NotionHTTP:
+        if self.http is None:
+            self.http = get_http()
+        return self.http
+
+    def data_source_id(self, database_id: str) -> str:
+        """
+        解析数据库的（第一个）数据源 ID
+
+        Args:
+            database_id: 数据库 ID
+
+        Returns:
+            数据源 ID；获取失败时返回 database_id（不缓存）
+        """
+        with self._lock:
+            entry = self.data["databases"].get(database_id)
+            if self._fresh(entry):
+                return entry["data_source_id"]
+
+        try:
+            response = self._http().get(f"databases/{database_id}", timeout=30)
+            response.raise_for_status()
+            data_sources = response.json().get("data_sources", [])
+        except Exception as e:
+            print(f"⚠️  获取 data_source_id 失败，使用 database_id: {e}")
+            return database_id
+
+        # 没有 data_sources 字段（旧版本 API）时直接使用 database_id
+        data_source_id = data_sources[0]["id"] if data_sources else database_id
+        with self._lock:
+            self.data["databases"][database_id] = {
+                "data_source_id": data_source_id,
+                "fetched_at": time.time(),
+            }
+            self._save()
+        return data_source_id
+
+    def schema(self, data_source_id: str) -> Dict[str, Dict]:
+        """
+        读取数据源属性 schema
+
+        Args:
+            data_source_id: 数据源 ID
+
+        Returns:
+            属性名 → 属性定义；获取失败返回空 dict（不缓存）
+        """
+        with self._lock:
+            entry = self.data["schemas"].get(data_source_id)
+            if self._fresh(entry):
+                return entry["properties"]
+
+        properties = fetch_schema(self._http(), data_source_id)
+        if properties:
+            with self._lock:
+                self.data["schemas"][data_source_id] = {
+                    "properties": properties,
+                    "fetched_at": time.time(),
+                }
+                self._save()
+        return properties
+
+    def invalidate(self, data_source_id: Optional[str] = None, database_id: Optional[str] = None):
+        """
+        使缓存条目失效（不传参数时清空全部）
+
+        Args:
+            data_source_id: 失效该数据源的 schema 及指向它的数据库映射
+            database_id: 失效该数据库的映射
+        """
+        with self._lock:
+            if data_source_id is None and database_id is None:
+                self.data = {"databases": {}, "schemas": {}}
+            if database_id:
+                self.data["databases"].pop(database_id, None)
+            if data_source_id:
+                self.data["schemas"].pop(data_source_id, None)
+                for db_id, entry in list(self.data["databases"].items()):
+                    if entry.get("data_source_id") == data_source_id:
+                        del self.data["databases"][db_id]
+            self._save()
+
+
+_caches: Dict[Path, MetadataCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_metadata_cache(http: Optional[NotionHTTP] = None, path=None) -> MetadataCache:
+    """
+    获取进程内共享的元数据缓存（按文件路径缓存）
+
+    Args:
+        http: Notion 连接池（首次创建时使用）
+        path: 缓存文件路径
+
+    Returns:
+        MetadataCache 实例
+    """
+    resolved = Path(path or os.getenv("NOTION_META_CACHE") or DEFAULT_CACHE_FILE).resolve()
+    with _caches_lock:
+        cache = _caches.get(resolved)
+        if cache is None:
+            cache = MetadataCache(resolved, http)
+            _caches[resolved] = cache
+        elif cache.http is None:
+            cache.http = http
+        return cache
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Notion 数据源本地镜像 (SQLite)
+
+功能:
+- 将数据源的页面持久化到本地 SQLite，常用属性建索引
+  (Front/Deck/Tags/Synced/created_time)
+- 增量刷新：只查询 last_edited_time 不早于水位线的页面
+- 定期对账：增量查询看不到 Notion 中已删除/归档的页面，每隔 RECONCILE_HOURS 小时
+  只取页面 ID 扫描一次数据源，删除镜像中已不存在的页面
+- 可选属性投影 (filter_properties)，只传输需要的属性
+- 去重、重复检测、未同步卡片筛选直接读本地镜像
+
+使用方法:
+    from notion_mirror import NotionMirror
+
+    mirror = NotionMirror("data/notion_mirror.db", data_source_id, properties=ANKI_CARD_PROPERTIES)
+    mirror.refresh()
+    titles = mirror.titles()
+    cards = mirror.pages(tag="欧路")
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+try:
+    from .notion_http import NotionHTTP, get_http
+    from .notion_props import PageDecoder, fetch_schema, plain_text
+    from .notion_meta import MetadataCache, is_schema_error
+except ImportError:
+    from notion_http import NotionHTTP, get_http
+    from notion_props import PageDecoder, fetch_schema, plain_text
+    from notion_meta import MetadataCache, is_schema_error
+
+# Anki Cards 镜像需要的属性（同步脚本与 Eudic/清理脚本共用同一份镜像）
+ANKI_CARD_PROPERTIES = ["Front", "Back", "Deck", "Tags", "Source", "Synced"]
+# Cortex 镜像需要的属性（完整牌组重建使用）
+CORTEX_CARD_PROPERTIES = ["Name", "Type", "Status", "Tags", "Source", "Last Reviewed"]
+# 表示镜像保存了全部属性
+ALL_PROPERTIES = "*"
+# 对账间隔（小时）
+RECONCILE_HOURS = 24
+# 标题属性的固定 ID（对账扫描只取这一个属性）
+TITLE_PROPERTY_ID = "title"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id               TEXT PRIMARY KEY,
+    data_source_id   TEXT NOT NULL,
+    front            TEXT,
+    deck             TEXT,
+    synced           INTEGER,
+    created_time     TEXT,
+    last_edited_time TEXT,
+    page_json        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_front ON pages (data_source_id, front);
+CREATE INDEX IF NOT EXISTS idx_pages_deck ON pages (data_source_id, deck);
+CREATE INDEX IF NOT EXISTS idx_pages_synced ON pages (data_source_id, synced);
+CREATE INDEX IF NOT EXISTS idx_pages_created ON pages (data_source_id, created_time);
+
+CREATE TABLE IF NOT EXISTS page_tags (
+    page_id TEXT NOT NULL,
+    tag     TEXT NOT NULL,
+    PRIMARY KEY (page_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_page_tags_tag ON page_tags (tag);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    data_source_id TEXT PRIMARY KEY,
+    last_edited    TEXT,
+    refreshed_at   TEXT,
+    projection     TEXT,
+    reconciled_at  TEXT
+);
+"""
+
+
+def _columns(page: Dict) -> Dict:
+    """从页面对象提取索引列"""
+    props = page.get("properties", {})
+    front = None
+    for prop in props.values():
+        if prop.get("type") == "title":
+            front = plain_text(prop.get("title", []))
+            break
+
+    deck = (props.get("Deck") or {}).get("select")
+    synced = props.get("Synced")
+    tags = [item["name"] for item in (props.get("Tags") or {}).get("multi_select", [])]
+
+    return {
+        "front": front,
+        "deck": deck["name"] if deck else None,
+        "synced": int(synced.get("checkbox", False)) if synced else None,
+        "tags": tags,
+    }
+
+
+class NotionMirror:
+    """单个 Notion 数据源的本地镜像"""
+
+    def __init__(self, db_path, data_source_id: str, http: Optional[NotionHTTP] = None,
+                 properties: Optional[List[str]] = None, meta: Optional[MetadataCache] = None):
+        """
+        初始化镜像
+
+        Args:
+            db_path: SQLite 文件路径
+            data_source_id: 数据源 ID
+            http: Notion 连接池（默认使用共享实例）
+            properties: 只镜像这些属性（属性名）；None 表示全部
+            meta: 元数据缓存（提供 schema；None 时每次刷新都读取 schema）
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.data_source_id = data_source_id
+        self.http = http or get_http()
+        self.properties = sorted(properties) if properties else None
+        self.meta = meta
+
+        # 允许在流水线的查询线程中使用（同一时刻只有一个线程访问）
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        # 旧版镜像没有 projection 列（保存的是全部属性）和 reconciled_at 列
+        for column in ("projection", "reconciled_at"):
+            try:
+                self.conn.execute(f"ALTER TABLE watermarks ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """已镜像页面中最新的 last_edited_time"""
+        row = self.conn.execute(
+            "SELECT last_edited FROM watermarks WHERE data_source_id = ?",
+            (self.data_source_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @property
+    def projection(self) -> Optional[str]:
+        """镜像中已保存的属性集合（换行分隔；"*" 为全部；从未刷新为 None）"""
+        row = self.conn.execute(
+            "SELECT last_edited, projection FROM watermarks WHERE data_source_id = ?",
+            (self.data_source_id,)
+        ).fetchone()
+        if not row or not row[0]:
+            return None
+        return row[1] or ALL_PROPERTIES
+
+    @property
+    def reconciled_at(self) -> Optional[str]:
+        """上次对账时间（从未对账为 None）"""
+        row = self.conn.execute(
+            "SELECT reconciled_at FROM watermarks WHERE data_source_id = ?",
+            (self.data_source_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _covers(self, stored: Optional[str], wanted: str) -> bool:
+        if stored is None or stored == ALL_PROPERTIES:
+            return True
+        return wanted != ALL_PROPERTIES and set(wanted.split("\n")) <= set(stored.split("\n"))
+
+    def _filter_properties(self) -> Optional[List[str]]:
+        """把投影属性名解析为属性 ID；schema 获取失败时不投影"""
+        if not self.properties:
+            return None
+        if self.meta:
+            schema = self.meta.schema(self.data_source_id)
+        else:
+            schema = fetch_schema(self.http, self.data_source_id)
+        if not schema:
+            return None
+        return PageDecoder(schema).property_ids(self.properties)
+
+    def _set_watermark(self, last_edited: Optional[str], projection: Optional[str] = None):
+        self.conn.execute(
+            "INSERT INTO watermarks (data_source_id, last_edited, refreshed_at, projection) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(data_source_id) DO UPDATE SET last_edited = excluded.last_edited, "
+            "refreshed_at = excluded.refreshed_at, projection = excluded.projection",
+            (self.data_source_id, last_edited, datetime.now().isoformat(), projection)
+        )
+
+    def upsert(self, pages: Iterable[Dict]):
+        """写入（或删除已归档的）页面"""
+        for page in pages:
+            page_id = page["id"]
+            if page.get("archived") or page.get("in_trash"):
+                self.forget([page_id])
+                continue
+
+            cols = _columns(page)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(id, data_source_id, front, deck, synced, created_time, last_edited_time, page_json) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    page_id, self.data_source_id, cols["front"], cols["deck"], cols["synced"],
+                    page.get("created_time"), page.get("last_edited_time"),
+                    json.dumps(page, ensure_ascii=False),
+                )
+            )
+            self.conn.execute("DELETE FROM page_tags WHERE page_id = ?", (page_id,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO page_tags (page_id, tag) VALUES (?, ?)",
+                [(page_id, tag) for tag in cols["tags"]]
+            )
+
+    def forget(self, page_ids: Iterable[str]):
+        """从镜像中移除页面（本地归档后调用）"""
+        ids = [(page_id,) for page_id in page_ids]
+        self.conn.executemany("DELETE FROM pages WHERE id = ?", ids)
+        self.conn.executemany("DELETE FROM page_tags WHERE page_id = ?", ids)
+        self.conn.commit()
+
+    def refresh(self, full: bool = False, reconcile_hours: Optional[float] = RECONCILE_HOURS) -> int:
+        """
+        从 Notion 增量刷新镜像
+
+        Args:
+            full: 清空后全量重建（用于页面在 Notion 中被删除后）
+            reconcile_hours: 距上次对账超过这么多小时则对账（None 表示不对账）
+
+        Returns:
+            本次拉取的页面数
+        """
+        # 记录需要的属性集合；schema 获取失败时退化为全量属性（超集）
+        projection = "\n".join(self.properties) if self.properties else ALL_PROPERTIES
+        filter_properties = self._filter_properties()
+
+        # 投影扩大后旧页面缺少新属性，需要全量重建
+        if not self._covers(self.projection, projection):
+            print("   镜像属性集合已变化，全量重建")
+            full = True
+
+        if full:
+            self.conn.execute(
+                "DELETE FROM page_tags WHERE page_id IN (SELECT id FROM pages WHERE data_source_id = ?)",
+                (self.data_source_id,)
+            )
+            self.conn.execute("DELETE FROM pages WHERE data_source_id = ?", (self.data_source_id,))
+            self._set_watermark(None, projection)
+            self.conn.commit()
+
+        watermark = self.watermark
+        body = {"sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+        if watermark:
+            # last_edited_time 精度为分钟，用 on_or_after 并幂等覆盖
+            body["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": watermark},
+            }
+
+        print(f"🔄 刷新本地镜像 ({'增量: ' + watermark if watermark else '全量'})...")
+        fetched = 0
+        # 全量构建本身就是一次对账
+        rebuilt = not watermark
+
+        try:
+            batches = self.http.iter_batches(
+                self.data_source_id, body, timeout=120, filter_properties=filter_properties
+            )
+            for results in batches:
+                self.upsert(results)
+                fetched += len(results)
+
+                # 结果按 last_edited_time 升序，逐页推进水位线，中断后可续
+                if results:
+                    watermark = max(watermark or "", results[-1].get("last_edited_time", ""))
+                self._set_watermark(watermark, projection)
+                self.conn.commit()
+        except Exception as e:
+            rebuilt = False
+            print(f"   ⚠️  刷新镜像失败，使用已有镜像: {e}")
+            # 数据源或属性已变化：下次运行重新获取元数据
+            if self.meta and is_schema_error(getattr(e, "response", None)):
+                self.meta.invalidate(data_source_id=self.data_source_id)
+
+        if rebuilt:
+            self._set_reconciled()
+        elif reconcile_hours is not None and self._reconcile_due(reconcile_hours):
+            self.reconcile()
+
+        print(f"   镜像更新 {fetched} 个页面，共 {self.count()} 个")
+        return fetched
+
+    def _reconcile_due(self, hours: float) -> bool:
+        last = self.reconciled_at
+        return not last or datetime.now() - datetime.fromisoformat(last) >= timedelta(hours=hours)
+
+    def _set_reconciled(self):
+        self.conn.execute(
+            "UPDATE watermarks SET reconciled_at = ? WHERE data_source_id = ?",
+            (datetime.now().isoformat(), self.data_source_id)
+        )
+        self.conn.commit()
+
+    def reconcile(self) -> int:
+        """
+        删除 Notion 中已不存在（删除、归档、移入回收站）的页面
+
+        只取标题属性扫描一次数据源（查询结果不含归档页面）；扫描中断时不删除任何页面
+
+        Returns:
+            删除的页面数
+        """
+        print("🧾 对账：扫描数据源中现存的页面 ID...")
+        try:
+            live = {
+                page["id"]
+                for page in self.http.iter_query(
+                    self.data_source_id, timeout=120, filter_properties=[TITLE_PROPERTY_ID]
+                )
+            }
+        except Exception as e:
+            print(f"   ⚠️  对账失败，下次刷新重试: {e}")
+            return 0
+
+        stale = [
+            row[0] for row in self.conn.execute(
+                "SELECT id FROM pages WHERE data_source_id = ?", (self.data_source_id,)
+            )
+            if row[0] not in live
+        ]
+        if stale:
+            self.forget(stale)
+            print(f"   移除 {len(stale)} 个已在 Notion 中删除的页面")
+        self._set_reconciled()
+        return len(stale)
+
+    def count(self) -> int:
+        """镜像中的页面数"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM pages WHERE data_source_id = ?", (self.data_source_id,)
+        ).fetchone()[0]
+
+    def titles(self) -> Set[str]:
+        """所有页面标题（用于去重）"""
+        rows = self.conn.execute(
+            "SELECT front FROM pages WHERE data_source_id = ? AND front IS NOT NULL AND front != ''",
+            (self.data_source_id,)
+        )
+        return {row[0] for row in rows}
+
+    def pages(self, tag: Optional[str] = None, synced: Optional[bool] = None) -> List[Dict]:
+        """
+        按条件读取页面对象
+
+        Args:
+            tag: 只返回带该标签的页面
+            synced: 按 Synced 复选框筛选
+
+        Returns:
+            页面对象列表（与 Notion 查询结果格式相同），按创建时间升序
+        """
+        return list(self.iter_pages(tag, synced))
+
+    def iter_pages(self, tag: Optional[str] = None, synced: Optional[bool] = None,
+                   batch_size: int = 500) -> Iterator[Dict]:
+        """逐个产出页面对象（按批从 SQLite 读取，内存占用与页面总数无关），参数同 pages"""
+        sql = "SELECT p.page_json FROM pages p"
+        params = []
+        if tag is not None:
+            sql += " JOIN page_tags t ON t.page_id = p.id AND t.tag = ?"
+            params.append(tag)
+        sql += " WHERE p.data_source_id = ?"
+        params.append(self.data_source_id)
+        if synced is not None:
+            sql += " AND COALESCE(p.synced, 0) = ?"
+            params.append(int(synced))
+        sql += " ORDER BY p.created_time, p.id"
+
+        cursor = self.conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row[0])
+
+    def close(self):
+        self.conn.close()
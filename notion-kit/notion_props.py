@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Notion 属性解码 - 预编译的按属性解码函数
+
+功能:
+- 按属性类型查表解码，替代逐字段的 if/elif 链
+- 富文本完整拼接（不再只取 texts[0]）
+- 每个数据源的 schema 只编译一次 (PageDecoder)
+- 属性名 → 属性 ID，用于查询时的 filter_properties 投影
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def plain_text(items: Optional[List[Dict]]) -> str:
+    """拼接富文本数组的全部 plain_text"""
+    if not items:
+        return ""
+    return "".join(item.get("plain_text", "") for item in items)
+
+
+def _name(value: Optional[Dict]) -> Optional[str]:
+    return value["name"] if value else None
+
+
+def _date_start(value: Optional[Dict]) -> Optional[str]:
+    return value["start"] if value else None
+
+
+def _formula(value: Optional[Dict]) -> Any:
+    if not value:
+        return None
+    return value.get(value.get("type"))
+
+
+# 属性类型 → 解码函数（参数为属性对象）
+DECODERS: Dict[str, Callable[[Dict], Any]] = {
+    "title": lambda prop: plain_text(prop.get("title")),
+    "rich_text": lambda prop: plain_text(prop.get("rich_text")),
+    "select": lambda prop: _name(prop.get("select")),
+    "status": lambda prop: _name(prop.get("status")),
+    "multi_select": lambda prop: [item["name"] for item in prop.get("multi_select", [])],
+    "date": lambda prop: _date_start(prop.get("date")),
+    "checkbox": lambda prop: prop.get("checkbox", False),
+    "number": lambda prop: prop.get("number"),
+    "url": lambda prop: prop.get("url"),
+    "email": lambda prop: prop.get("email"),
+    "phone_number": lambda prop: prop.get("phone_number"),
+    "created_time": lambda prop: prop.get("created_time"),
+    "last_edited_time": lambda prop: prop.get("last_edited_time"),
+    "formula": lambda prop: _formula(prop.get("formula")),
+}
+
+
+def _unsupported(prop: Dict) -> None:
+    return None
+
+
+def decode_property(prop: Optional[Dict]) -> Any:
+    """按属性自身的 type 解码单个属性对象"""
+    if not prop:
+        return None
+    return DECODERS.get(prop.get("type"), _unsupported)(prop)
+
+
+class PageDecoder:
+    """按数据源 schema 预编译的页面解码器"""
+
+    def __init__(self, schema: Optional[Dict[str, Dict]] = None):
+        """
+        初始化解码器
+
+        Args:
+            schema: 数据源 properties（名称 → {"id", "type", ...}）；
+                    为空时在首次遇到某属性时按其类型编译
+        """
+        self.schema = schema or {}
+        self.decoders: Dict[str, Callable[[Dict], Any]] = {
+            name: DECODERS.get(spec.get("type"), _unsupported)
+            for name, spec in self.schema.items()
+        }
+
+    def get(self, page: Dict, name: str) -> Any:
+        """解码页面的单个属性，属性不存在返回 None"""
+        prop = page.get("properties", {}).get(name)
+        if not prop:
+            return None
+        decoder = self.decoders.get(name)
+        if decoder is None:
+            decoder = self.decoders[name] = DECODERS.get(prop.get("type"), _unsupported)
+        return decoder(prop)
+
+    def decode(self, page: Dict, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """解码页面的多个属性（默认全部）"""
+        names = names if names is not None else page.get("properties", {}).keys()
+        return {name: self.get(page, name) for name in names}
+
+    def property_ids(self, names: Iterable[str]) -> List[str]:
+        """属性名 → 属性 ID（schema 中没有的名称原样返回）"""
+        return [self.schema.get(name, {}).get("id", name) for name in names]
+
+
+def fetch_schema(http, data_source_id: str) -> Dict[str, Dict]:
+    """
+    读取数据源的属性 schema
+
+    Args:
+        http: NotionHTTP 连接池
+        data_source_id: 数据源 ID
+
+    Returns:
+        属性名 → 属性定义；失败返回空 dict
+    """
+    try:
+        response = http.get(f"data_sources/{data_source_id}", timeout=30)
+        if response.status_code != 200:
+            return {}
+        return response.json().get("properties", {})
+    except Exception as e:
+        print(f"⚠️  获取数据源 schema 失败: {e}")
+        return {}
@@ -2,13 +2,20 @@
 """Notion API 封装模块 - 用于 Cortex 知识管理系统"""
 
 import os
-import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 from dotenv import load_dotenv
-from notion_client import Client
 from notion_client.errors import APIResponseError
 
+try:
+    from .notion_http import get_http, paginate
+    from .notion_props import PageDecoder
+    from .notion_meta import get_metadata_cache
+except ImportError:
+    from notion_http import get_http, paginate
+    from notion_props import PageDecoder
+    from notion_meta import get_metadata_cache
+
 # 加载环境变量
 load_dotenv()
 
@@ -22,61 +29,64 @@ class NotionWrapper:
         Args:
             api_version: Notion API 版本 (默认 2025-09-03，最新版本)
         """
-        self.notion = Client(
-            auth=os.getenv("NOTION_TOKEN"),
-            notion_version=api_version
-        )
+        # 复用进程内共享的 Notion 连接池
+        self.http = get_http(os.getenv("NOTION_TOKEN"), notion_version=api_version)
+        self.notion = self.http.sdk()
         self.database_id = os.getenv("DATABASE_ID")
 
         if not self.database_id:
             raise ValueError("DATABASE_ID 未在 .env 中设置")
 
         # API 2025-09-03: 使用 data_source_id 替代 database_id
-        # 自动获取第一个数据源 ID
-        self.data_source_id = self._get_data_source_id(self.database_id)
-
-    def _get_data_source_id(self, database_id: str) -> str:
+        # 自动获取第一个数据源 ID（元数据缓存在磁盘，TTL 内不再请求）
+        self.meta = get_metadata_cache(self.http)
+        self.data_source_id = self.meta.data_source_id(self.database_id)
+
+        # 属性解码器：首次使用时按数据源 schema 编译一次
+        self._decoder = None
+
+    def iter_query(self,
+                   filter_obj: Optional[Dict] = None,
+                   sorts: Optional[List[Dict]] = None,
+                   page_size: int = 100,
+                   prefetch: bool = True,
+                   properties: Optional[List[str]] = None) -> Iterator[Dict]:
         """
-        从数据库 ID 获取数据源 ID
+        流式查询数据库，自动跟随 next_cursor (API 2025-09-03)
+
+        处理当前页时后台预取下一页；提前 break 即停止翻页。
 
         Args:
-            database_id: 数据库 ID
+            filter_obj: Notion 过滤器对象
+            sorts: 排序规则列表
+            page_size: 每页数量（最大 100）
+            prefetch: 是否预取下一页
+            properties: 只返回这些属性（属性名，减少传输量）
 
-        Returns:
-            数据源 ID（单数据源数据库返回第一个）
+        Yields:
+            页面对象
         """
-        try:
-            database = self.notion.databases.retrieve(database_id)
-            data_sources = database.get("data_sources", [])
-
-            if not data_sources:
-                # 如果没有 data_sources 字段，可能是旧版本，直接返回 database_id
-                return database_id
-
-            # 返回第一个数据源 ID
-            return data_sources[0]["id"]
-        except Exception as e:
-            print(f"⚠️  获取 data_source_id 失败，使用 database_id: {e}")
-            return database_id
-
-    def _retry_on_rate_limit(self, func, *args, max_retries=3, **kwargs):
-        """处理速率限制，自动重试"""
-        for attempt in range(max_retries):
-            try:
-                return func(*args, **kwargs)
-            except APIResponseError as e:
-                if e.code == "rate_limited" and attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # 指数退避
-                    print(f"⚠️  速率限制，等待 {wait_time}s 后重试...")
-                    time.sleep(wait_time)
-                else:
-                    raise
+        params = {"page_size": page_size}
+        if filter_obj:
+            params["filter"] = filter_obj
+        if sorts:
+            params["sorts"] = sorts
+        if properties:
+            params["filter_properties"] = self.decoder.property_ids(properties)
+
+        def fetch(cursor):
+            if cursor:
+                return self.notion.data_sources.query(self.data_source_id, start_cursor=cursor, **params)
+            return self.notion.data_sources.query(self.data_source_id, **params)
+
+        for results in paginate(fetch, prefetch=prefetch):
+            yield from results
 
     def query_database(self,
                       filter_obj: Optional[Dict] = None,
                       sorts: Optional[List[Dict]] = None) -> List[Dict]:
         """
-        查询数据库 (API 2025-09-03)
+        查询数据库的全部结果 (API 2025-09-03)
 
         Args:
             filter_obj: Notion 过滤器对象
@@ -86,17 +96,7 @@ class NotionWrapper:
             查询结果列表
         """
         try:
-            params = {"database_id": self.data_source_id}
-            if filter_obj:
-                params["filter"] = filter_obj
-            if sorts:
-                params["sorts"] = sorts
-
-            response = self._retry_on_rate_limit(
-                self.notion.databases.query,
-                **params
-            )
-            return response.get("results", [])
+            return list(self.iter_query(filter_obj=filter_obj, sorts=sorts))
         except APIResponseError as e:
             print(f"❌ 查询失败: {e}")
             return []
@@ -175,10 +175,7 @@ class NotionWrapper:
             if children:
                 page_data["children"] = children
 
-            response = self._retry_on_rate_limit(
-                self.notion.pages.create,
-                **page_data
-            )
+            response = self.notion.pages.create(**page_data)
 
             print(f"✓ 已添加: {name}")
             return response
@@ -222,8 +219,7 @@ class NotionWrapper:
                 today = datetime.now().strftime("%Y-%m-%d")
                 properties["Last Reviewed"] = {"date": {"start": today}}
 
-            response = self._retry_on_rate_limit(
-                self.notion.pages.update,
+            response = self.notion.pages.update(
                 page_id=page_id,
                 properties=properties
             )
@@ -247,8 +243,7 @@ class NotionWrapper:
             成功返回 True，失败返回 False
         """
         try:
-            self._retry_on_rate_limit(
-                self.notion.blocks.children.append,
+            self.notion.blocks.children.append(
                 block_id=page_id,
                 children=[{
                     "object": "block",
@@ -276,10 +271,7 @@ class NotionWrapper:
             页面文本内容
         """
         try:
-            blocks = self._retry_on_rate_limit(
-                self.notion.blocks.children.list,
-                block_id=page_id
-            )
+            blocks = self.notion.blocks.children.list(block_id=page_id)
 
             content = []
             for block in blocks.get("results", []):
@@ -346,6 +338,13 @@ class NotionWrapper:
 
         return self.query_database(filter_obj=filter_obj)
 
+    @property
+    def decoder(self) -> PageDecoder:
+        """按数据源 schema 预编译的属性解码器"""
+        if self._decoder is None:
+            self._decoder = PageDecoder(self.meta.schema(self.data_source_id))
+        return self._decoder
+
     def extract_property_value(self, page: Dict, property_name: str) -> Any:
         """
         从页面对象中提取属性值
@@ -355,42 +354,6 @@ class NotionWrapper:
             property_name: 属性名称
 
         Returns:
-            属性值（类型根据属性类型而定）
+            属性值（类型根据属性类型而定，富文本为完整拼接）
         """
-        props = page.get("properties", {})
-        prop = props.get(property_name)
-
-        if not prop:
-            return None
-
-        prop_type = prop.get("type")
-
-        if prop_type == "title":
-            titles = prop.get("title", [])
-            return titles[0]["plain_text"] if titles else ""
-
-        elif prop_type == "rich_text":
-            texts = prop.get("rich_text", [])
-            return texts[0]["plain_text"] if texts else ""
-
-        elif prop_type == "select":
-            select = prop.get("select")
-            return select["name"] if select else None
-
-        elif prop_type == "multi_select":
-            return [item["name"] for item in prop.get("multi_select", [])]
-
-        elif prop_type == "date":
-            date = prop.get("date")
-            return date["start"] if date else None
-
-        elif prop_type == "checkbox":
-            return prop.get("checkbox", False)
-
-        elif prop_type == "number":
-            return prop.get("number")
-
-        elif prop_type == "created_time":
-            return prop.get("created_time")
-
-        return None
+        return self.decoder.get(page, property_name)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+线程流水线 - 有界队列连接的生产者/消费者阶段
+
+功能:
+- Channel: 可关闭的有界队列，可直接迭代；消费端提前结束时 cancel() 让生产者停止
+- background: 在后台线程运行上游迭代器（例如分页查询），下游边处理边取
+- parallel_map: 多线程并发处理（例如获取页面正文），结果按完成顺序产出
+- merge: 多个上游迭代器各自在后台线程运行（例如多个数据源的查询），合并为一个通道
+- 各阶段的异常会传递给最终的消费者；队列有界，内存占用与数据总量无关
+- PhaseTimer: 按阶段累计耗时（各线程的工作时间相加；阶段重叠，合计可超过总耗时）
+
+使用方法:
+    from pipeline import background, parallel_map
+
+    pages = background(iter_query(...), maxsize=200)
+    for note in parallel_map(convert, pages, workers=4):
+        package.add(note)
+
+    timer = PhaseTimer()
+    pages = timer.iter("query", iter_query(...))
+    notes = parallel_map(timer.wrap("convert", convert), pages)
+    timer.report()      # {"query": 1.2, "convert": 3.4, "total": 2.9}
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_MAXSIZE = 256
+
+_CLOSED = object()
+
+
+class ChannelCancelled(Exception):
+    """消费端已取消通道，生产者应停止"""
+
+
+class Channel:
+    """可关闭的有界队列"""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.error: Optional[BaseException] = None
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        """
+        放入一项（队列满时阻塞，形成背压）
+
+        Raises:
+            ChannelCancelled: 消费端已取消
+        """
+        if self.cancelled.is_set():
+            raise ChannelCancelled()
+        self.queue.put(item)
+
+    def cancel(self):
+        """消费端不再读取：丢弃已排队的项，唤醒阻塞的生产者，其下一次 put 抛出 ChannelCancelled"""
+        self.cancelled.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self, error: Optional[BaseException] = None):
+        """结束输入；error 会在消费端重新抛出"""
+        if error is not None:
+            self.error = error
+        self.queue.put(_CLOSED)
+
+    def __iter__(self) -> Iterator:
+        while True:
+            item = self.queue.get()
+            if item is _CLOSED:
+                # 放回结束标记，让同一通道的其他消费线程也能退出
+                self.queue.put(_CLOSED)
+                if self.error is not None:
+                    raise self.error
+                return
+            yield item
+
+
+def background(iterable: Iterable, maxsize: int = DEFAULT_MAXSIZE) -> Channel:
+    """
+    在后台线程迭代 iterable，结果放入有界队列
+
+    Args:
+        iterable: 上游迭代器
+        maxsize: 队列上限
+
+    Returns:
+        可迭代的 Channel（消费端提前结束时调用其 cancel()，后台线程随即停止迭代上游）
+    """
+    channel = Channel(maxsize)
+
+    def run():
+        try:
+            for item in iterable:
+                channel.put(item)
+        except ChannelCancelled:
+            # 上游是生成器时立即结束它（释放其持有的连接等资源）
+            close = getattr(iterable, "close", None)
+            if close:
+                close()
+        except BaseException as e:
+            channel.close(e)
+        else:
+            channel.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return channel
+
+
+def parallel_map(func: Callable, iterable: Iterable, workers: int = 4,
+                 maxsize: int = DEFAULT_MAXSIZE) -> Channel:
+    """
+    多线程并发执行 func，结果按完成顺序放入有界队列
+
+    Args:
+        func: 处理函数（单个参数）
+        iterable: 输入迭代器（在独立线程中读取）
+        workers: 线程数
+        maxsize: 输入/输出队列上限
+
+    Returns:
+        可迭代的 Channel（func 的返回值）
+    """
+    inputs = background(iterable, maxsize)
+    output = Channel(maxsize)
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            for item in inputs:
+                output.put(func(item))
+        except BaseException as e:
+            # 第一个错误立即结束输出，消费端马上抛出（其余线程为守护线程）
+            output.close(e)
+            return
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            output.close()
+
+    for _ in range(workers):
+        threading.Thread(target=worker, daemon=True).start()
+    return output
+
+
+def merge(iterables: List[Iterable], maxsize: int = DEFAULT_MAXSIZE) -> Channel:
+    """
+    并发迭代多个上游，结果按到达顺序合并到一个有界队列
+
+    Args:
+        iterables: 上游迭代器列表（每个在独立线程中运行）
+        maxsize: 队列上限
+
+    Returns:
+        可迭代的 Channel（全部上游结束后关闭）
+    """
+    output = Channel(maxsize)
+    remaining = [len(iterables)]
+    lock = threading.Lock()
+
+    def run(iterable):
+        try:
+            for item in iterable:
+                output.put(item)
+        except BaseException as e:
+            output.close(e)
+            return
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            output.close()
+
+    if not iterables:
+        output.close()
+    for iterable in iterables:
+        threading.Thread(target=run, args=(iterable,), daemon=True).start()
+    return output
+
+
+class PhaseTimer:
+    """按阶段累计耗时（线程安全）"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        """计入一段耗时"""
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """计时代码块"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """计时每次函数调用（可用于 parallel_map 的工作函数）"""
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def iter(self, name: str, iterable: Iterable) -> Iterator:
+        """计时上游产出每个元素的耗时（生产者的工作时间，不含下游处理时间）"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def report(self) -> Dict[str, float]:
+        """各阶段秒数（保留 3 位小数），total 为自创建以来的墙钟时间"""
+        with self._lock:
+            report = {name: round(seconds, 3) for name, seconds in self.seconds.items()}
+        report["total"] = round(time.perf_counter() - self.started, 3)
+        return report
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Notion 自适应限流 - 进程内所有 Notion 请求共享
+
+功能:
+- 令牌桶限速，默认目标为 Notion 的平均 3 req/s
+- 按端点 (query/pages/blocks/...) 的独立预算
+- AIMD 并发窗口：成功时加性增长，429 时乘性减半
+- 解析 Retry-After，429 时全进程统一暂停
+- 以 httpx transport 形式接入，SDK 与直接调用都经过它
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+DEFAULT_RATE = 3.0
+DEFAULT_BURST = 3
+DEFAULT_MAX_CONCURRENCY = 8
+# 写入和页面正文读取各自限额，保证查询始终有余量
+DEFAULT_BUDGETS = {"pages": 2.5, "blocks": 2.5}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 网关错误在旧版脚本中对所有请求都会重试（包括创建页面）
+GATEWAY_STATUS = {429, 502}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 头
+
+    Args:
+        value: 秒数或 HTTP 日期
+
+    Returns:
+        需要等待的秒数，无法解析返回 None
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def endpoint_of(path: str) -> str:
+    """
+    将请求路径归类为端点预算名
+
+    Args:
+        path: URL 路径（如 /v1/data_sources/xxx/query）
+
+    Returns:
+        query / pages / blocks / databases / data_sources / other
+    """
+    parts = [p for p in path.split("/") if p and p != "v1"]
+    if not parts:
+        return "other"
+    if parts[-1] == "query":
+        return "query"
+    if parts[0] in ("pages", "blocks", "databases", "data_sources"):
+        return parts[0]
+    return "other"
+
+
+def is_idempotent(method: str, path: str) -> bool:
+    """判断请求能否在服务端错误或超时后安全重发"""
+    return method.upper() in ("GET", "PATCH", "DELETE") or endpoint_of(path) == "query"
+
+
+class TokenBucket:
+    """令牌桶（预约式：不足时返回需等待的时间并提前扣除令牌）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """预约一个令牌，返回需要等待的秒数"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """进程内共享的自适应限流器"""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        budgets: Optional[Dict[str, float]] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = 1,
+    ):
+        """
+        初始化限流器
+
+        Args:
+            rate: 全局平均速率上限 (req/s)
+            burst: 允许的突发请求数
+            budgets: 端点 → 速率上限，例如 {"pages": 2.5}
+            max_concurrency: 并发窗口上限
+            min_concurrency: 并发窗口下限
+        """
+        self.max_rate = rate
+        self.bucket = TokenBucket(rate, burst)
+        self.budgets = {
+            name: TokenBucket(budget, max(1.0, min(burst, budget)))
+            for name, budget in (DEFAULT_BUDGETS if budgets is None else budgets).items()
+        }
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.window = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+
+    # ---------- 并发窗口 ----------
+
+    def _try_enter(self) -> bool:
+        if self.in_flight < max(int(self.window), self.min_concurrency):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _reserve(self, endpoint: str) -> float:
+        """预约全局和端点令牌，返回需要等待的秒数"""
+        now = time.monotonic()
+        wait = self.bucket.reserve(now)
+        budget = self.budgets.get(endpoint)
+        if budget:
+            wait = max(wait, budget.reserve(now))
+        return max(wait, self.paused_until - now)
+
+    def _pause_remaining(self) -> float:
+        with self._lock:
+            return self.paused_until - time.monotonic()
+
+    def acquire(self, endpoint: str = "other"):
+        """阻塞直到获得并发槽位和令牌"""
+        with self._slot_free:
+            while not self._try_enter():
+                self._slot_free.wait()
+            wait = self._reserve(endpoint)
+
+        if wait > 0:
+            time.sleep(wait)
+        # 等待期间其他线程可能收到了 429
+        while (remaining := self._pause_remaining()) > 0:
+            time.sleep(remaining)
+
+    async def acquire_async(self, endpoint: str = "other"):
+        """asyncio 版本的 acquire"""
+        while True:
+            with self._lock:
+                if self._try_enter():
+                    wait = self._reserve(endpoint)
+                    break
+            await asyncio.sleep(0.05)
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+        while (remaining := self._pause_remaining()) > 0:
+            await asyncio.sleep(remaining)
+
+    def release(self, status: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        释放槽位并按响应调整窗口 (AIMD)
+
+        Args:
+            status: HTTP 状态码（网络错误时为 None）
+            retry_after: 服务端要求的等待秒数
+        """
+        with self._slot_free:
+            self.in_flight -= 1
+            if status == 429:
+                # 乘性减小：并发窗口和速率减半，全进程暂停
+                self.window = max(float(self.min_concurrency), self.window / 2)
+                self.bucket.rate = max(self.max_rate / 8, self.bucket.rate / 2)
+                pause = retry_after if retry_after is not None else 1.0
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            elif status is not None and status < 500:
+                # 加性增长：每个窗口 +1，速率逐步回到上限
+                self.window = min(float(self.max_concurrency), self.window + 1 / self.window)
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 20)
+            self._slot_free.notify()
+
+
+def _backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """指数退避 + 抖动"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.random() * delay / 2
+
+
+def _should_retry(request: httpx.Request, status: int) -> bool:
+    if status not in RETRYABLE_STATUS:
+        return False
+    return status in GATEWAY_STATUS or is_idempotent(request.method, request.url.path)
+
+
+def _retryable_error(request: httpx.Request, error: Exception) -> bool:
+    """
+    网络错误是否可以重试
+
+    连接阶段的错误（请求未发出）总是可以重试；请求可能已送达的错误只重试幂等请求
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return isinstance(error, httpx.TransportError) and is_idempotent(request.method, request.url.path)
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """在 httpx 连接池外层套上限流和重试"""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: RateLimiter, max_retries: int = 5):
+        self.transport = transport
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = endpoint_of(request.url.path)
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(endpoint)
+            try:
+                response = self.transport.handle_request(request)
+            except BaseException as e:
+                # 任何异常都必须归还槽位，否则并发窗口永久缩小
+                self.limiter.release(None)
+                if attempt >= self.max_retries or not _retryable_error(request, e):
+                    raise
+                time.sleep(_backoff(attempt))
+                continue
+
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            self.limiter.release(response.status_code, retry_after)
+
+            if attempt >= self.max_retries or not _should_retry(request, response.status_code):
+                return response
+
+            response.read()
+            response.close()
+            # 429 的等待由限流器的全局暂停负责
+            if response.status_code != 429:
+                time.sleep(retry_after if retry_after is not None else _backoff(attempt))
+
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """RateLimitedTransport 的 asyncio 版本"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter, max_retries: int = 5):
+        self.transport = transport
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = endpoint_of(request.url.path)
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async(endpoint)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except BaseException as e:
+                self.limiter.release(None)
+                if attempt >= self.max_retries or not _retryable_error(request, e):
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                continue
+
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            self.limiter.release(response.status_code, retry_after)
+
+            if attempt >= self.max_retries or not _should_retry(request, response.status_code):
+                return response
+
+            await response.aread()
+            await response.aclose()
+            if response.status_code != 429:
+                await asyncio.sleep(retry_after if retry_after is not None else _backoff(attempt))
+
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """获取进程内共享的限流器（速率可通过 NOTION_RATE_LIMIT 覆盖，端点预算按比例缩放）"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            rate = float(os.getenv("NOTION_RATE_LIMIT", DEFAULT_RATE))
+            budgets = {name: budget * rate / DEFAULT_RATE for name, budget in DEFAULT_BUDGETS.items()}
+            _limiter = RateLimiter(rate=rate, budgets=budgets)
+        return _limiter
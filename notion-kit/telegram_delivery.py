@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Telegram Bot 交付 - 连接池、重试退避、按大小分卷
+
+功能:
+- TelegramSender: 复用同一个 HTTP 连接池发送文件和消息
+  - 连接错误、5xx 指数退避重试；429 按服务端给出的 retry_after 等待
+  - 上传超时按文件大小放宽（大包不会因 30 秒超时失败）
+- 多个分卷依次发送，说明文字标注 1/3、2/3 ...
+- 分卷本身由 anki_package.SplitPackage 生成（每卷不超过 Bot API 的 50 MB 上传限制）
+
+使用方法:
+    from telegram_delivery import TelegramSender
+
+    sender = TelegramSender(token, chat_id)
+    ok = sender.send_documents(["deck_part1.apkg", "deck_part2.apkg"], "🎴 Anki 卡片同步")
+    sender.send_message("📭 今天没有新卡片")
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_API_URL = "https://api.telegram.org"
+
+# Bot API sendDocument 的上传上限
+UPLOAD_LIMIT = 50 * 1024 * 1024
+
+MAX_ATTEMPTS = 4
+# 429 时最多等待的秒数（超过则视为失败，下次运行重试）
+MAX_RETRY_AFTER = 60
+
+
+class TelegramError(Exception):
+    """Bot API 返回的错误（重试后仍失败）"""
+
+
+class TelegramSender:
+    """Telegram Bot 发送器（单个连接池，所有请求共享）"""
+
+    def __init__(self, token: str, chat_id: str, api_url: Optional[str] = None,
+                 client: Optional[httpx.Client] = None, max_attempts: int = MAX_ATTEMPTS):
+        """
+        初始化发送器
+
+        Args:
+            token: Bot token
+            chat_id: 接收的聊天 ID
+            api_url: Bot API 地址（默认 TELEGRAM_API_URL 或 https://api.telegram.org）
+            client: HTTP 客户端（默认新建连接池）
+            max_attempts: 每个请求的最多尝试次数
+        """
+        self.chat_id = chat_id
+        api_url = api_url or os.getenv("TELEGRAM_API_URL") or DEFAULT_API_URL
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.client = client or httpx.Client(timeout=httpx.Timeout(30.0))
+        self.max_attempts = max_attempts
+
+    def _post(self, method: str, data: Dict, path: Optional[Path] = None) -> Dict:
+        """
+        调用 Bot API（带重试）
+
+        Args:
+            method: sendDocument / sendMessage ...
+            data: 表单字段
+            path: 上传的文件（每次尝试重新打开）
+
+        Returns:
+            result 字段
+
+        Raises:
+            TelegramError: 不可重试的错误，或重试次数用尽
+        """
+        url = f"{self.base_url}/{method}"
+        # 按 256 KB/s 的最低上传速度估算写超时
+        timeout = httpx.Timeout(30.0, write=max(30.0, path.stat().st_size / 262144)) if path else None
+
+        for attempt in range(1, self.max_attempts + 1):
+            wait = 2 ** attempt
+            try:
+                if path:
+                    with open(path, 'rb') as f:
+                        response = self.client.post(url, data=data, files={"document": (path.name, f)},
+                                                    timeout=timeout)
+                else:
+                    response = self.client.post(url, data=data)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {"description": response.text[:200]}
+                if response.status_code == 200 and body.get("ok"):
+                    return body.get("result") or {}
+
+                error = f"{response.status_code} {body.get('description', '')}".strip()
+                if response.status_code == 429:
+                    wait = (body.get("parameters") or {}).get("retry_after", wait)
+                    if wait > MAX_RETRY_AFTER:
+                        raise TelegramError(error)
+                elif response.status_code < 500:
+                    raise TelegramError(error)
+
+            if attempt == self.max_attempts:
+                raise TelegramError(error)
+            print(f"   ⏳ Telegram 请求失败（{error}），{wait} 秒后重试 ({attempt}/{self.max_attempts - 1})")
+            time.sleep(wait)
+
+    def send_message(self, text: str) -> bool:
+        """发送文本消息，返回是否成功"""
+        try:
+            self._post("sendMessage", {"chat_id": self.chat_id, "text": text})
+            return True
+        except TelegramError as e:
+            print(f"❌ Telegram 发送失败: {e}")
+            return False
+
+    def send_documents(self, paths: List[str], caption: str) -> bool:
+        """
+        依次发送一个或多个文件（多个分卷时说明文字标注序号）
+
+        Args:
+            paths: 文件路径
+            caption: 说明文字
+
+        Returns:
+            全部发送成功返回 True（任一分卷失败即停止，下次运行整体重发）
+        """
+        for index, path in enumerate(paths, 1):
+            path = Path(path)
+            text = caption if len(paths) == 1 else f"{caption}\n📎 分卷 {index}/{len(paths)}"
+            if path.stat().st_size > UPLOAD_LIMIT:
+                print(f"❌ {path.name} 超过 Telegram 上传限制 ({path.stat().st_size / 1048576:.1f} MB)")
+                return False
+            try:
+                self._post("sendDocument", {"chat_id": self.chat_id, "caption": text}, path)
+            except TelegramError as e:
+                print(f"❌ Telegram 发送失败 ({path.name}): {e}")
+                return False
+            if len(paths) > 1:
+                print(f"   ✓ 已发送分卷 {index}/{len(paths)}: {path.name}")
+        return True
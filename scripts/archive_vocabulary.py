@@ -1,94 +1,95 @@
 #!/usr/bin/env python3
-"""批量归档 Notion Anki Cards 中的欧路词典卡片（并发版）"""
-import os, requests, time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+"""
+批量归档 Notion Anki Cards 中的欧路词典卡片（并发、可断点续跑）
+
+先扫描一次数据源，把待归档页面写入变更日志 (data/journal/)，再并发执行。
+中断（CI 超时、连续 502）后重新运行，只重放日志中未完成的归档，不再重新扫描。
+"""
+import os, sys
 from dotenv import load_dotenv
 from pathlib import Path
-from notion_client import Client
 
 load_dotenv(Path(__file__).parent.parent / "notion-kit" / ".env")
+sys.path.insert(0, str(Path(__file__).parent.parent / "notion-kit"))
+from notion_http import get_http
+from batch_writer import BatchWriter
+from mutation_journal import MutationJournal, DONE, FAILED
+from notion_meta import get_metadata_cache
+
 TOKEN = os.getenv("NOTION_TOKEN")
 DB_ID = os.getenv("ANKI_DATABASE_ID")
+JOURNAL_FILE = Path(__file__).parent.parent / "data" / "journal" / "archive_vocabulary.jsonl"
+META_CACHE_FILE = Path(__file__).parent.parent / "data" / "cache" / "notion_metadata.json"
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2025-09-03",
-}
+EUDIC_FILTER = {"property": "Tags", "multi_select": {"contains": "欧路"}}
 
-notion = Client(auth=TOKEN, notion_version="2025-09-03")
-db = notion.databases.retrieve(DB_ID)
-DS_ID = db.get("data_sources", [{}])[0].get("id", DB_ID)
-URL = f"https://api.notion.com/v1/data_sources/{DS_ID}/query"
 
-print(f"Data source: {DS_ID[:12]}...", flush=True)
+def get_data_source_id(http):
+    """获取 data_source_id（元数据缓存在磁盘，TTL 内不再请求）"""
+    return get_metadata_cache(http, META_CACHE_FILE).data_source_id(DB_ID)
 
 
-def archive_page(page_id):
-    """归档单个页面（用 requests 直接调用，避免 SDK 锁）"""
-    for attempt in range(3):
-        try:
-            r = requests.patch(
-                f"https://api.notion.com/v1/pages/{page_id}",
-                headers=HEADERS,
-                json={"archived": True},
-                timeout=30,
-            )
-            if r.status_code == 200:
-                return True
-            if r.status_code == 429:
-                time.sleep(1)
-                continue
-            time.sleep(1)
-        except Exception:
-            time.sleep(1)
-    return False
-
-
-def query_batch():
-    """查询一批未归档的欧路卡片"""
-    filter_obj = {"property": "Tags", "multi_select": {"contains": "欧路"}}
-    for attempt in range(5):
+def plan_archive(http, journal):
+    """扫描数据源，把所有欧路卡片写入日志（只补充未记录的页面）"""
+    ds_id = get_data_source_id(http)
+    print(f"Data source: {ds_id[:12]}...", flush=True)
+
+    planned = 0
+    for batch, results in enumerate(http.iter_batches(ds_id, {"filter": EUDIC_FILTER}, timeout=300), 1):
+        planned += journal.plan("archive", [p["id"] for p in results])
+        print(f"Batch {batch}: got {len(results)} (planned: {planned})", flush=True)
+    journal.seal()
+    return planned
+
+
+def run_archive(writer, journal):
+    """并发执行日志中未完成的归档"""
+    page_ids = journal.outstanding("archive")
+    print(f"Archiving {len(page_ids)} pages...", flush=True)
+
+    done = 0
+
+    def on_result(page_id, result):
+        nonlocal done
+        # 404：页面已不存在，视为完成
+        if result["ok"] or result["status"] == 404:
+            journal.mark(page_id, "archive", DONE)
+            done += 1
+            if done % 100 == 0:
+                print(f"  archived {done}/{len(page_ids)}", flush=True)
+        else:
+            journal.mark(page_id, "archive", FAILED, result["error"])
+
+    writer.archive_pages(page_ids, on_result=on_result)
+    return done, len(page_ids) - done
+
+
+def main():
+    # 共享连接池（归档线程数 10，连接池同样大小）
+    http = get_http(TOKEN, pool_size=10)
+    writer = BatchWriter(http, max_workers=10)
+    journal = MutationJournal(JOURNAL_FILE)
+
+    if journal.sealed:
+        counts = journal.counts()
+        print(f"Resuming journal: {counts[DONE]} done, {len(journal.outstanding())} outstanding", flush=True)
+    else:
         try:
-            resp = requests.post(
-                URL, headers=HEADERS,
-                json={"filter": filter_obj, "page_size": 100},
-                timeout=300,
-            )
-            if resp.status_code == 200:
-                return resp.json().get("results", [])
-            print(f"  query [{resp.status_code}]", end=" ", flush=True)
-            time.sleep(10 * (attempt + 1))
+            plan_archive(http, journal)
         except Exception as e:
-            print(f"  query err", end=" ", flush=True)
-            time.sleep(10 * (attempt + 1))
-    return None
-
-
-total = 0
-batch = 0
-
-while True:
-    batch += 1
-    print(f"Batch {batch}: querying...", end=" ", flush=True)
-
-    pages = query_batch()
-    if pages is None:
-        print(f"\nQuery failed. Archived so far: {total}", flush=True)
-        break
-    if not pages:
-        print(f"empty.\nDone! Total archived: {total}", flush=True)
-        break
-
-    print(f"got {len(pages)}, archiving...", end=" ", flush=True)
-
-    # 并发归档（10 线程）
-    ok = 0
-    with ThreadPoolExecutor(max_workers=10) as pool:
-        futures = {pool.submit(archive_page, p["id"]): p["id"] for p in pages}
-        for f in as_completed(futures):
-            if f.result():
-                ok += 1
-
-    total += ok
-    print(f"done ({ok}/{len(pages)}, total: {total})", flush=True)
+            # 计划未封存，下次运行会继续扫描补全
+            print(f"\nQuery failed: {e}", flush=True)
+            if not journal.outstanding():
+                return
+
+    ok, failed = run_archive(writer, journal)
+
+    if journal.sealed and not journal.outstanding():
+        journal.clear()
+        print(f"Done! Total archived: {ok}", flush=True)
+    else:
+        print(f"Archived {ok}, failed {failed}; re-run to resume from {JOURNAL_FILE.name}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Notion 同步脚本离线压测
+
+在本地 Notion 替身服务器 (notion-kit/fake_notion.py) 上依次运行同步脚本，
+报告每个脚本的耗时、请求数、吞吐量 (req/s) 和注入的错误数。
+
+脚本在临时目录中的副本里运行（data/ 为空），不会改动仓库中的状态文件和镜像。
+
+使用方法:
+    python3 scripts/benchmark_notion.py
+    python3 scripts/benchmark_notion.py --cards 2000 --latency 0.1 --p429 0.02 --p5xx 0.01
+    python3 scripts/benchmark_notion.py --only sync_notion_anki --runs 2   # 第二次运行测缓存效果
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "notion-kit"))
+from fake_notion import (
+    FakeNotion, FakeNotionServer, build_fixture, ANKI_DATABASE_ID, CORTEX_DATABASE_ID
+)
+
+# 运行顺序：归档会清空欧路卡片，放在最后
+SCRIPTS = [
+    ("sync_eudic_notion", []),
+    ("sync_notion_anki", []),
+    ("cleanup_duplicate_cards", []),
+    ("archive_vocabulary", []),
+]
+
+
+def prepare_workdir(workdir: Path):
+    """复制脚本、notion-kit 和配置到临时目录（不复制 .env 和缓存）"""
+    ignore = shutil.ignore_patterns(".env", "__pycache__", "*.pyc")
+    for name in ("scripts", "notion-kit", "config"):
+        shutil.copytree(REPO_ROOT / name, workdir / name, ignore=ignore)
+    (workdir / "data").mkdir()
+
+
+def script_env(server_url: str, rate: float) -> Dict[str, str]:
+    """把脚本指向替身服务器的环境变量"""
+    env = dict(os.environ)
+    env.update({
+        "NOTION_BASE_URL": server_url,
+        "NOTION_TOKEN": "fake-notion-token",
+        "NOTION_RATE_LIMIT": str(rate),
+        "ANKI_DATABASE_ID": ANKI_DATABASE_ID,
+        "DATABASE_ID": CORTEX_DATABASE_ID,
+        "EUDIC_TOKEN": "fake-eudic-token",
+        "EUDIC_API_BASE_URL": f"{server_url}/eudic",
+        "TELEGRAM_BOT_TOKEN": "fake-telegram-token",
+        "TELEGRAM_CHAT_ID": "0",
+        "TELEGRAM_API_URL": f"{server_url}/telegram",
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def run_script(workdir: Path, name: str, extra: List[str], env: Dict, fake: FakeNotion) -> Dict:
+    """运行单个脚本并收集统计"""
+    fake.reset_stats()
+    log_path = workdir / f"{name}.log"
+
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run(
+            [sys.executable, str(workdir / "scripts" / f"{name}.py"), *extra],
+            cwd=str(workdir), env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    wall = time.perf_counter() - start
+
+    stats = dict(fake.stats)
+    return {
+        "script": name,
+        "exit": result.returncode,
+        "wall": wall,
+        "requests": stats["requests"],
+        "rps": stats["requests"] / wall if wall else 0.0,
+        "429": stats["injected_429"],
+        "5xx": stats["injected_5xx"],
+        "endpoints": stats["endpoints"],
+        "log": log_path,
+    }
+
+
+def print_report(results: List[Dict]):
+    """打印结果表"""
+    print()
+    print(f"{'script':<26}{'exit':>5}{'wall(s)':>10}{'requests':>10}{'req/s':>9}{'429':>6}{'5xx':>6}")
+    print("-" * 72)
+    for r in results:
+        print(f"{r['script']:<26}{r['exit']:>5}{r['wall']:>10.2f}{r['requests']:>10}"
+              f"{r['rps']:>9.1f}{r['429']:>6}{r['5xx']:>6}")
+        endpoints = ", ".join(f"{k}={v}" for k, v in sorted(r["endpoints"].items()))
+        if endpoints:
+            print(f"{'':<26}{endpoints}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本地 Notion 替身上压测同步脚本")
+    parser.add_argument("--cards", type=int, default=500, help="Anki Cards 页面数")
+    parser.add_argument("--cortex", type=int, default=50, help="Cortex 页面数")
+    parser.add_argument("--eudic-words", type=int, default=200, help="欧路生词数")
+    parser.add_argument("--duplicates", type=int, default=20, help="重复的欧路卡片数")
+    parser.add_argument("--latency", type=float, default=0.05, help="服务端基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="服务端随机附加延迟（秒）")
+    parser.add_argument("--p429", type=float, default=0.0, help="随机 429 概率")
+    parser.add_argument("--p5xx", type=float, default=0.0, help="随机 502/504 概率")
+    parser.add_argument("--server-rate", type=float, default=None, help="服务端速率上限 (req/s)")
+    parser.add_argument("--rate", type=float, default=3.0, help="客户端限流速率 NOTION_RATE_LIMIT")
+    parser.add_argument("--only", action="append", help="只运行指定脚本（可重复）")
+    parser.add_argument("--runs", type=int, default=1, help="每个脚本连续运行次数（观察缓存效果）")
+    parser.add_argument("--keep", action="store_true", help="保留临时目录和日志")
+    args = parser.parse_args()
+
+    fixture = build_fixture(cards=args.cards, cortex=args.cortex, eudic_words=args.eudic_words,
+                            duplicates=args.duplicates)
+    fake = FakeNotion(fixture, latency=args.latency, jitter=args.jitter, p429=args.p429,
+                      p5xx=args.p5xx, rate_limit=args.server_rate, seed=0)
+
+    workdir = Path(tempfile.mkdtemp(prefix="notion-bench-"))
+    prepare_workdir(workdir)
+
+    print("=" * 72)
+    print("⏱️  Notion 同步脚本压测")
+    print(f"   数据: {args.cards} cards / {args.cortex} cortex / {args.eudic_words} eudic words")
+    print(f"   故障: latency={args.latency}s jitter={args.jitter}s p429={args.p429} p5xx={args.p5xx}")
+    print(f"   工作目录: {workdir}")
+    print("=" * 72)
+
+    results = []
+    with FakeNotionServer(fake) as server:
+        env = script_env(server.url, args.rate)
+        for name, extra in SCRIPTS:
+            if args.only and name not in args.only:
+                continue
+            for run in range(1, args.runs + 1):
+                label = name if args.runs == 1 else f"{name} #{run}"
+                print(f"▶️  {label}...", flush=True)
+                result = run_script(workdir, name, extra, env, fake)
+                result["script"] = label
+                results.append(result)
+                if result["exit"] != 0:
+                    print(f"   ❌ 退出码 {result['exit']}，日志: {result['log']}")
+
+    print_report(results)
+
+    if args.keep:
+        print(f"\n📁 日志保留在: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    sys.exit(1 if any(r["exit"] != 0 for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,6 @@
 
 import os
 import sys
-import time
-import requests
 import argparse
 from pathlib import Path
 from collections import defaultdict
@@ -19,77 +17,25 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / "notion-kit" / ".env"
 load_dotenv(env_path)
 
+# 导入 notion-kit 共享模块
+sys.path.insert(0, str(Path(__file__).parent.parent / "notion-kit"))
+from notion_http import get_http
+from notion_mirror import NotionMirror, ANKI_CARD_PROPERTIES
+from batch_writer import BatchWriter
+from mutation_journal import MutationJournal, DONE, FAILED
+from notion_meta import get_metadata_cache
+from notion_props import plain_text
+
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 ANKI_DATABASE_ID = os.getenv("ANKI_DATABASE_ID")
+MIRROR_FILE = Path(__file__).parent.parent / "data" / "notion_mirror.db"
+JOURNAL_FILE = Path(__file__).parent.parent / "data" / "journal" / "cleanup_duplicates.jsonl"
+META_CACHE_FILE = Path(__file__).parent.parent / "data" / "cache" / "notion_metadata.json"
 
 
 def get_data_source_id(token, database_id):
-    """获取 data_source_id"""
-    from notion_client import Client
-    notion = Client(auth=token, notion_version="2025-09-03")
-    db = notion.databases.retrieve(database_id)
-    sources = db.get("data_sources", [])
-    return sources[0]["id"] if sources else database_id
-
-
-def fetch_all_cards(token, data_source_id, filter_obj=None):
-    """获取所有卡片（分页，带重试）"""
-    url = f"https://api.notion.com/v1/data_sources/{data_source_id}/query"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2025-09-03"
-    }
-
-    all_cards = []
-    start_cursor = None
-    page = 0
-
-    while True:
-        page += 1
-        body = {"page_size": 100}
-        if filter_obj:
-            body["filter"] = filter_obj
-        if start_cursor:
-            body["start_cursor"] = start_cursor
-
-        resp = None
-        for attempt in range(5):
-            timeout = 120 * (attempt + 1)  # 120s, 240s, 360s, 480s, 600s
-            try:
-                resp = requests.post(url, headers=headers, json=body, timeout=timeout)
-                if resp.status_code == 200:
-                    break
-                if resp.status_code in (502, 504) and attempt < 4:
-                    wait = 5 * (attempt + 1)
-                    print(f"   ⚠️  {resp.status_code} 错误，{wait}秒后重试 ({attempt+1}/5)...")
-                    time.sleep(wait)
-                    continue
-                print(f"   ❌ 查询失败: {resp.status_code}")
-                return all_cards
-            except requests.exceptions.RequestException as e:
-                if attempt < 4:
-                    wait = 5 * (attempt + 1)
-                    print(f"   ⚠️  请求失败，{wait}秒后重试 ({attempt+1}/5): {e}")
-                    time.sleep(wait)
-                    continue
-                print(f"   ❌ 请求失败: {e}")
-                return all_cards
-
-        if not resp or resp.status_code != 200:
-            return all_cards
-
-        data = resp.json()
-        results = data.get("results", [])
-        all_cards.extend(results)
-        print(f"   第{page}页: 获取 {len(results)} 张 (累计 {len(all_cards)})")
-
-        if data.get("has_more") and data.get("next_cursor"):
-            start_cursor = data["next_cursor"]
-        else:
-            break
-
-    return all_cards
+    """获取 data_source_id（元数据缓存在磁盘，TTL 内不再请求）"""
+    return get_metadata_cache(get_http(token), META_CACHE_FILE).data_source_id(database_id)
 
 
 def find_duplicates(cards):
@@ -99,8 +45,8 @@ def find_duplicates(cards):
     for card in cards:
         props = card.get("properties", {})
         front = props.get("Front", {})
-        titles = front.get("title", [])
-        title = titles[0].get("plain_text", "") if titles else ""
+        # 拼接全部富文本片段（带格式或链接的标题由多个片段组成）
+        title = plain_text(front.get("title"))
 
         if title:
             by_title[title].append(card)
@@ -118,37 +64,46 @@ def find_duplicates(cards):
     return duplicates_to_delete, by_title
 
 
-def archive_pages(token, page_ids, dry_run=False):
-    """归档（软删除）页面"""
-    from notion_client import Client
-    notion = Client(auth=token, notion_version="2025-09-03")
+def archive_pages(token, page_ids, dry_run=False, mirror=None, journal=None):
+    """
+    并发归档（软删除）页面
+
+    成功后同步移出本地镜像；有变更日志时逐页记录结果，中断后可续跑。
+    """
+    if dry_run:
+        for page_id in page_ids[:5]:
+            print(f"   [DRY RUN] 将删除: {page_id[:8]}...")
+        return 0, 0
 
     success = 0
     failed = 0
 
-    for i, page_id in enumerate(page_ids, 1):
-        if dry_run:
-            if i <= 5:
-                print(f"   [DRY RUN] 将删除: {page_id[:8]}...")
-            continue
-
-        try:
-            notion.pages.update(page_id=page_id, archived=True)
+    def on_result(page_id, result):
+        nonlocal success, failed
+        # 404：页面已不存在，视为完成
+        if result["ok"] or result["status"] == 404:
             success += 1
-            if i % 50 == 0:
-                print(f"   已删除 {i}/{len(page_ids)}...")
-                time.sleep(0.5)  # 避免 rate limit
-        except Exception as e:
+            if journal:
+                journal.mark(page_id, "archive", DONE)
+            if mirror:
+                mirror.forget([page_id])
+            if success % 50 == 0:
+                print(f"   已删除 {success}/{len(page_ids)}...")
+        else:
             failed += 1
+            if journal:
+                journal.mark(page_id, "archive", FAILED, result["error"])
             if failed <= 3:
-                print(f"   ❌ 删除失败 {page_id[:8]}: {e}")
+                print(f"   ❌ 删除失败 {page_id[:8]}: {result['error']}")
 
+    BatchWriter(get_http(token)).archive_pages(page_ids, on_result=on_result)
     return success, failed
 
 
 def main():
     parser = argparse.ArgumentParser(description="清理 Notion Anki Cards 重复卡片")
     parser.add_argument("--dry-run", action="store_true", help="试运行，不实际删除")
+    parser.add_argument("--full-refresh", action="store_true", help="全量重建本地镜像（Notion 中手动删除过页面时使用）")
     args = parser.parse_args()
 
     if not NOTION_TOKEN or not ANKI_DATABASE_ID:
@@ -164,17 +119,28 @@ def main():
     # 1. 获取 data_source_id
     ds_id = get_data_source_id(NOTION_TOKEN, ANKI_DATABASE_ID)
     print(f"\n📦 Data Source ID: {ds_id[:8]}...")
-
-    # 2. 获取欧路标签的卡片（重复的主要来源）
+    mirror = NotionMirror(MIRROR_FILE, ds_id, get_http(NOTION_TOKEN), properties=ANKI_CARD_PROPERTIES,
+                          meta=get_metadata_cache(get_http(NOTION_TOKEN), META_CACHE_FILE))
+
+    # 2. 重放上次中断时未完成的删除（不需要重新分析）
+    journal = MutationJournal(JOURNAL_FILE)
+    outstanding = journal.outstanding("archive")
+    if outstanding and not args.dry_run:
+        print(f"\n🔁 继续上次未完成的删除: {len(outstanding)} 张...")
+        success, failed = archive_pages(NOTION_TOKEN, outstanding, mirror=mirror, journal=journal)
+        print(f"   成功 {success}, 失败 {failed}")
+        if failed:
+            print("⚠️  仍有删除失败，请稍后重新运行")
+            return
+        journal.clear()
+
+    # 3. 从本地镜像获取欧路标签的卡片（重复的主要来源）
     print("\n🔍 获取「欧路」标签的卡片...")
-    eudic_filter = {
-        "property": "Tags",
-        "multi_select": {"contains": "欧路"}
-    }
-    cards = fetch_all_cards(NOTION_TOKEN, ds_id, filter_obj=eudic_filter)
+    mirror.refresh(full=args.full_refresh)
+    cards = mirror.pages(tag="欧路")
     print(f"\n   总计: {len(cards)} 张「欧路」卡片")
 
-    # 3. 找出重复
+    # 4. 找出重复
     print("\n🔎 分析重复...")
     to_delete, by_title = find_duplicates(cards)
     unique_count = len(by_title)
@@ -188,10 +154,15 @@ def main():
         print("\n✅ 没有重复卡片，无需清理")
         return
 
-    # 4. 删除重复
+    # 5. 删除重复（先写入变更日志，中断后下次运行直接续跑）
     print(f"\n🗑️  {'[DRY RUN] ' if args.dry_run else ''}删除 {len(to_delete)} 张重复卡片...")
     ids = [c["id"] for c in to_delete]
-    success, failed = archive_pages(NOTION_TOKEN, ids, dry_run=args.dry_run)
+    if not args.dry_run:
+        journal.plan("archive", ids)
+        journal.seal()
+    success, failed = archive_pages(NOTION_TOKEN, ids, dry_run=args.dry_run, mirror=mirror, journal=journal)
+    if not args.dry_run and not failed:
+        journal.clear()
 
     if args.dry_run:
         print(f"\n   [DRY RUN] 将删除 {len(to_delete)} 张重复卡片")
@@ -14,13 +14,16 @@ import sys
 import argparse
 from pathlib import Path
 from dotenv import load_dotenv
-from notion_client import Client
 from notion_client.errors import APIResponseError
 
 # 加载环境变量
 env_path = Path(__file__).parent.parent / "notion-kit" / ".env"
 load_dotenv(env_path)
 
+# 导入 notion-kit 共享模块
+sys.path.insert(0, str(Path(__file__).parent.parent / "notion-kit"))
+from notion_http import get_http
+
 def build_database_schema(parent_page_id=None):
     """Build the create-database payload for the current Notion API."""
     properties = {
@@ -102,7 +105,7 @@ def create_anki_database(parent_page_id=None):
         sys.exit(1)
 
     # 使用 Notion API 2025-09-03 (最新版本)
-    notion = Client(auth=notion_token, notion_version="2025-09-03")
+    notion = get_http(notion_token).sdk()
 
     print("🔨 正在创建 Anki Cards 数据库...")
     print()
@@ -5,31 +5,35 @@
 功能:
 - 从欧路词典 API 获取生词本
 - 将生词添加到 Notion "Anki Cards" 数据库
-- 自动标记已同步的单词，避免重复
+- 自动标记已同步的单词，避免重复（data/eudic_synced_words.txt，每行一个单词，按字典序排列）
 - 支持批量同步和增量同步
+- 有界线程池并发创建页面，速率由共享限流器控制
+- 增量获取：记录添加时间水位线，生词本按时间倒序翻页，遇到更早的单词即停止（--full 完整获取）
+- 流水线：Notion 镜像刷新与欧路翻页并行，每页到达后立即过滤并交给写入线程
+- 每成功 N 个单词或每隔 T 秒保存一次检查点（原子替换），中断后重跑不会重复创建
 """
 
 import os
 import sys
 import json
+import tempfile
+import time
 import hashlib
 import requests
 import argparse
-import time
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Optional
 from dotenv import load_dotenv
 
-# 导入 notion_client
-try:
-    from notion_client import Client
-    from notion_client.errors import APIResponseError
-    from httpx import HTTPStatusError
-except ImportError:
-    print("❌ 缺少依赖: notion-client")
-    print("请运行: pip install notion-client")
-    sys.exit(1)
+# 导入 notion-kit 共享模块
+sys.path.insert(0, str(Path(__file__).parent.parent / "notion-kit"))
+from notion_http import get_http
+from batch_writer import BatchWriter, DEFAULT_WORKERS
+from notion_mirror import NotionMirror, ANKI_CARD_PROPERTIES
+from notion_meta import get_metadata_cache
+from pipeline import background
 
 # 加载环境变量
 env_path = Path(__file__).parent.parent / "notion-kit" / ".env"
@@ -38,65 +42,105 @@ load_dotenv(env_path)
 # 配置文件路径
 CONFIG_FILE = Path(__file__).parent.parent / "config" / "eudic_config.json"
 STATE_FILE = Path(__file__).parent.parent / "data" / "eudic_sync_state.json"
+SYNCED_WORDS_FILE = Path(__file__).parent.parent / "data" / "eudic_synced_words.txt"
+MIRROR_FILE = Path(__file__).parent.parent / "data" / "notion_mirror.db"
+META_CACHE_FILE = Path(__file__).parent.parent / "data" / "cache" / "notion_metadata.json"
+
+# 预取的欧路词典页数（写入跟不上时翻页暂停）
+PREFETCH_PAGES = 4
+
+# 检查点：每成功多少个单词或每隔多少秒保存一次状态
+CHECKPOINT_EVERY = 50
+CHECKPOINT_SECONDS = 30
 
 # 确保 data 目录存在
 STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 
-def retry_on_502(max_retries=3, delay=2):
-    """
-    装饰器：在遇到 502 Bad Gateway 错误时自动重试
-
-    Args:
-        max_retries: 最大重试次数
-        delay: 每次重试间隔（秒）
-    """
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except (APIResponseError, HTTPStatusError) as e:
-                    last_exception = e
-                    # 检查是否是 502 错误
-                    status_code = None
-                    if hasattr(e, 'status'):
-                        status_code = e.status
-                    elif hasattr(e, 'response') and hasattr(e.response, 'status_code'):
-                        status_code = e.response.status_code
-
-                    if status_code == 502 and attempt < max_retries:
-                        wait_time = delay * (2 ** attempt)  # 指数退避
-                        print(f"   ⚠️  Notion API 502 错误，{wait_time}秒后重试 ({attempt + 1}/{max_retries})...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        raise
-            raise last_exception
-        return wrapper
-    return decorator
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """解析欧路词典的 add_time（ISO 8601，无时区按 UTC），无法解析返回 None"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _write_atomic(path: Path, text: str):
+    """写入临时文件后原子替换（中断时不会留下半截文件）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class SyncedWords:
+    """已同步单词集合（排序的纯文本文件，每行一个单词，git diff 每个新单词一行）"""
+
+    def __init__(self, path):
+        """
+        初始化并加载集合
+
+        Args:
+            path: 文本文件路径（不存在时为空集合）
+        """
+        self.path = Path(path)
+        self.words = set()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.words = {line.rstrip("\n") for line in f if line.strip()}
+        self.dirty = False
+
+    def __contains__(self, word) -> bool:
+        return word in self.words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def add(self, word: str):
+        """加入单词（save 后写入文件）"""
+        if word and "\n" not in word and word not in self.words:
+            self.words.add(word)
+            self.dirty = True
+
+    def update(self, words: Iterable[str]):
+        for word in words:
+            self.add(word)
+
+    def save(self):
+        """按字典序写回文件（原子替换，没有变化时跳过）"""
+        if not self.dirty and self.path.exists():
+            return
+        _write_atomic(self.path, "".join(f"{word}\n" for word in sorted(self.words)))
+        self.dirty = False
 
 
 class EudicSyncManager:
     """欧路词典同步管理器"""
 
-    def __init__(self, dry_run=False, limit=None):
+    def __init__(self, dry_run=False, limit=None, full=False):
         """
         初始化同步管理器
 
         Args:
             dry_run: 是否为试运行模式（不实际写入 Notion）
             limit: 限制同步单词数量（None 表示不限制）
+            full: 忽略水位线，完整获取生词本
         """
         self.dry_run = dry_run
         self.limit = limit
+        self.full = full
         self.config = self._load_config()
         self.state = self._load_state()
+        self.synced = self._load_synced_words()
 
         # 欧路词典 API 配置
         self.eudic_token = os.getenv("EUDIC_TOKEN") or self.config.get("api_token")
-        self.api_base_url = self.config.get("api_base_url", "https://api.frdic.com/api/open/v1")
+        self.api_base_url = (os.getenv("EUDIC_API_BASE_URL")
+                             or self.config.get("api_base_url", "https://api.frdic.com/api/open/v1"))
 
         if not self.eudic_token:
             raise ValueError("❌ 未找到欧路词典 API Token，请设置 EUDIC_TOKEN 环境变量或在 config/eudic_config.json 中配置")
@@ -110,14 +154,24 @@ class EudicSyncManager:
         if not self.anki_database_id:
             raise ValueError("❌ 未找到 ANKI_DATABASE_ID，请运行: ./lifeos setup-anki")
 
-        # 初始化 Notion 客户端 (API 2025-09-03)
-        self.notion = Client(auth=self.notion_token, notion_version="2025-09-03")
-        self.data_source_id = self._get_data_source_id(self.anki_database_id)
+        # 初始化 Notion 客户端 (API 2025-09-03，共享连接池)
+        self.http = get_http(self.notion_token)
+        self.meta = get_metadata_cache(self.http, META_CACHE_FILE)
+        self.data_source_id = self.meta.data_source_id(self.anki_database_id)
+        self.mirror = NotionMirror(MIRROR_FILE, self.data_source_id, self.http,
+                                   properties=ANKI_CARD_PROPERTIES, meta=self.meta)
 
         # 同步配置
         self.sync_settings = self.config.get("sync_settings", {})
         self.notion_mapping = self.config.get("notion_mapping", {})
         self.filters = self.config.get("filters", {})
+        self.writer = BatchWriter(self.http, max_workers=self.sync_settings.get("workers", DEFAULT_WORKERS))
+
+        # 检查点
+        self.checkpoint_every = self.sync_settings.get("checkpoint_every", CHECKPOINT_EVERY)
+        self.checkpoint_seconds = self.sync_settings.get("checkpoint_seconds", CHECKPOINT_SECONDS)
+        self._unsaved = 0
+        self._last_checkpoint = time.monotonic()
 
     def _load_config(self) -> Dict:
         """加载配置文件"""
@@ -132,35 +186,49 @@ class EudicSyncManager:
         if not STATE_FILE.exists():
             return {
                 "last_sync": None,
-                "synced_words": [],
-                "total_synced": 0
+                "total_synced": 0,
+                "watermark": None
             }
 
         with open(STATE_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
 
+    def _load_synced_words(self) -> SyncedWords:
+        """加载已同步单词（旧版状态文件中的 synced_words 列表迁移到文本文件）"""
+        synced = SyncedWords(SYNCED_WORDS_FILE)
+        legacy = self.state.pop("synced_words", None)
+        if legacy:
+            synced.update(legacy)
+            print(f"📦 已迁移 {len(legacy)} 个已同步单词到 {SYNCED_WORDS_FILE.name}")
+        return synced
+
+    def _write_state(self):
+        """写入已同步单词和状态文件（均为原子替换）"""
+        self.synced.save()
+        _write_atomic(STATE_FILE, json.dumps(self.state, ensure_ascii=False, indent=2))
+        self._unsaved = 0
+        self._last_checkpoint = time.monotonic()
+
     def _save_state(self):
         """保存同步状态"""
         self.state["last_sync"] = datetime.now().isoformat()
-
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        self._write_state()
 
         print(f"✓ 同步状态已保存: {STATE_FILE}")
 
-    def _get_data_source_id(self, database_id: str) -> str:
-        """从数据库 ID 获取数据源 ID"""
-        try:
-            database = self.notion.databases.retrieve(database_id)
-            data_sources = database.get("data_sources", [])
-
-            if not data_sources:
-                return database_id
+    def _checkpoint(self):
+        """
+        成功 checkpoint_every 个单词或距上次保存超过 checkpoint_seconds 秒时保存检查点
 
-            return data_sources[0]["id"]
-        except Exception as e:
-            print(f"⚠️  获取 data_source_id 失败，使用 database_id: {e}")
-            return database_id
+        水位线只在同步结束时推进，检查点中保持原值
+        """
+        if self.dry_run or not self._unsaved:
+            return
+        if (self._unsaved >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            count = self._unsaved
+            self._write_state()
+            print(f"💾 检查点：新增 {count} 个单词已保存")
 
     def fetch_vocabulary(self, page=1, page_size=50) -> List[Dict]:
         """
@@ -172,6 +240,9 @@ class EudicSyncManager:
 
         Returns:
             生词列表
+
+        Raises:
+            requests.exceptions.RequestException: 请求失败（空列表只表示已到最后一页）
         """
         language = self.sync_settings.get("language", "en")
         studylist_id = self.sync_settings.get("studylist_id", "0")
@@ -202,104 +273,144 @@ class EudicSyncManager:
             print(f"❌ 获取欧路词典生词失败: {e}")
             if hasattr(e.response, 'text'):
                 print(f"   错误详情: {e.response.text}")
-            return []
+            raise
 
-    def fetch_all_vocabulary(self) -> List[Dict]:
+    def iter_vocabulary(self, since: Optional[str] = None) -> Iterator[List[Dict]]:
         """
-        获取所有生词（自动分页）
+        逐页获取生词（自动分页）
 
-        Returns:
-            完整的生词列表
+        生词本按添加时间从新到旧返回；给出水位线时只保留不早于水位线的单词，
+        遇到更早的单词即停止翻页。与水位线比较之前先检查整页（及与上一页的衔接）
+        是否按添加时间倒序，不是时从当前页起改为完整获取（已产出的页面不重复）。
+
+        Args:
+            since: 水位线（add_time），None 表示完整获取
+
+        Yields:
+            每页的生词列表
         """
-        all_words = []
         page = 1
         page_size = self.sync_settings.get("page_size", 50)
+        watermark = _parse_time(since)
+        previous = None
 
         while True:
             words = self.fetch_vocabulary(page=page, page_size=page_size)
 
             if not words:
-                break
+                return
+
+            if watermark is not None:
+                times = [_parse_time(word.get("add_time")) for word in words]
+                ordered = None not in times and all(a >= b for a, b in zip(times, times[1:]))
+                if not ordered or (previous is not None and times[0] > previous):
+                    # 之前的页面都已完整产出（截断的页面会结束翻页）：从本页起不再按水位线截断
+                    print("⚠️  生词本未按添加时间倒序返回，改为完整获取")
+                    watermark = None
+                    kept = words
+                else:
+                    previous = times[-1]
+                    kept = [word for word, added in zip(words, times) if added >= watermark]
 
-            all_words.extend(words)
+                if len(kept) < len(words):
+                    if kept:
+                        yield kept
+                    print(f"✓ 已到达水位线 {since}，停止翻页")
+                    return
+
+            yield words
 
             # 如果返回的单词数少于 page_size，说明已经是最后一页
             if len(words) < page_size:
-                break
+                return
 
             page += 1
 
+    def fetch_all_vocabulary(self, since: Optional[str] = None) -> List[Dict]:
+        """
+        获取所有生词（自动分页）
+
+        Args:
+            since: 水位线（add_time），None 表示完整获取
+
+        Returns:
+            生词列表
+        """
+        all_words = [word for words in self.iter_vocabulary(since) for word in words]
         print(f"\n✓ 总计获取到 {len(all_words)} 个单词")
         return all_words
 
+    def next_watermark(self, newest: Optional[str], pending: List[Dict]) -> Optional[str]:
+        """
+        计算新的水位线
+
+        仍有未同步的新单词（失败）时，水位线退到其中最早的一个，下次运行会重新获取它们；
+        否则推进到本次获取的最新单词。
+
+        Args:
+            newest: 本次获取的最新 add_time（有单词缺少添加时间时为 None）
+            pending: 仍未同步的新单词
+
+        Returns:
+            新的水位线（add_time 原值）；缺少添加时间时保持原水位线
+        """
+        current = self.state.get("watermark")
+        if not pending:
+            return newest or current
+        times = [(_parse_time(w.get("add_time")), w.get("add_time")) for w in pending]
+        if any(parsed is None for parsed, _ in times):
+            return current
+        return min(times, key=lambda item: item[0])[1]
+
     def _fetch_existing_notion_titles(self) -> set:
         """
         从 Notion 查询已有的卡片标题（用于去重）
 
+        先增量刷新本地镜像，再从镜像读取标题
+
         Returns:
             已存在的卡片标题集合
         """
         print("🔍 查询 Notion 已有卡片...")
-        existing_titles = set()
-        start_cursor = None
+        self.mirror.refresh()
+        existing_titles = self.mirror.titles()
 
-        url = f"https://api.notion.com/v1/data_sources/{self.data_source_id}/query"
-        headers = {
-            "Authorization": f"Bearer {self.notion_token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2025-09-03"
-        }
+        print(f"   Notion 中已有 {len(existing_titles)} 张卡片")
+        return existing_titles
 
-        while True:
-            body = {"page_size": 100}
-            if start_cursor:
-                body["start_cursor"] = start_cursor
+    def existing_titles(self) -> set:
+        """
+        Notion 已有卡片标题（防止 CI 中无状态文件导致重复），并打印已同步统计
 
-            try:
-                response = requests.post(url, headers=headers, json=body, timeout=120)
-                if response.status_code != 200:
-                    print(f"   ⚠️  查询失败: {response.status_code}")
-                    break
-
-                data = response.json()
-                for page in data.get("results", []):
-                    props = page.get("properties", {})
-                    front = props.get("Front", {})
-                    titles = front.get("title", [])
-                    if titles:
-                        existing_titles.add(titles[0].get("plain_text", ""))
-
-                if data.get("has_more") and data.get("next_cursor"):
-                    start_cursor = data["next_cursor"]
-                else:
-                    break
-            except Exception as e:
-                print(f"   ⚠️  查询 Notion 出错: {e}")
-                break
+        Returns:
+            标题集合
+        """
+        existing_titles = self._fetch_existing_notion_titles()
 
-        print(f"   Notion 中已有 {len(existing_titles)} 张卡片")
+        print(f"📊 本地已同步: {len(self.synced)} | Notion已有: {len(existing_titles)}")
         return existing_titles
 
-    def filter_new_words(self, words: List[Dict]) -> List[Dict]:
+    def is_synced(self, word: str, existing_titles: set) -> bool:
+        """单词已在本地记录或 Notion 中"""
+        return word in self.synced or word in existing_titles
+
+    def filter_new_words(self, words: List[Dict], existing_titles: Optional[set] = None) -> List[Dict]:
         """
         过滤已同步的单词（同时检查本地状态和 Notion 已有卡片）
 
         Args:
             words: 完整单词列表
+            existing_titles: Notion 已有卡片标题（None 时调用 existing_titles 查询）
 
         Returns:
             未同步的新单词列表
         """
-        # 从本地状态获取已同步列表
-        synced_words = set(self.state.get("synced_words", []))
+        if existing_titles is None:
+            existing_titles = self.existing_titles()
 
-        # 从 Notion 查询已有卡片标题（防止 CI 中无状态文件导致重复）
-        existing_titles = self._fetch_existing_notion_titles()
-        all_known = synced_words | existing_titles
-
-        new_words = [w for w in words if w.get("word") not in all_known]
+        new_words = [w for w in words if not self.is_synced(w.get("word"), existing_titles)]
 
-        print(f"📊 本地已同步: {len(synced_words)} | Notion已有: {len(existing_titles)} | 新单词: {len(new_words)}")
+        print(f"📊 新单词: {len(new_words)}")
         return new_words
 
     def word_to_notion_card(self, word_data: Dict) -> Dict:
@@ -350,7 +461,47 @@ class EudicSyncManager:
 
         return properties
 
-    @retry_on_502(max_retries=3, delay=2)
+    def page_body(self, word_data: Dict) -> Dict:
+        """
+        构建创建页面的请求体
+
+        Args:
+            word_data: 欧路词典单词数据
+
+        Returns:
+            pages.create 请求体
+        """
+        # API 2025-09-03: 使用 data_source_id 作为 parent
+        return {
+            "parent": {"data_source_id": self.data_source_id},
+            "properties": self.word_to_notion_card(word_data)
+        }
+
+    def _record_result(self, word: str, result: Dict) -> bool:
+        """
+        记录单个单词的创建结果
+
+        Args:
+            word: 单词
+            result: BatchWriter.create_page 的结果
+
+        Returns:
+            是否成功
+        """
+        if result["ok"]:
+            print(f"   ✓ 已添加: {word}")
+            self.synced.add(word)
+            self.state["total_synced"] = self.state.get("total_synced", 0) + 1
+            self._unsaved += 1
+            self._checkpoint()
+            return True
+
+        print(f"   ❌ 添加失败 ({word}): {result['error']}")
+        # 数据源或属性已变化：下次运行重新获取元数据
+        if result["status"] in (400, 404):
+            self.meta.invalidate(data_source_id=self.data_source_id)
+        return False
+
     def add_to_notion(self, word_data: Dict) -> bool:
         """
         将单词添加到 Notion Anki Cards 数据库
@@ -367,22 +518,31 @@ class EudicSyncManager:
             print(f"   [DRY RUN] 将添加: {word}")
             return True
 
-        try:
-            properties = self.word_to_notion_card(word_data)
+        return self._record_result(word, self.writer.create_page(self.page_body(word_data)))
 
-            # API 2025-09-03: 使用 data_source_id 作为 parent
-            page_data = {
-                "parent": {"data_source_id": self.data_source_id},
-                "properties": properties
-            }
+    def add_all_to_notion(self, words: Iterable[Dict]) -> Dict[str, Optional[str]]:
+        """
+        并发添加多个单词（线程数 sync_settings.workers，速率由共享限流器控制）
 
-            self.notion.pages.create(**page_data)
-            print(f"   ✓ 已添加: {word}")
-            return True
+        Args:
+            words: 欧路词典单词数据（可以是仍在生成中的迭代器，边产出边写入）
 
-        except APIResponseError as e:
-            print(f"   ❌ 添加失败 ({word}): {e}")
-            return False
+        Returns:
+            单词 → 错误信息（None 表示成功）
+        """
+        outcomes: Dict[str, Optional[str]] = {}
+
+        if self.dry_run:
+            for word_data in words:
+                print(f"   [DRY RUN] 将添加: {word_data.get('word', '')}")
+                outcomes[word_data.get("word", "")] = None
+            return outcomes
+
+        bodies = ((word_data.get("word", ""), self.page_body(word_data)) for word_data in words)
+        for i, (word, result) in enumerate(self.writer.create_pages(bodies), 1):
+            print(f"[{i}] {word}")
+            outcomes[word] = None if self._record_result(word, result) else (result["error"] or "unknown error")
+        return outcomes
 
     def sync(self) -> Dict[str, int]:
         """
@@ -398,70 +558,101 @@ class EudicSyncManager:
         if self.dry_run:
             print("⚠️  试运行模式：不会实际写入 Notion\n")
 
-        # 1. 获取所有生词
-        all_words = self.fetch_all_vocabulary()
-
-        if not all_words:
-            print("⚠️  没有找到生词，退出同步")
-            return {"total": 0, "new": 0, "success": 0, "failed": 0}
+        # 1. 并行：刷新 Notion 镜像（已有标题）、逐页获取生词（有水位线时增量获取）
+        since = None if self.full else self.state.get("watermark")
+        if since:
+            print(f"🔖 增量获取：只取 {since} 之后添加的单词（--full 完整获取）")
 
-        # 2. 过滤已同步的单词
-        new_words = self.filter_new_words(all_words)
-
-        if not new_words:
-            print("\n✓ 所有单词已同步，无需更新")
-            return {"total": len(all_words), "new": 0, "success": 0, "failed": 0}
+        progress = {"total": 0, "new": 0, "newest": None, "dated": True, "truncated": False, "error": None}
+        # 交给写入线程的单词 → add_time（计算水位线用）
+        candidates: Dict[str, Optional[str]] = {}
 
-        # 3. 应用限制（如果设置了）
-        if self.limit and self.limit > 0:
-            original_count = len(new_words)
-            new_words = new_words[:self.limit]
-            print(f"⚠️  限制模式：只同步前 {self.limit} 个单词（共 {original_count} 个新单词）\n")
+        def new_words(titles_future) -> Iterator[Dict]:
+            # 2. 每页到达后立即过滤，新单词直接交给写入线程
+            pages = background(self.iter_vocabulary(since), maxsize=PREFETCH_PAGES)
+            titles = None
+            try:
+                for words in pages:
+                    if titles is None:
+                        titles = titles_future.result()
+                    progress["total"] += len(words)
+                    for word_data in words:
+                        added = _parse_time(word_data.get("add_time"))
+                        if added is None:
+                            progress["dated"] = False
+                        elif progress["newest"] is None or added > _parse_time(progress["newest"]):
+                            progress["newest"] = word_data["add_time"]
+
+                        word = word_data.get("word")
+                        if self.is_synced(word, titles) or word in candidates:
+                            continue
+                        # 3. 应用限制（如果设置了）
+                        if self.limit and self.limit > 0 and progress["new"] >= self.limit:
+                            print(f"⚠️  限制模式：只同步前 {self.limit} 个新单词\n")
+                            progress["truncated"] = True
+                            return
+                        progress["new"] += 1
+                        candidates[word] = word_data.get("add_time")
+                        yield word_data
+            except requests.exceptions.RequestException as e:
+                # 翻页中断：已交给写入线程的单词照常写入，水位线保持不变
+                progress["error"] = e
+            finally:
+                # 达到 --limit 提前返回时停止后台翻页，不再占用欧路请求
+                pages.cancel()
 
         # 4. 同步到 Notion
-        print(f"🔄 开始同步 {len(new_words)} 个新单词...\n")
-
-        success_count = 0
-        failed_count = 0
+        print("🔄 开始同步新单词...\n")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            titles_future = pool.submit(self.existing_titles)
+            outcomes = self.add_all_to_notion(new_words(titles_future))
+            titles_future.result()
+
+        if progress["error"]:
+            # 未翻完的生词本不能推进水位线（更早的单词可能还没取到）
+            print(f"\n⚠️  获取生词本中断，保持原水位线 {self.state.get('watermark')}")
+            if not self.dry_run:
+                self._save_state()
+            raise progress["error"]
+
+        if not progress["total"]:
+            print("⚠️  没有找到生词，退出同步")
+            return {"total": 0, "new": 0, "success": 0, "failed": 0}
 
-        for i, word_data in enumerate(new_words, 1):
-            word = word_data.get("word", "")
-            print(f"[{i}/{len(new_words)}] {word}")
+        success_count = sum(1 for error in outcomes.values() if error is None)
+        failed_count = len(outcomes) - success_count
 
-            try:
-                if self.add_to_notion(word_data):
-                    success_count += 1
-                    # 标记为已同步
-                    if "synced_words" not in self.state:
-                        self.state["synced_words"] = []
-                    self.state["synced_words"].append(word)
-                else:
-                    failed_count += 1
-            except Exception as e:
-                print(f"   ❌ 添加失败 ({word}): {e}")
-                failed_count += 1
-                # 继续处理下一个单词，不中断流程
+        if not progress["new"]:
+            print("\n✓ 所有单词已同步，无需更新")
 
-        # 4. 保存状态
-        self.state["total_synced"] = self.state.get("total_synced", 0) + success_count
+        # 5. 保存状态
+        pending = [{"word": word, "add_time": added} for word, added in candidates.items()
+                   if outcomes.get(word, "") is not None]
+        if progress["truncated"]:
+            # 截断后的单词更早，增量获取时保持原水位线；完整获取时下次重新完整获取
+            self.state["watermark"] = since
+        else:
+            self.state["watermark"] = self.next_watermark(
+                progress["newest"] if progress["dated"] else None, pending
+            )
 
         if not self.dry_run:
             self._save_state()
 
-        # 5. 打印统计
+        # 6. 打印统计
         print("\n" + "=" * 50)
         print("✅ 同步完成")
         print("=" * 50)
-        print(f"总单词数: {len(all_words)}")
-        print(f"新单词数: {len(new_words)}")
+        print(f"总单词数: {progress['total']}")
+        print(f"新单词数: {progress['new']}")
         print(f"成功: {success_count}")
         print(f"失败: {failed_count}")
         print(f"累计同步: {self.state.get('total_synced', 0)}")
         print("=" * 50)
 
         return {
-            "total": len(all_words),
-            "new": len(new_words),
+            "total": progress["total"],
+            "new": progress["new"],
             "success": success_count,
             "failed": failed_count
         }
@@ -481,10 +672,15 @@ def main():
         default=None,
         help="限制同步单词数量（用于测试）"
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="忽略水位线，完整获取生词本"
+    )
     args = parser.parse_args()
 
     try:
-        manager = EudicSyncManager(dry_run=args.dry_run, limit=args.limit)
+        manager = EudicSyncManager(dry_run=args.dry_run, limit=args.limit, full=args.full)
         manager.sync()
 
     except Exception as e:
@@ -0,0 +1,107 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "notion-kit"))
+
+
+class FakeNotionHTTP:
+    """NotionHTTP 的替身：数据源查询返回 pages，创建与写回只记录不修改页面"""
+
+    def __init__(self):
+        self.pages = {}
+        self.failing = set()     # 创建时返回 400 的标题
+        self.crash_on = None     # 创建时抛出异常的标题
+        self.edited = None       # 写回响应中的 last_edited_time
+        self.created = []
+        self.patched = {}
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def put(self, *pages):
+        """加入或替换数据源中的页面（下次刷新镜像时可见）"""
+        for page in pages:
+            self.pages[page["id"]] = page
+
+    def iter_batches(self, data_source_id, body=None, **kwargs):
+        return iter([list(self.pages.values())])
+
+    def iter_query(self, data_source_id, body=None, **kwargs):
+        return iter(list(self.pages.values()))
+
+    def sdk(self):
+        return None
+
+    def post(self, path, json=None, timeout=None):
+        word = json["properties"]["Front"]["title"][0]["text"]["content"]
+        if word == self.crash_on:
+            raise RuntimeError("job cancelled")
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+            self.created.append(word)
+        request = httpx.Request("POST", "https://api.notion.com/v1/pages")
+        if word in self.failing:
+            return httpx.Response(400, json={"message": "validation failed"}, request=request)
+        return httpx.Response(200, json={"id": f"page-{word}"}, request=request)
+
+    def patch(self, path, json=None, timeout=None):
+        with self.lock:
+            self.patched[path.split("/")[1]] = json["properties"]
+        body = {"last_edited_time": self.edited} if self.edited else {}
+        return httpx.Response(200, json=body, request=httpx.Request("PATCH", path))
+
+
+class FakeMeta:
+    """元数据缓存的替身：固定的 data_source_id，没有 schema（镜像不投影）"""
+
+    def __init__(self):
+        self.invalidated = []
+
+    def data_source_id(self, database_id):
+        return "ds"
+
+    def schema(self, data_source_id):
+        return {}
+
+    def invalidate(self, data_source_id=None):
+        self.invalidated.append(data_source_id)
+
+
+def write_config(path, source, **sections):
+    """以仓库中的配置文件为底，按节覆盖部分设置后写入 path"""
+    with open(ROOT / "config" / source, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    for section, values in sections.items():
+        config.setdefault(section, {}).update(values)
+    Path(path).write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def fake_notion(monkeypatch):
+    """同步脚本的运行环境：令牌齐全，get_http / get_metadata_cache 返回替身"""
+    import anki_sync
+    import scripts.sync_eudic_notion as eudic
+
+    for name, value in {"NOTION_TOKEN": "secret", "ANKI_DATABASE_ID": "anki-db", "EUDIC_TOKEN": "eudic"}.items():
+        monkeypatch.setenv(name, value)
+    for name in ("DATABASE_ID", "TELEGRAM_BOT_TOKEN", "TELEGRAM_CHAT_ID", "EUDIC_API_BASE_URL", "ANKI_CONNECT_URL"):
+        monkeypatch.delenv(name, raising=False)
+
+    http, meta = FakeNotionHTTP(), FakeMeta()
+    for module in (anki_sync, eudic):
+        monkeypatch.setattr(module, "get_http", lambda *args, **kwargs: http)
+        monkeypatch.setattr(module, "get_metadata_cache", lambda *args, **kwargs: meta)
+    http.meta = meta
+    return http
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import genanki
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from anki_connect import AnkiConnect, AnkiConnectTarget
+from fake_anki import FakeAnkiConnect, FakeAnkiServer
+
+MODEL = genanki.Model(1607392319, "LifeOS Basic",
+                      fields=[{"name": "Front"}, {"name": "Back"}, {"name": "Source"}],
+                      templates=[{"name": "Card 1", "qfmt": "{{Front}}", "afmt": "{{Back}}"}])
+
+
+def note(page_id, front, back, deck="LifeOS::Vocabulary", tags=()):
+    return {"page_id": page_id, "guid": hash(page_id) & 0xffffff, "deck": deck,
+            "fields": [front, back, ""], "tags": list(tags)}
+
+
+def test_push_adds_updates_and_skips_in_batched_calls(tmp_path):
+    fake = FakeAnkiConnect()
+    with FakeAnkiServer(fake) as server:
+        target = AnkiConnectTarget(AnkiConnect(server.url), MODEL, tmp_path / "map.tsv")
+
+        assert target.push([note("p1", "alpha", "one"), note("p2", "beta *x_", "two")]) == {"p1": None, "p2": None}
+        assert fake.stats["actions"]["addNotes"] == 1
+        assert "LifeOS::Vocabulary" in fake.decks and "LifeOS Basic" in fake.models
+
+        # 新进程：映射从文件加载；未变化的跳过，变化的在一次 multi 中更新
+        fake.stats["requests"] = 0
+        target = AnkiConnectTarget(AnkiConnect(server.url), MODEL, tmp_path / "map.tsv")
+        assert target.push([note("p1", "alpha", "one"), note("p2", "beta *x_", "two!", tags=["t"])]) == \
+            {"p1": None, "p2": None}
+        assert fake.stats["requests"] == 3      # ensure + notesInfo + multi(updates)
+        assert fake.stats["actions"]["addNotes"] == 1
+        edited = [n for n in fake.notes.values() if n["fields"]["Back"] == "two!"]
+        assert len(edited) == 1 and edited[0]["tags"] == ["t"]
+
+
+def test_notes_imported_from_packages_are_found_instead_of_duplicated(tmp_path):
+    fake = FakeAnkiConnect()
+    with FakeAnkiServer(fake) as server:
+        AnkiConnectTarget(AnkiConnect(server.url), MODEL).push([note("p1", "alpha", "one")])
+
+        target = AnkiConnectTarget(AnkiConnect(server.url), MODEL, tmp_path / "map.tsv")
+        target.push([note("p1", "alpha", "one, edited")])
+
+    assert len(fake.notes) == 1
+    assert next(iter(fake.notes.values()))["fields"]["Back"] == "one, edited"
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from anki_ledger import NoteLedger, note_hash
+
+
+def test_note_hash_ignores_tag_order_but_not_content():
+    assert note_hash(["a", "b"], ["x", "y"], "D") == note_hash(["a", "b"], ["y", "x"], "D")
+    assert note_hash(["a", "b"], [], "D") != note_hash(["a", "c"], [], "D")
+    assert note_hash(["a", "b"], [], "D") != note_hash(["a", "b"], [], "E")
+    assert note_hash(["ab", ""], [], "") != note_hash(["a", "b"], [], "")
+
+
+def test_only_committed_entries_survive_a_restart(tmp_path):
+    ledger = NoteLedger(tmp_path / "ledger.tsv")
+    ledger.stage(1, "h1", "page-1")
+    ledger.commit()
+    ledger.stage(2, "h2", "page-2")
+    ledger.discard()
+
+    reloaded = NoteLedger(tmp_path / "ledger.tsv")
+    assert len(reloaded) == 1
+    assert not reloaded.changed(1, "h1")
+    assert reloaded.changed(1, "h1-edited")
+    assert reloaded.changed(2, "h2")
+
+
+def test_exported_edit_times_survive_a_restart_and_old_ledgers_load(tmp_path):
+    path = tmp_path / "ledger.tsv"
+    path.write_text("guid\thash\tpage_id\n1\th1\tpage-1\n", encoding="utf-8")
+    ledger = NoteLedger(path)
+    assert not ledger.changed(1, "h1")
+    assert ledger.exported("page-1") is None
+
+    ledger.stage(2, "h2", "page-2", "2025-01-02T10:00:00.000Z")
+    assert ledger.exported("page-2") is None
+    ledger.commit()
+
+    reloaded = NoteLedger(path)
+    assert reloaded.exported("page-2") == "2025-01-02T10:00:00.000Z"
+    assert not reloaded.changed(1, "h1")
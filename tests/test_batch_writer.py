@@ -0,0 +1,39 @@
+import sys
+import threading
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from batch_writer import BatchWriter
+
+
+class FakeHTTP:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.patched = {}
+        self.lock = threading.Lock()
+
+    def patch(self, path, json=None, timeout=None):
+        page_id = path.split("/")[1]
+        with self.lock:
+            self.patched[page_id] = json["properties"]
+        request = httpx.Request("PATCH", f"https://api.notion.com/v1/{path}")
+        if page_id in self.failing:
+            return httpx.Response(400, json={"message": "validation failed"}, request=request)
+        return httpx.Response(200, json={"id": page_id}, request=request)
+
+
+def test_update_pages_reports_each_page():
+    http = FakeHTTP(failing={"bad"})
+    writer = BatchWriter(http, max_workers=3)
+    updates = {pid: {"Synced": {"checkbox": True}} for pid in ("a", "b", "bad")}
+    seen = []
+
+    report = writer.update_pages(updates, on_result=lambda pid, result: seen.append(pid))
+
+    assert set(http.patched) == {"a", "b", "bad"}
+    assert report["a"] == {"ok": True, "status": 200, "error": None, "edited": None}
+    assert report["bad"] == {"ok": False, "status": 400, "error": "validation failed", "edited": None}
+    assert sorted(seen) == ["a", "b", "bad"]
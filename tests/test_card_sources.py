@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from card_sources import CardSource, CortexSource, collect
+
+
+class StaticSource(CardSource):
+    def __init__(self, name, ids):
+        self.name = name
+        self.ids = ids
+
+    def pages(self):
+        return ({"id": page_id} for page_id in self.ids)
+
+
+class FakeHTTP:
+    def iter_batches(self, data_source_id, body, timeout=None):
+        assert body["filter"]["property"] == "Last Reviewed"
+        yield [{"id": "c1"}, {"id": "c2"}]
+        yield [{"id": "c3"}]
+
+
+def test_collect_tags_pages_with_their_source_and_skips_pending():
+    cards = StaticSource("anki_cards", ["a1", "a2", "pending"])
+    cortex = CortexSource(FakeHTTP(), "cortex-ds")
+
+    collected = {page["id"]: source.name for source, page in collect([cards, cortex], skip={"pending"})}
+
+    assert collected == {"a1": "anki_cards", "a2": "anki_cards", "c1": "cortex", "c2": "cortex", "c3": "cortex"}
+    assert cortex.synced_properties("2026-01-01")["Status"] == {"select": {"name": "Learning"}}
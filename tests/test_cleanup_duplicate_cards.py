@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.cleanup_duplicate_cards import find_duplicates
+
+
+def card(page_id, *fragments, created):
+    return {
+        "id": page_id,
+        "created_time": created,
+        "properties": {"Front": {"type": "title", "title": [{"plain_text": f} for f in fragments]}},
+    }
+
+
+def test_find_duplicates_compares_full_multi_fragment_titles():
+    cards = [
+        card("a", "ad ", "hoc", created="2026-01-01"),
+        card("b", "ad ", "nauseam", created="2026-01-02"),
+        card("c", "ad hoc", created="2026-01-03"),
+    ]
+
+    to_delete, by_title = find_duplicates(cards)
+
+    assert [c["id"] for c in to_delete] == ["c"]
+    assert set(by_title) == {"ad hoc", "ad nauseam"}
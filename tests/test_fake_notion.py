@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from fake_notion import ANKI_DATA_SOURCE_ID, FakeNotion, FakeNotionServer, build_fixture
+from notion_http import NotionHTTP
+from rate_limit import RateLimiter
+
+
+def make_http(url):
+    return NotionHTTP(token="fake", base_url=url, limiter=RateLimiter(rate=1000, burst=1000, budgets={}))
+
+
+def test_query_follows_cursors_filters_and_projects():
+    fixture = build_fixture(cards=250, cortex=0, duplicates=0)
+    with FakeNotionServer(FakeNotion(fixture)) as server:
+        http = make_http(server.url)
+        body = {"filter": {"property": "Tags", "multi_select": {"contains": "欧路"}}}
+
+        batches = list(http.iter_batches(ANKI_DATA_SOURCE_ID, body, filter_properties=["title"]))
+        pages = [page for batch in batches for page in batch]
+
+        assert [len(batch) for batch in batches] == [100, 25]
+        assert all(set(page["properties"]) == {"Front"} for page in pages)
+        http.close()
+
+
+def test_injected_faults_are_retried_by_the_transport():
+    fake = FakeNotion(build_fixture(cards=10, cortex=0, duplicates=0), p429=0.3, p5xx=0.05,
+                      retry_after=0, seed=1)
+    with FakeNotionServer(fake) as server:
+        http = make_http(server.url)
+        page_id = next(iter(fake.pages))
+
+        for _ in range(10):
+            response = http.patch(f"pages/{page_id}", json={"properties": {"Synced": {"checkbox": True}}})
+            assert response.status_code == 200
+
+        assert fake.stats["injected_429"] + fake.stats["injected_5xx"] > 0
+        assert fake.pages[page_id]["properties"]["Synced"]["checkbox"] is True
+        http.close()
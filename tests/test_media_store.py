@@ -0,0 +1,56 @@
+import hashlib
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from media_store import MediaStore, referenced_media
+from notion_html import blocks_html
+
+PNG = b"\x89PNG fake image bytes"
+
+
+def image(block_id, url):
+    return {"id": block_id, "type": "image", "last_edited_time": "2026-01-01T00:00:00.000Z",
+            "image": {"type": "file", "file": {"url": url}, "caption": []}}
+
+
+def make_store(tmp_path, requests):
+    def handler(request):
+        requests.append(str(request.url))
+        return httpx.Response(200, content=PNG, headers={"content-type": "image/png"})
+    return MediaStore(tmp_path, client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+
+def test_media_is_content_addressed_and_not_downloaded_twice(tmp_path):
+    requests = []
+    store = make_store(tmp_path, requests)
+    blocks = [image("b1", "https://s3.example.com/a/photo.PNG?sig=1"),
+              {"id": "t", "type": "toggle", "toggle": {"rich_text": []},
+               "children": [image("b2", "https://s3.example.com/b/copy.png?sig=2")]}]
+
+    media = store.fetch_blocks(blocks)
+
+    name = hashlib.sha256(PNG).hexdigest() + ".png"
+    assert media == {"b1": name, "b2": name}
+    assert (tmp_path / name).read_bytes() == PNG
+    assert not list(tmp_path.glob("*.part"))
+    assert referenced_media(blocks_html(blocks, media)) == [name]
+
+    # 新的签名 URL、同一个块：读索引，不再下载
+    again = make_store(tmp_path, requests)
+    assert again.fetch_blocks([image("b1", "https://s3.example.com/a/photo.png?sig=3")]) == {"b1": name}
+    assert len(requests) == 2
+
+
+def test_shipped_media_is_recorded_only_on_commit(tmp_path):
+    store = make_store(tmp_path, [])
+    store.stage("a.png")
+    store.discard()
+    store.stage("b.png")
+    store.commit()
+
+    reloaded = make_store(tmp_path, [])
+    assert reloaded.is_shipped("b.png") and not reloaded.is_shipped("a.png")
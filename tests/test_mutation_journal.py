@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from mutation_journal import DONE, FAILED, MutationJournal
+
+
+def test_restart_replays_only_outstanding(tmp_path):
+    path = tmp_path / "job.jsonl"
+    journal = MutationJournal(path)
+    journal.plan("archive", ["a", "b", "c"])
+    journal.seal()
+    journal.mark("a", "archive", DONE)
+    journal.mark("b", "archive", FAILED, "502")
+
+    resumed = MutationJournal(path)
+
+    assert resumed.sealed
+    assert resumed.outstanding("archive") == ["b", "c"]
+    assert resumed.counts() == {"planned": 1, "done": 1, "failed": 1}
+
+
+def test_unsealed_plan_is_extended_without_duplicates(tmp_path):
+    path = tmp_path / "job.jsonl"
+    journal = MutationJournal(path)
+    journal.plan("archive", ["a", "b"])
+    journal.mark("a", "archive", DONE)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "archive", "page_id": "tr')   # 中断写了半行
+
+    resumed = MutationJournal(path)
+    assert not resumed.sealed
+    assert resumed.plan("archive", ["a", "b", "c"]) == 1
+    assert resumed.outstanding() == ["b", "c"]
+    assert MutationJournal(path).outstanding() == ["b", "c"]
+
+
+def test_clear_removes_the_file(tmp_path):
+    journal = MutationJournal(tmp_path / "job.jsonl")
+    journal.plan("archive", ["a"])
+    journal.clear()
+    assert not (tmp_path / "job.jsonl").exists()
+    assert journal.outstanding() == []
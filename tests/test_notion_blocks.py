@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from notion_blocks import BlockFetcher, render_text
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def para(block_id, text, has_children=False, block_type="paragraph"):
+    return {
+        "id": block_id,
+        "type": block_type,
+        "has_children": has_children,
+        block_type: {"rich_text": [{"plain_text": text}]},
+    }
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.calls = []
+        self.pages = {
+            ("page", None): {"results": [para("p1", "first")], "has_more": True, "next_cursor": "c1"},
+            ("page", "c1"): {"results": [para("t1", "toggle", has_children=True, block_type="toggle")],
+                             "has_more": False},
+            ("t1", None): {"results": [para("n1", "nested")], "has_more": False},
+        }
+
+    def get(self, path, params=None, timeout=None):
+        block_id = path.split("/")[1]
+        cursor = (params or {}).get("start_cursor")
+        self.calls.append((block_id, cursor))
+        return FakeResponse(self.pages[(block_id, cursor)])
+
+
+def test_page_body_follows_pagination_and_nesting():
+    http = FakeHTTP()
+    fetcher = BlockFetcher(http)
+
+    body = fetcher.page_body({"id": "page", "last_edited_time": "2026-01-01T00:00:00.000Z"})
+
+    assert body == "first\ntoggle\n  nested"
+    assert http.calls == [("page", None), ("page", "c1"), ("t1", None)]
+
+
+def test_cached_body_is_reused_until_page_is_edited(tmp_path):
+    http = FakeHTTP()
+    fetcher = BlockFetcher(http, tmp_path)
+    page = {"id": "page", "last_edited_time": "2026-01-01T00:00:00.000Z"}
+
+    assert fetcher.fetch_bodies([page]) == {"page": "first\ntoggle\n  nested"}
+    assert fetcher.fetch_bodies([page]) == {"page": "first\ntoggle\n  nested"}
+    assert len(http.calls) == 3
+
+    fetcher.page_body(dict(page, last_edited_time="2026-01-02T00:00:00.000Z"))
+    assert len(http.calls) == 6
+
+
+def test_render_text_skips_non_text_blocks():
+    blocks = [{"type": "divider"}, para("a", "text")]
+    assert render_text(blocks) == "text"
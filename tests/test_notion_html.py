@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from notion_html import blocks_html, rich_text_html, _render_payload
+
+
+def run(text, href=None, **annotations):
+    return {"type": "text", "plain_text": text, "href": href, "annotations": annotations}
+
+
+def test_rich_text_keeps_every_run_with_annotations_and_escapes():
+    items = [run("a < b ", bold=True), run("code", code=True), run(" link", href="https://example.com/?a=1&b=2"),
+             run(" bad", href="javascript:alert(1)"), run(" red", color="red")]
+
+    assert rich_text_html(items) == (
+        '<b>a &lt; b </b><code>code</code><a href="https://example.com/?a=1&amp;b=2"> link</a>'
+        ' bad<span style="color: #d44c47"> red</span>'
+    )
+
+
+def test_rich_text_is_memoized_per_payload():
+    _render_payload.cache_clear()
+    rich_text_html([run("same")])
+    rich_text_html([run("same")])
+    assert _render_payload.cache_info().hits == 1
+
+
+def test_blocks_render_lists_headings_and_code():
+    def block(block_type, text, children=None, **extra):
+        data = {"rich_text": [run(text)], **extra}
+        return {"type": block_type, block_type: data, **({"children": children} if children else {})}
+
+    blocks = [
+        block("heading_2", "Title"),
+        block("bulleted_list_item", "one", children=[block("numbered_list_item", "nested")]),
+        block("bulleted_list_item", "two"),
+        block("code", "x = a<b", language="Python"),
+    ]
+
+    assert blocks_html(blocks) == (
+        "<h4>Title</h4><ul><li>one<ol><li>nested</li></ol></li><li>two</li></ul>"
+        '<pre><code class="language-python">x = a&lt;b</code></pre>'
+    )
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from notion_http import NotionHTTP, get_http, paginate
+
+
+def test_sdk_client_reuses_the_shared_connection_pool():
+    http = NotionHTTP(token="secret", base_url="http://notion.test", pool_size=4)
+
+    notion = http.sdk()
+
+    assert notion.client._transport is http.transport
+    assert str(notion.client.base_url) == "http://notion.test/v1/"
+    assert http.client.headers["Authorization"] == "Bearer secret"
+    assert http.client.headers["Notion-Version"] == "2025-09-03"
+
+
+def test_get_http_returns_one_pool_per_token():
+    first = get_http("token-a", base_url="http://notion.test")
+
+    assert get_http("token-a") is first
+    assert get_http("token-b", base_url="http://notion.test") is not first
+
+
+def _pages(count, per_page):
+    pages = {}
+    for start in range(0, count, per_page):
+        cursor = None if start == 0 else str(start)
+        has_more = start + per_page < count
+        pages[cursor] = {
+            "results": list(range(start, min(start + per_page, count))),
+            "has_more": has_more,
+            "next_cursor": str(start + per_page) if has_more else None,
+        }
+    return pages
+
+
+def test_paginate_follows_next_cursor_across_all_pages():
+    pages = _pages(250, 100)
+
+    batches = list(paginate(lambda cursor: pages[cursor]))
+
+    assert [len(b) for b in batches] == [100, 100, 50]
+
+
+def test_paginate_stops_fetching_after_early_termination():
+    pages = _pages(1000, 100)
+    fetched = []
+
+    def fetch(cursor):
+        fetched.append(cursor)
+        return pages[cursor]
+
+    for batch in paginate(fetch, prefetch=False):
+        break
+
+    assert fetched == [None]
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from notion_meta import MetadataCache, is_schema_error
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.paths = []
+
+    def get(self, path, timeout=None):
+        self.paths.append(path)
+        request = httpx.Request("GET", f"https://api.notion.com/v1/{path}")
+        if path.startswith("databases/"):
+            return httpx.Response(200, json={"data_sources": [{"id": "ds-1"}]}, request=request)
+        return httpx.Response(200, json={"properties": {"Front": {"id": "title", "type": "title"}}},
+                              request=request)
+
+
+def test_second_process_reads_ids_and_schema_from_disk(tmp_path):
+    first = FakeHTTP()
+    cache = MetadataCache(tmp_path / "meta.json", first)
+    assert cache.data_source_id("db-1") == "ds-1"
+    assert cache.schema("ds-1")["Front"]["type"] == "title"
+
+    second = FakeHTTP()
+    restarted = MetadataCache(tmp_path / "meta.json", second)
+    assert restarted.data_source_id("db-1") == "ds-1"
+    assert "Front" in restarted.schema("ds-1")
+    assert second.paths == []
+
+
+def test_expired_and_invalidated_entries_are_refetched(tmp_path):
+    http = FakeHTTP()
+    MetadataCache(tmp_path / "meta.json", http).data_source_id("db-1")
+
+    expired = MetadataCache(tmp_path / "meta.json", http, ttl=0)
+    expired.data_source_id("db-1")
+    assert http.paths == ["databases/db-1", "databases/db-1"]
+
+    cache = MetadataCache(tmp_path / "meta.json", http)
+    cache.schema("ds-1")
+    cache.invalidate(data_source_id="ds-1")
+    cache.data_source_id("db-1")
+    cache.schema("ds-1")
+    assert http.paths[2:] == ["data_sources/ds-1", "databases/db-1", "data_sources/ds-1"]
+
+
+def test_is_schema_error():
+    request = httpx.Request("POST", "https://api.notion.com/v1/pages")
+    assert is_schema_error(httpx.Response(404, request=request))
+    assert is_schema_error(httpx.Response(400, json={"code": "validation_error"}, request=request))
+    assert not is_schema_error(httpx.Response(400, json={"code": "invalid_json"}, request=request))
+    assert not is_schema_error(httpx.Response(502, request=request))
+    assert not is_schema_error(None)
@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from notion_http import NotionHTTP
+from notion_mirror import NotionMirror
+
+
+class FakeHTTP:
+    iter_batches = NotionHTTP.iter_batches
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.bodies = []
+
+    def query(self, data_source_id, body=None, start_cursor=None, timeout=None, filter_properties=None):
+        self.bodies.append(dict(body, filter_properties=filter_properties))
+        return self.batches.pop(0)
+
+    def get(self, path, timeout=None):
+        return FakeResponse({"properties": {
+            "Front": {"id": "title", "type": "title"},
+            "Back": {"id": "b%3D", "type": "rich_text"},
+            "Tags": {"id": "t%3A", "type": "multi_select"},
+        }})
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def card(page_id, front, edited, tags=("欧路",), synced=False, created="2026-01-01T00:00:00.000Z"):
+    return {
+        "id": page_id,
+        "created_time": created,
+        "last_edited_time": edited,
+        "properties": {
+            "Front": {"type": "title", "title": [{"plain_text": front}]},
+            "Deck": {"type": "select", "select": {"name": "Vocabulary"}},
+            "Tags": {"type": "multi_select", "multi_select": [{"name": t} for t in tags]},
+            "Synced": {"type": "checkbox", "checkbox": synced},
+        },
+    }
+
+
+def test_refresh_is_incremental_from_the_watermark(tmp_path):
+    http = FakeHTTP([
+        {"results": [card("a", "alpha", "2026-01-01T00:00:00.000Z"),
+                     card("b", "beta", "2026-01-02T00:00:00.000Z", synced=True)]},
+        {"results": [card("a", "alpha2", "2026-01-03T00:00:00.000Z")]},
+    ])
+    mirror = NotionMirror(tmp_path / "mirror.db", "ds", http)
+
+    mirror.refresh()
+    mirror.refresh()
+
+    assert "filter" not in http.bodies[0]
+    assert http.bodies[1]["filter"]["last_edited_time"] == {"on_or_after": "2026-01-02T00:00:00.000Z"}
+    assert mirror.titles() == {"alpha2", "beta"}
+    assert mirror.watermark == "2026-01-03T00:00:00.000Z"
+
+
+def test_pages_filters_by_tag_and_synced_and_forget_removes(tmp_path):
+    http = FakeHTTP([{"results": [
+        card("a", "alpha", "2026-01-01T00:00:00.000Z"),
+        card("b", "beta", "2026-01-01T00:00:00.000Z", tags=("English",)),
+        card("c", "gamma", "2026-01-01T00:00:00.000Z", synced=True),
+    ]}])
+    mirror = NotionMirror(tmp_path / "mirror.db", "ds", http)
+    mirror.refresh()
+
+    assert [p["id"] for p in mirror.pages(tag="欧路")] == ["a", "c"]
+    assert [p["id"] for p in mirror.pages(synced=False)] == ["a", "b"]
+
+    mirror.forget(["a"])
+
+    assert [p["id"] for p in mirror.pages(tag="欧路")] == ["c"]
+
+
+def test_projection_sends_property_ids_and_widening_forces_full_refresh(tmp_path):
+    db = tmp_path / "mirror.db"
+    http = FakeHTTP([
+        {"results": [card("a", "alpha", "2026-01-01T00:00:00.000Z")]},
+        {"results": [card("a", "alpha", "2026-01-01T00:00:00.000Z")]},
+    ])
+
+    NotionMirror(db, "ds", http, properties=["Front", "Tags"]).refresh()
+    NotionMirror(db, "ds", http, properties=["Front", "Back", "Tags"]).refresh()
+
+    assert http.bodies[0]["filter_properties"] == ["title", "t%3A"]
+    assert "filter" not in http.bodies[1]
+    assert http.bodies[1]["filter_properties"] == ["b%3D", "title", "t%3A"]
+
+
+def test_reconcile_drops_pages_deleted_in_notion(tmp_path):
+    http = FakeHTTP([
+        {"results": [card("a", "alpha", "2026-01-01T00:00:00.000Z"),
+                     card("b", "beta", "2026-01-01T00:00:00.000Z")]},
+        {"results": []},
+        # 对账扫描：b 已在 Notion 中删除
+        {"results": [{"id": "a", "properties": {}}]},
+    ])
+    http.iter_query = NotionHTTP.iter_query.__get__(http)
+    mirror = NotionMirror(tmp_path / "mirror.db", "ds", http)
+
+    mirror.refresh()
+    assert mirror.reconciled_at is not None
+    mirror.refresh(reconcile_hours=0)
+
+    assert http.bodies[2]["filter_properties"] == ["title"]
+    assert mirror.titles() == {"alpha"}
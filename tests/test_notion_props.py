@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from notion_props import PageDecoder, decode_property
+
+
+def rich(*parts):
+    return [{"plain_text": part} for part in parts]
+
+
+def test_rich_text_is_fully_concatenated():
+    prop = {"type": "rich_text", "rich_text": rich("first ", "second ", "third")}
+
+    assert decode_property(prop) == "first second third"
+
+
+def test_page_decoder_uses_compiled_schema_and_resolves_property_ids():
+    decoder = PageDecoder({
+        "Front": {"id": "title", "type": "title"},
+        "Deck": {"id": "d%3F", "type": "select"},
+    })
+    page = {"properties": {
+        "Front": {"type": "title", "title": rich("ab", "cd")},
+        "Deck": {"type": "select", "select": {"name": "Vocabulary"}},
+        "Tags": {"type": "multi_select", "multi_select": [{"name": "English"}]},
+    }}
+
+    assert decoder.decode(page) == {"Front": "abcd", "Deck": "Vocabulary", "Tags": ["English"]}
+    assert decoder.get(page, "Missing") is None
+    assert decoder.property_ids(["Front", "Deck", "Other"]) == ["title", "d%3F", "Other"]
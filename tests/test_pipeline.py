@@ -0,0 +1,71 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from pipeline import PhaseTimer, background, merge, parallel_map
+
+
+def test_parallel_map_processes_every_item_with_bounded_queues():
+    results = parallel_map(lambda x: x * 2, background(range(1000), maxsize=4), workers=3, maxsize=4)
+
+    assert sorted(results) == [x * 2 for x in range(1000)]
+
+
+def test_errors_reach_the_consumer():
+    def convert(x):
+        if x == 7:
+            raise ValueError("bad item")
+        return x
+
+    with pytest.raises(ValueError, match="bad item"):
+        list(parallel_map(convert, range(100), workers=2))
+
+
+def test_cancel_stops_a_blocked_producer():
+    produced = []
+    stopped = threading.Event()
+
+    def source():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            stopped.set()
+
+    channel = background(source(), maxsize=2)
+    assert next(iter(channel)) == 0
+    channel.cancel()
+
+    assert stopped.wait(5)
+    assert len(produced) < 10
+
+
+def test_merge_runs_sources_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def source(name):
+        barrier.wait()          # deadlocks unless both sources run at once
+        yield from (f"{name}{i}" for i in range(3))
+
+    assert sorted(merge([source("a"), source("b")], maxsize=1)) == ["a0", "a1", "a2", "b0", "b1", "b2"]
+    assert list(merge([])) == []
+
+
+def test_phase_timer_sums_work_across_threads():
+    timer = PhaseTimer()
+
+    def slow(x):
+        threading.Event().wait(0.01)
+        return x
+
+    items = timer.iter("query", (slow(x) for x in range(4)))
+    assert sorted(parallel_map(timer.wrap("convert", slow), items, workers=4)) == [0, 1, 2, 3]
+
+    report = timer.report()
+    assert report["query"] >= 0.04 and report["convert"] >= 0.04
+    assert report["total"] >= report["query"]
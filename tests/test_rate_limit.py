@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+from rate_limit import RateLimitedTransport, RateLimiter, endpoint_of, parse_retry_after
+
+
+def test_endpoint_of_classifies_notion_paths():
+    assert endpoint_of("/v1/data_sources/abc/query") == "query"
+    assert endpoint_of("/v1/pages/abc") == "pages"
+    assert endpoint_of("/v1/blocks/abc/children") == "blocks"
+    assert endpoint_of("/v1/databases/abc") == "databases"
+
+
+def test_parse_retry_after_accepts_seconds_and_rejects_garbage():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_transport_retries_429_and_halves_concurrency_window():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"ok": True})
+
+    limiter = RateLimiter(rate=1000, burst=1000, budgets={}, max_concurrency=8)
+    client = httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(handler), limiter))
+
+    response = client.patch("https://api.notion.com/v1/pages/abc", json={"archived": True})
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert limiter.window < 8
+    assert limiter.in_flight == 0
+
+
+def test_transport_does_not_retry_page_creation_on_500():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    limiter = RateLimiter(rate=1000, burst=1000, budgets={})
+    client = httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(handler), limiter))
+
+    response = client.post("https://api.notion.com/v1/pages", json={})
+
+    assert response.status_code == 500
+    assert len(calls) == 1
+
+
+def test_transport_releases_slot_on_any_transport_error():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "POST":
+            raise httpx.RemoteProtocolError("Server disconnected", request=request)
+        if calls.count("PATCH") == 1:
+            raise httpx.ReadError("connection reset", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    limiter = RateLimiter(rate=1000, burst=1000, budgets={}, max_concurrency=2)
+    client = httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(handler), limiter, max_retries=1))
+
+    # 非幂等请求不重试；槽位全部归还，第三次请求不会阻塞
+    for _ in range(3):
+        with pytest.raises(httpx.RemoteProtocolError):
+            client.post("https://api.notion.com/v1/pages", json={})
+    assert calls == ["POST"] * 3
+
+    # 幂等请求在读取错误后重试
+    assert client.patch("https://api.notion.com/v1/pages/abc", json={}).status_code == 200
+    assert calls.count("PATCH") == 2
+    assert limiter.in_flight == 0
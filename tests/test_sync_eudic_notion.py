@@ -1,15 +1,59 @@
+import json
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
+import requests
+
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from scripts.sync_eudic_notion import EudicSyncManager
+from scripts.sync_eudic_notion import EudicSyncManager, SyncedWords
+from conftest import write_config
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch, fake_notion):
+    """经真实构造函数创建同步管理器：配置、状态和镜像都在 tmp_path，已同步过 alpha"""
+    import scripts.sync_eudic_notion as module
+
+    paths = {
+        "CONFIG_FILE": tmp_path / "eudic_config.json",
+        "STATE_FILE": tmp_path / "state.json",
+        "SYNCED_WORDS_FILE": tmp_path / "synced.txt",
+        "MIRROR_FILE": tmp_path / "mirror.db",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(module, name, path)
+    paths["STATE_FILE"].write_text(json.dumps({"total_synced": 1}), encoding="utf-8")
+    paths["SYNCED_WORDS_FILE"].write_text("alpha\n", encoding="utf-8")
+
+    def make(dry_run=False, limit=None, full=False, **sync_settings):
+        write_config(paths["CONFIG_FILE"], "eudic_config.json", sync_settings=sync_settings)
+        return EudicSyncManager(dry_run=dry_run, limit=limit, full=full)
+    return make
+
+
+def title_page(page_id, title):
+    return {"id": page_id, "properties": {"Front": {"type": "title", "title": [{"plain_text": title}]}}}
 
 
-def test_filter_new_words_excludes_state_and_existing_notion_titles():
-    manager = EudicSyncManager.__new__(EudicSyncManager)
-    manager.state = {"synced_words": ["alpha", "beta"]}
-    manager._fetch_existing_notion_titles = lambda: {"gamma"}
+def serve(manager, book):
+    requested = []
+
+    def fetch_vocabulary(page=1, page_size=50):
+        requested.append(page)
+        return book[(page - 1) * page_size:page * page_size]
+
+    manager.fetch_vocabulary = fetch_vocabulary
+    return requested
+
+
+def test_filter_new_words_excludes_state_and_existing_notion_titles(make_manager, fake_notion):
+    fake_notion.put(title_page("p1", "gamma"))
+    manager = make_manager()
+    manager.synced.add("beta")
 
     words = [
         {"word": "alpha"},
@@ -21,3 +65,180 @@ def test_filter_new_words_excludes_state_and_existing_notion_titles():
     new_words = manager.filter_new_words(words)
 
     assert new_words == [{"word": "delta"}]
+
+
+def test_sync_creates_pages_concurrently_and_records_outcomes(make_manager, fake_notion):
+    fake_notion.failing = {"w3"}
+    manager = make_manager(limit=6)
+    words = [{"word": "alpha"}] + [{"word": f"w{i}", "exp": "释义"} for i in range(10)]
+    serve(manager, words)
+
+    stats = manager.sync()
+
+    assert sorted(fake_notion.created) == ["w0", "w1", "w2", "w3", "w4", "w5"]
+    assert fake_notion.peak > 1
+    assert stats == {"total": 11, "new": 6, "success": 5, "failed": 1}
+    assert sorted(manager.synced.words) == ["alpha", "w0", "w1", "w2", "w4", "w5"]
+    assert manager.state["total_synced"] == 6
+    assert fake_notion.meta.invalidated == ["ds"]
+
+
+def test_limit_stops_background_paging(make_manager, fake_notion):
+    manager = make_manager(limit=2, page_size=2)
+    serve(manager, [{"word": f"w{i}"} for i in range(200)])
+    iter_vocabulary = manager.iter_vocabulary
+    stopped = threading.Event()
+
+    def tracked(since=None):
+        try:
+            yield from iter_vocabulary(since)
+        finally:
+            stopped.set()
+    manager.iter_vocabulary = tracked
+
+    assert manager.sync()["new"] == 2
+    # 预取队列已满、阻塞中的翻页线程被取消，不会一直挂到进程退出
+    assert stopped.wait(5)
+
+
+def test_sync_dry_run_creates_nothing(make_manager, fake_notion):
+    manager = make_manager(dry_run=True)
+    serve(manager, [{"word": "w1"}, {"word": "w2"}])
+
+    stats = manager.sync()
+
+    assert fake_notion.created == []
+    assert stats["success"] == 2
+    assert manager.synced.words == {"alpha"}
+
+
+def test_incremental_fetch_stops_at_watermark_and_keeps_failed_words(make_manager, fake_notion):
+    fake_notion.failing = {"n2"}
+    manager = make_manager(page_size=2)
+    manager.state["watermark"] = "2026-01-01T00:03:00Z"
+    book = [{"word": f"n{i}", "add_time": f"2026-01-01T00:{9 - i:02d}:00Z"} for i in range(10)]
+    requested = serve(manager, book)
+
+    stats = manager.sync()
+
+    # n0..n6 不早于水位线；第 4 页遇到更早的 n7 后停止
+    assert requested == [1, 2, 3, 4]
+    assert stats == {"total": 7, "new": 7, "success": 6, "failed": 1}
+    # 失败的 n2 之后还要重新获取
+    assert manager.state["watermark"] == "2026-01-01T00:07:00Z"
+
+    manager.full = True
+    requested.clear()
+    assert len(manager.fetch_all_vocabulary()) == 10
+    assert requested == [1, 2, 3, 4, 5, 6]
+
+
+def test_oldest_first_book_falls_back_to_full_fetch(make_manager, fake_notion):
+    manager = make_manager(page_size=2)
+    manager.state["watermark"] = "2026-01-01T00:03:00Z"
+    book = [{"word": f"o{i}", "add_time": f"2026-01-01T00:{i:02d}:00Z"} for i in range(6)]
+    requested = serve(manager, book)
+
+    stats = manager.sync()
+
+    # 第 1 页第一个单词早于水位线，但整页是正序：不能当作已到达水位线
+    assert requested == [1, 2, 3, 4]
+    assert sorted(fake_notion.created) == [f"o{i}" for i in range(6)]
+    assert stats == {"total": 6, "new": 6, "success": 6, "failed": 0}
+    assert manager.state["watermark"] == "2026-01-01T00:05:00Z"
+
+
+def test_order_break_on_a_later_page_does_not_repeat_earlier_pages(make_manager, fake_notion):
+    manager = make_manager(page_size=2)
+    manager.state["watermark"] = "2026-01-01T00:00:00Z"
+    # 第 1 页倒序，第 2 页起时间回升
+    times = [9, 8, 10, 7, 6, 5]
+    book = [{"word": f"r{i}", "add_time": f"2026-01-01T00:{t:02d}:00Z"} for i, t in enumerate(times)]
+    requested = serve(manager, book)
+
+    stats = manager.sync()
+
+    assert requested == [1, 2, 3, 4]
+    assert stats == {"total": 6, "new": 6, "success": 6, "failed": 0}
+    assert manager.state["watermark"] == "2026-01-01T00:10:00Z"
+
+
+def test_fetch_error_keeps_watermark(make_manager, fake_notion):
+    manager = make_manager(page_size=2)
+    manager.state["watermark"] = "2026-01-01T00:00:00Z"
+    book = [{"word": f"e{i}", "add_time": f"2026-01-01T00:{9 - i:02d}:00Z"} for i in range(6)]
+    requested = serve(manager, book)
+    fetch = manager.fetch_vocabulary
+
+    def flaky(page=1, page_size=50):
+        if page == 2:
+            raise requests.exceptions.ConnectionError("reset")
+        return fetch(page, page_size)
+    manager.fetch_vocabulary = flaky
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        manager.sync()
+
+    assert requested == [1]
+    assert sorted(fake_notion.created) == ["e0", "e1"]
+    assert manager.state["watermark"] == "2026-01-01T00:00:00Z"
+
+
+def test_sync_streams_word_pages_to_writers(make_manager, fake_notion):
+    manager = make_manager(page_size=2)
+    book = [{"word": f"s{i}"} for i in range(6)]
+    first_page = threading.Event()
+    created_before_last_page = []
+
+    def titles():
+        # 欧路翻页与 Notion 标题扫描并行
+        assert first_page.wait(5)
+        return {"s1"}
+
+    def fetch_vocabulary(page=1, page_size=50):
+        first_page.set()
+        if page == 3:
+            deadline = time.time() + 5
+            while not fake_notion.created and time.time() < deadline:
+                time.sleep(0.01)
+            created_before_last_page.extend(fake_notion.created)
+        return book[(page - 1) * page_size:page * page_size]
+
+    manager._fetch_existing_notion_titles = titles
+    manager.fetch_vocabulary = fetch_vocabulary
+
+    stats = manager.sync()
+
+    assert created_before_last_page
+    assert stats == {"total": 6, "new": 5, "success": 5, "failed": 0}
+    assert "s1" not in fake_notion.created
+
+
+def test_synced_words_file_is_sorted_and_migrates_legacy_state(make_manager, tmp_path):
+    path = tmp_path / "synced.txt"
+    path.write_text("gamma\n", encoding="utf-8")
+    (tmp_path / "state.json").write_text(
+        json.dumps({"synced_words": ["beta", "ad hoc", "gamma"], "total_synced": 3}), encoding="utf-8"
+    )
+
+    manager = make_manager()
+    manager.synced.add("alpha")
+    manager.synced.save()
+
+    assert "synced_words" not in manager.state
+    assert path.read_text(encoding="utf-8") == "ad hoc\nalpha\nbeta\ngamma\n"
+    assert "beta" in SyncedWords(path) and len(SyncedWords(path)) == 4
+
+
+def test_interrupted_sync_keeps_checkpointed_words(make_manager, fake_notion, tmp_path):
+    fake_notion.crash_on = "w4"
+    manager = make_manager(workers=1, checkpoint_every=2)
+    serve(manager, [{"word": f"w{i}"} for i in range(6)])
+
+    with pytest.raises(RuntimeError):
+        manager.sync()
+
+    resumed = SyncedWords(tmp_path / "synced.txt")
+    assert sorted(resumed.words) == ["alpha", "w0", "w1", "w2", "w3"]
+    assert json.loads((tmp_path / "state.json").read_text(encoding="utf-8"))["total_synced"] == 5
+    assert not list(tmp_path.glob("*.tmp"))
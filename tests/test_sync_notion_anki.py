@@ -0,0 +1,259 @@
+import json
+import sqlite3
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.sync_notion_anki import AnkiSyncManager
+from anki_ledger import NoteLedger
+from anki_notes import anki_guid
+from fake_anki import FakeAnkiConnect, FakeAnkiServer
+from fake_telegram import FakeTelegram, FakeTelegramServer
+from conftest import write_config
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch, fake_notion):
+    """经真实构造函数创建同步管理器：.apkg 输出到 tmp_path，数据目录为 tmp_path/data"""
+    import scripts.sync_notion_anki as script
+
+    paths = {
+        "ENV_FILE": tmp_path / ".env",
+        "CONFIG_FILE": tmp_path / "anki_sync_config.json",
+        "STATE_FILE": tmp_path / "anki_sync_state.json",
+        "OUTPUT_DIR": tmp_path,
+        "DATA_DIR": tmp_path / "data",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(script, name, path)
+
+    def make(config=None, **kwargs):
+        write_config(paths["CONFIG_FILE"], "anki_sync_config.json", **(config or {}))
+        return AnkiSyncManager(**kwargs)
+    return make
+
+
+def card(page_id, front, back, edited=None):
+    page = {
+        "id": page_id,
+        "properties": {
+            "Front": {"type": "title", "title": [{"plain_text": front}]},
+            "Back": {"type": "rich_text", "rich_text": [{"plain_text": back}]},
+            "Deck": {"type": "select", "select": {"name": "Vocabulary"}},
+            "Tags": {"type": "multi_select", "multi_select": []},
+        },
+    }
+    if edited:
+        page["last_edited_time"] = edited
+    return page
+
+
+def latest_package(tmp_path):
+    return max(tmp_path.glob("anki_sync_*.apkg"), key=lambda path: path.stat().st_mtime)
+
+
+def test_package_contains_only_new_or_changed_notes(make_manager, fake_notion):
+    fake_notion.put(card("p1", "alpha", "one"), card("p2", "beta", "two"))
+    manager = make_manager()
+
+    assert manager.sync_pipeline() == 2
+    assert manager.package_note_count == 2
+
+    assert manager.sync_pipeline() == 2
+    assert manager.package_note_count == 0
+
+    fake_notion.put(card("p1", "alpha", "one, edited"))
+    manager.sync_pipeline()
+    assert manager.package_note_count == 1
+
+
+def test_full_deck_streams_every_mirrored_card_into_one_package(make_manager, fake_notion, tmp_path):
+    fake_notion.put(*[card(f"p{i}", f"word{i}", "meaning") for i in range(5)], card("bad", "", ""))
+    manager = make_manager()
+    manager.mirror.refresh()
+
+    apkg, = manager.build_full_deck()
+
+    assert manager.package_note_count == 5
+    with zipfile.ZipFile(apkg) as z:
+        z.extract("collection.anki2", tmp_path)
+    conn = sqlite3.connect(tmp_path / "collection.anki2")
+    assert conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 5
+    decks = conn.execute("SELECT decks FROM col").fetchone()[0]
+    assert '"LifeOS::Vocabulary"' in decks and '"LifeOS"' in decks
+
+    manager._commit_ledger(delivered=True, full=True)
+    assert len(NoteLedger(manager.ledger.path)) == 5
+
+
+def test_pipeline_writes_back_after_packaging(make_manager, fake_notion, tmp_path):
+    fake_notion.put(*[card(f"p{i}", f"word{i}", "meaning") for i in range(50)], card("bad", "", ""))
+    (tmp_path / "anki_sync_state.json").write_text(json.dumps({"pending_writebacks": {"p0": {}}}))
+    manager = make_manager()
+
+    assert manager.sync_pipeline() == 50
+    assert manager.package_note_count == 49
+    assert set(fake_notion.patched) == {f"p{i}" for i in range(1, 50)} | {"bad"}
+    assert fake_notion.patched["p1"]["Synced"] == {"checkbox": True}
+    assert len(list(tmp_path.glob("anki_sync_*.apkg"))) == 1
+    assert len(NoteLedger(manager.ledger.path)) == 49
+
+    manager._record_timings("pipeline", 50)
+    seconds = manager.state["timings"]["seconds"]
+    assert set(seconds) == {"query", "convert", "package", "deliver", "write_back", "total"}
+    assert all(seconds[phase] > 0 for phase in ("query", "convert", "package", "write_back"))
+    assert manager.state["timing_history"] == [manager.state["timings"]]
+
+
+def test_delta_package_ships_each_media_file_once(make_manager, fake_notion, tmp_path):
+    name = "ab" * 32 + ".png"
+    fake_notion.put(card("p1", "alpha", f"see {name}"))
+    manager = make_manager()
+    (manager.media.root / name).write_bytes(b"image")
+
+    manager.sync_pipeline()
+    with zipfile.ZipFile(latest_package(tmp_path)) as z:
+        assert z.read("media") == f'{{"0": "{name}"}}'.encode()
+        assert z.read("0") == b"image"
+
+    fake_notion.put(card("p1", "alpha", f"edited {name}"))
+    manager.sync_pipeline()
+    assert manager.package_note_count == 1
+    with zipfile.ZipFile(latest_package(tmp_path)) as z:
+        assert z.read("media") == b"{}"
+
+
+def test_every_split_part_carries_the_media_its_notes_reference(make_manager, fake_notion, tmp_path):
+    first, second = "ab" * 32 + ".png", "cd" * 32 + ".png"
+    fake_notion.put(card("p1", "alpha", first), card("p2", "beta", second), card("p3", "gamma", f"again {first}"))
+    manager = make_manager(config={"telegram": {"max_part_mb": 0.4}})
+    (manager.media.root / first).write_bytes(b"a" * 200_000)
+    (manager.media.root / second).write_bytes(b"b" * 200_000)
+
+    manager.sync_pipeline()
+
+    # p1 | p2 | p3：p3 引用的图片已在第一卷中，仍要随第三卷附带
+    parts = sorted(tmp_path.glob("anki_sync_*_part*.apkg"))
+    assert len(parts) == 3
+    for path in parts:
+        with zipfile.ZipFile(path) as z:
+            media = set(json.loads(z.read("media")).values())
+            z.extract("collection.anki2", tmp_path)
+        conn = sqlite3.connect(tmp_path / "collection.anki2")
+        referenced = {name for row in conn.execute("SELECT flds FROM notes")
+                      for name in (first, second) if name in row[0]}
+        conn.close()
+        assert referenced <= media
+    assert manager.media.staged == set() and manager.media.is_shipped(first)
+
+
+def test_anki_connect_pushes_in_batches_and_retries_failures(make_manager, fake_notion, monkeypatch):
+    fake_notion.put(*[card(f"p{i}", f"word{i}", "meaning") for i in range(45)])
+    fake = FakeAnkiConnect()
+
+    with FakeAnkiServer(fake) as server:
+        monkeypatch.setenv("ANKI_CONNECT_URL", server.url)
+        manager = make_manager(config={"anki_connect": {"batch_size": 20}}, anki_connect=True)
+        # 第二批中 Anki 拒绝添加的笔记不写回、不进入账本
+        add_notes = fake._addNotes
+
+        def reject_word30(notes):
+            ids = iter(add_notes([n for n in notes if n["fields"]["Front"] != "word30"]))
+            return [None if n["fields"]["Front"] == "word30" else next(ids) for n in notes]
+        fake._addNotes = reject_word30
+        assert manager.sync_anki_connect() == 45
+
+    assert fake.stats["actions"]["addNotes"] == 3
+    assert len(fake.notes) == 44
+    assert set(fake_notion.patched) == {f"p{i}" for i in range(45)} - {"p30"}
+    assert manager.ledger.path.name == "anki_connect_ledger.tsv"
+    assert len(NoteLedger(manager.ledger.path)) == 44
+
+
+def test_switching_delivery_mode_redelivers_every_mirrored_card(make_manager, fake_notion, monkeypatch):
+    edited = "2025-01-01T10:00:00.000Z"
+    fake_notion.put(card("p1", "alpha", "one", edited), card("p2", "beta", "two", edited))
+    manager = make_manager()
+    manager.sync_pipeline()
+    manager._save_state()
+    assert manager.state["delivery"] == "apkg"
+
+    # 两张卡片都已同步：属性模式不会再选中它们
+    synced = {"Synced": {"type": "checkbox", "checkbox": True}}
+    for page in fake_notion.pages.values():
+        page["properties"].update(synced)
+    fake_notion.patched.clear()
+    fake = FakeAnkiConnect()
+
+    with FakeAnkiServer(fake) as server:
+        monkeypatch.setenv("ANKI_CONNECT_URL", server.url)
+        with pytest.raises(ValueError, match="--switch-delivery"):
+            make_manager(anki_connect=True)
+
+        manager = make_manager(anki_connect=True, switch_delivery=True)
+        assert manager.sync_anki_connect() == 2
+        manager._save_state()
+        assert len(fake.notes) == 2 and fake_notion.patched == {}
+        assert len(NoteLedger(manager.ledger.path)) == 2
+
+        manager = make_manager(anki_connect=True)
+        assert not manager.redeliver and manager.sync_anki_connect() == 0
+
+
+def test_telegram_skips_identical_packages_and_holds_small_digests(make_manager, fake_notion, monkeypatch):
+    fake_notion.put(card("p1", "alpha", "one"), card("p2", "beta", "two"))
+    fake = FakeTelegram()
+
+    with FakeTelegramServer(fake) as server:
+        for name, value in {"TELEGRAM_BOT_TOKEN": "TOKEN", "TELEGRAM_CHAT_ID": "42",
+                            "TELEGRAM_API_URL": server.url}.items():
+            monkeypatch.setenv(name, value)
+        manager = make_manager(config={"telegram": {"digest": {"min_cards": 3, "max_hours": 24}}}, no_delta=True)
+        manager.sync_pipeline()                  # 首次发送：没有上次发送时间，不暂缓
+        assert len(fake.documents) == 1 and set(fake_notion.patched) == {"p1", "p2"}
+
+        fake_notion.patched.clear()
+        manager.sync_pipeline()                  # 内容相同：跳过发送，仍写回
+        assert len(fake.documents) == 1 and set(fake_notion.patched) == {"p1", "p2"}
+
+        fake_notion.patched.clear()
+        fake_notion.put(card("p3", "gamma", "three"))
+        manager.state["pending_writebacks"] = {"p1": {}, "p2": {}}
+        manager.sync_pipeline()                  # 只有 1 张新卡片：摘要模式暂缓
+        assert len(fake.documents) == 1 and fake_notion.patched == {}
+        assert manager.ledger.get(anki_guid("p3")) is None
+
+
+def test_ledger_mode_selects_pages_edited_since_export_without_write_backs(make_manager, fake_notion):
+    manager = make_manager(config={"sync": {"selection": "ledger", "update_notion_status": False}})
+
+    def edited(minute):
+        return f"2025-01-01T10:{minute:02d}:00.000Z"
+
+    fake_notion.put(card("p1", "alpha", "one", edited(0)), card("p2", "beta", "two", edited(0)))
+    assert manager.sync_pipeline() == 2 and manager.package_note_count == 2
+    assert manager.sync_pipeline() == 0
+
+    # p1 内容变化；p2 只改了与卡片无关的属性（时间戳变化，内容相同）
+    fake_notion.put(card("p1", "alpha", "one, edited", edited(5)), card("p2", "beta", "two", edited(5)))
+    assert manager.sync_pipeline() == 2 and manager.package_note_count == 1
+    assert manager.sync_pipeline() == 0
+    assert fake_notion.patched == {}
+    assert NoteLedger(manager.ledger.path).exported("p2") == edited(5)
+
+
+def test_ledger_mode_write_backs_do_not_reselect_exported_pages(make_manager, fake_notion):
+    manager = make_manager(config={"sync": {"selection": "ledger"}})
+    fake_notion.edited = "2025-01-01T10:09:00.000Z"
+    fake_notion.put(card("p1", "alpha", "one", "2025-01-01T10:00:00.000Z"),
+                    card("p2", "beta", "two", "2025-01-01T10:00:00.000Z"))
+    assert manager.sync_pipeline() == 2 and set(fake_notion.patched) == {"p1", "p2"}
+
+    # 镜像刷新后看到写回带来的新 last_edited_time
+    fake_notion.put(card("p1", "alpha", "one", fake_notion.edited), card("p2", "beta", "two", fake_notion.edited))
+    assert manager.sync_pipeline() == 0
+    assert NoteLedger(manager.ledger.path).exported("p1") == fake_notion.edited
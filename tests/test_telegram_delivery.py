@@ -0,0 +1,70 @@
+import json
+import sqlite3
+import sys
+import zipfile
+from pathlib import Path
+
+import genanki
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notion-kit"))
+
+import telegram_delivery
+from anki_package import SplitPackage
+from fake_telegram import FakeTelegram, FakeTelegramServer
+from telegram_delivery import TelegramSender
+
+MODEL = genanki.Model(1607392319, "LifeOS Basic", fields=[{"name": "Front"}, {"name": "Back"}],
+                      templates=[{"name": "Card 1", "qfmt": "{{Front}}", "afmt": "{{Back}}"}])
+
+
+def test_sender_retries_server_errors_and_rate_limits(tmp_path, monkeypatch):
+    waits = []
+    monkeypatch.setattr(telegram_delivery.time, "sleep", waits.append)
+    apkg = tmp_path / "deck.apkg"
+    apkg.write_bytes(b"x" * 1000)
+    fake = FakeTelegram()
+    fake.fail_next(502, 429)
+
+    with FakeTelegramServer(fake) as server:
+        sender = TelegramSender("TOKEN", "42", api_url=server.url)
+        assert sender.send_documents([str(apkg)], "🎴 Anki")
+        fake.fail_next(400)
+        assert not sender.send_message("hi")
+
+    assert waits == [2, 1]
+    assert [(d["filename"], d["size"], d["caption"], d["chat_id"]) for d in fake.documents] == \
+        [("deck.apkg", 1000, "🎴 Anki", "42")]
+    assert fake.stats["requests"] == 4
+
+
+def test_split_package_parts_stay_under_the_upload_limit(tmp_path):
+    media = []
+    for i in range(5):
+        path = tmp_path / f"{i:064x}.png"
+        path.write_bytes(bytes([i]) * 300_000)
+        media.append(path)
+
+    with SplitPackage(tmp_path / "deck.apkg", MODEL, max_bytes=700_000) as package:
+        for i, path in enumerate(media):
+            package.add({"guid": f"g{i}", "deck": "LifeOS::Vocabulary", "fields": [f"w{i}", path.name],
+                         "tags": []}, [path])
+
+    assert package.note_count == 5
+    assert [Path(p).name for p in package.paths] == ["deck_part1.apkg", "deck_part2.apkg", "deck_part3.apkg"]
+    assert not (tmp_path / "deck.apkg").exists()
+    notes = 0
+    for path in package.paths:
+        with zipfile.ZipFile(path) as z:
+            names = set(json.loads(z.read("media")).values())
+            z.extract("collection.anki2", tmp_path)
+        conn = sqlite3.connect(tmp_path / "collection.anki2")
+        fields = [row[0].split("\x1f")[1] for row in conn.execute("SELECT flds FROM notes")]
+        conn.close()
+        assert set(fields) == names      # 笔记与其媒体在同一分卷
+        notes += len(fields)
+    assert notes == 5
+
+    fake = FakeTelegram(upload_limit=700_000)
+    with FakeTelegramServer(fake) as server:
+        assert TelegramSender("TOKEN", "42", api_url=server.url).send_documents(package.paths, "🎴")
+    assert [d["caption"] for d in fake.documents] == [f"🎴\n📎 分卷 {i}/3" for i in (1, 2, 3)]